@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.models import User
-from .models import Employee, BiometricData, Attendance
+from .models import Employee, BiometricData, Attendance, AttendanceRollup
 
 # ----------------- EMPLOYEE ADMIN -----------------
 @admin.register(Employee)
@@ -52,7 +52,7 @@ class BiometricDataAdmin(admin.ModelAdmin):
 class AttendanceAdmin(admin.ModelAdmin):
     list_display = (
         'employee', 'date', 'check_in_time', 'check_out_time',
-        'scan_type', 'check_in_latitude', 'check_in_longitude'
+        'scan_type', 'check_in_latitude', 'check_in_longitude', 'check_in_site'
     )
     list_filter = ('scan_type', 'date')
     search_fields = (
@@ -62,13 +62,29 @@ class AttendanceAdmin(admin.ModelAdmin):
     )
 
 
+# ----------------- ATTENDANCE ROLLUP ADMIN -----------------
+@admin.register(AttendanceRollup)
+class AttendanceRollupAdmin(admin.ModelAdmin):
+    list_display = (
+        'employee', 'month', 'present_days', 'worked_time',
+        'late_arrivals', 'missing_checkouts'
+    )
+    list_filter = ('month',)
+    search_fields = ('employee__employee_id',)
+    readonly_fields = (
+        'employee', 'month', 'present_days', 'worked_time',
+        'late_arrivals', 'missing_checkouts'
+    )
+
+
 
 from django.contrib import admin
 from .models import ProjectDetail
+from .search import SearchAdminMixin
 
 
 @admin.register(ProjectDetail)
-class ProjectDetailAdmin(admin.ModelAdmin):
+class ProjectDetailAdmin(SearchAdminMixin, admin.ModelAdmin):
     list_display = (
         "project_name",
         "builder_name",
@@ -102,10 +118,11 @@ class ProjectDetailAdmin(admin.ModelAdmin):
 
 from django.contrib import admin
 from .models import SiteVisit
+from .search import SearchAdminMixin
 
 
 @admin.register(SiteVisit)
-class SiteVisitAdmin(admin.ModelAdmin):
+class SiteVisitAdmin(SearchAdminMixin, admin.ModelAdmin):
     list_display = (
         "visitor_name",
         "visitor_mobile",
@@ -134,10 +151,11 @@ class SiteVisitAdmin(admin.ModelAdmin):
 
 from django.contrib import admin
 from .models import PropertyBooking
+from .search import SearchAdminMixin
 
 
 @admin.register(PropertyBooking)
-class PropertyBookingAdmin(admin.ModelAdmin):
+class PropertyBookingAdmin(SearchAdminMixin, admin.ModelAdmin):
     list_display = (
         "visitor_name",
         "visitor_mobile",
@@ -156,6 +174,18 @@ class PropertyBookingAdmin(admin.ModelAdmin):
     ordering = ("-booking_date",)
 
 
+from .models import Lead
+
+
+# ----------------- LEAD -----------------
+@admin.register(Lead)
+class LeadAdmin(admin.ModelAdmin):
+    list_display = ("phone", "created_at")
+    search_fields = ("phone",)
+    readonly_fields = ("phone", "created_at")
+    ordering = ("-created_at",)
+
+
 from django.contrib import admin
 from .models import Service, EmployeeServiceStatus
 
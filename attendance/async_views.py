@@ -0,0 +1,169 @@
+# attendance/async_views.py
+"""
+Async versions of the high-traffic mobile endpoints, enabled with
+settings.ATTENDANCE_ASYNC_VIEWS (see attendance/urls.py).
+
+DRF views are sync-only, so these are plain async Django views with the
+same request and response formats as their DRF counterparts. Reads go
+through the async ORM; writes that must share a transaction with the
+rollup update reuse the sync helpers from views.py via sync_to_async,
+because transaction.atomic() does not work in async code.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, NotAuthenticated, ParseError
+from rest_framework.renderers import JSONRenderer
+
+from . import devices, report_buffer
+from .authentication import EmployeeJWTAuthentication
+from .models import Employee, EmployeeReport
+from .serializers import (
+    AttendanceCheckInSerializer, AttendanceCheckOutSerializer,
+    EmployeeReportInputSerializer, EmployeeReportSerializer,
+)
+from .utils import aget_open_session, open_sessions, with_last_activity, REPORT_INTERVAL
+from .views import EmployeeReportViewSet, create_check_in, close_open_session
+
+
+class AsyncAPIView(View):
+    """CSRF-exempt JSON view authenticating like the DRF views (EmployeeJWTAuthentication)"""
+    renderer = JSONRenderer()
+    authenticator = EmployeeJWTAuthentication()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, (dict, list)) else {"detail": exc.detail}
+            response = self.respond(detail, status=exc.status_code)
+            if exc.status_code == 401:
+                response["WWW-Authenticate"] = self.authenticator.authenticate_header(request)
+            return response
+
+    def respond(self, data, status=200):
+        return HttpResponse(self.renderer.render(data), status=status, content_type="application/json")
+
+    def parse(self, request):
+        if request.content_type == "application/json":
+            try:
+                return json.loads(request.body or b"{}")
+            except ValueError as exc:
+                raise ParseError(f"JSON parse error - {exc}")
+        return request.POST
+
+    async def authenticate(self, request, required=True):
+        """
+        The request's user (with .employee loaded), or None without credentials.
+        An invalid token is a 401 either way, as with DRF's lazy request.user.
+        """
+        header = self.authenticator.get_header(request)
+        raw_token = self.authenticator.get_raw_token(header) if header is not None else None
+        if raw_token is None:
+            if required:
+                raise NotAuthenticated()
+            return None
+        validated_token = self.authenticator.get_validated_token(raw_token)
+        # Principal cache hit on most requests; one select_related query otherwise
+        return await sync_to_async(self.authenticator.get_user)(validated_token)
+
+
+# ----------------- ATTENDANCE -----------------
+class AsyncAttendanceCheckInView(AsyncAPIView):
+    async def post(self, request):
+        await self.authenticate(request, required=False)
+        data = self.parse(request)
+        serializer = AttendanceCheckInSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            employee = await Employee.objects.aget(employee_id=data.get("employee_id"))
+        except Employee.DoesNotExist:
+            return self.respond({"error": "Invalid employee_id"}, status=400)
+
+        device_verified = await sync_to_async(devices.is_registered_device)(
+            employee.employee_id, serializer.validated_data["device_id"]
+        )
+        if not device_verified and devices.device_policy() == "reject":
+            return self.respond({"error": "Device not registered for this employee"}, status=403)
+
+        await sync_to_async(create_check_in)(employee, serializer.validated_data, device_verified)
+        return self.respond({"message": "Check-in successful"}, status=201)
+
+
+class AsyncAttendanceCheckOutView(AsyncAPIView):
+    async def post(self, request):
+        await self.authenticate(request, required=False)
+        data = self.parse(request)
+        serializer = AttendanceCheckOutSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+
+        employee_id = data.get("employee_id")
+        device_verified = await sync_to_async(devices.is_registered_device)(
+            employee_id, serializer.validated_data["device_id"]
+        )
+        if not device_verified and devices.device_policy() == "reject":
+            if not await Employee.objects.filter(employee_id=employee_id).aexists():
+                return self.respond({"error": "Invalid employee_id"}, status=400)
+            return self.respond({"error": "Device not registered for this employee"}, status=403)
+
+        if not await sync_to_async(close_open_session)(employee_id, serializer.validated_data, device_verified):
+            if not await Employee.objects.filter(employee_id=employee_id).aexists():
+                return self.respond({"error": "Invalid employee_id"}, status=400)
+            return self.respond({"error": "No active check-in found"}, status=400)
+
+        return self.respond({"message": "Check-out successful"}, status=200)
+
+
+# ----------------- REPORTS -----------------
+class AsyncEmployeeReportView(AsyncAPIView):
+    """POST reports/ natively async; GET still served by EmployeeReportViewSet.list"""
+    list_view = staticmethod(EmployeeReportViewSet.as_view({"get": "list"}))
+
+    async def get(self, request):
+        return await sync_to_async(self.list_view)(request)
+
+    async def post(self, request):
+        employee = (await self.authenticate(request)).employee
+        attendance = await aget_open_session(employee)
+        if attendance is None:
+            return self.respond({"error": "No active attendance found. Please check in first."}, status=400)
+
+        serializer = EmployeeReportInputSerializer(data=self.parse(request))
+        serializer.is_valid(raise_exception=True)
+        validated = serializer.validated_data
+
+        if report_buffer.enabled():
+            entry = await sync_to_async(report_buffer.get_buffer().submit)(
+                employee.id, attendance.id, validated["report_text"],
+                validated.get("latitude"), validated.get("longitude"),
+            )
+            return self.respond({
+                "id": None, "employee": employee.id, "attendance": attendance.id,
+                **serializer.data, "created_at": entry["created_at"], "spool_id": entry["spool_id"],
+            }, status=202)
+
+        report = await EmployeeReport.objects.acreate(employee=employee, attendance=attendance, **validated)
+        return self.respond(EmployeeReportSerializer(report).data, status=201)
+
+
+class AsyncMissedReportView(AsyncAPIView):
+    async def get(self, request):
+        employee = (await self.authenticate(request)).employee
+        attendance = await with_last_activity(
+            open_sessions().filter(employee=employee)
+        ).order_by("-check_in_time").afirst()
+        if attendance is None:
+            return self.respond({"missed": False, "message": "No active attendance"})
+
+        if timezone.now() - attendance.last_activity > REPORT_INTERVAL:
+            return self.respond({"missed": True, "message": "You missed a half-hourly report."})
+        return self.respond({"missed": False, "message": "All reports submitted on time."})
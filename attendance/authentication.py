@@ -0,0 +1,124 @@
+# attendance/authentication.py
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Claims added to every token issued at login
+EMPLOYEE_PK_CLAIM = "employee_pk"
+EMPLOYEE_ID_CLAIM = "employee_id"
+
+
+def tokens_for_employee(employee):
+    """Refresh token (and its access token) carrying the employee's pk and employee_id"""
+    refresh = RefreshToken.for_user(employee.user)
+    refresh[EMPLOYEE_PK_CLAIM] = employee.pk
+    refresh[EMPLOYEE_ID_CLAIM] = employee.employee_id
+    return refresh
+
+
+class PrincipalCache:
+    """
+    Short-TTL per-process cache of user_id -> user with `user.employee` loaded.
+    User / Employee signals evict entries; the TTL bounds staleness for changes
+    made by other workers. Keys are str(user_id): tokens carry the id as a
+    string while signals see the integer pk.
+    """
+
+    def __init__(self, ttl=60, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+        return self._copy(user)
+
+    def set(self, user_id, user):
+        user_id = str(user_id)
+        with self._lock:
+            self._data[user_id] = (time.monotonic() + self.ttl, user)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return self._copy(user)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._data.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    @staticmethod
+    def _copy(user):
+        # Every request gets its own instances, so a view mutating request.user
+        # (or request.user.employee) never touches the cached principal
+        principal = copy.copy(user)
+        employee = user._state.fields_cache.get("employee")
+        if employee is not None:
+            principal.employee = copy.copy(employee)
+            principal.employee.user = principal
+        return principal
+
+
+principal_cache = PrincipalCache(ttl=getattr(settings, "AUTH_PRINCIPAL_CACHE_TTL", 60))
+
+
+class EmployeeJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that resolves user and employee together: one
+    select_related query on a cache miss, none on a hit.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = principal_cache.get(user_id)
+        if user is None or not self._matches_claims(user, validated_token):
+            try:
+                user = User.objects.select_related("employee").get(**{api_settings.USER_ID_FIELD: user_id})
+            except User.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            user = principal_cache.set(user_id, user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+    @staticmethod
+    def _matches_claims(user, validated_token):
+        """A cached principal must agree with the employee the token was issued for"""
+        employee_pk = validated_token.get(EMPLOYEE_PK_CLAIM)
+        if employee_pk is None:
+            return True
+        employee = user._state.fields_cache.get("employee")
+        return employee is not None and employee.pk == employee_pk
@@ -0,0 +1,511 @@
+# attendance/benchmark.py
+"""
+Load-test harness behind `manage.py benchmark_api`.
+
+Seeds a scratch SQLite database, serves the project from an in-process
+threaded WSGI server (or drives the ASGI application directly from
+coroutines) and runs a weighted mix of API calls from concurrent clients,
+recording latency percentiles, throughput and SQL queries per request for
+every endpoint.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+from datetime import timedelta
+from http.client import HTTPConnection
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+from django.db import connections
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .models import (
+    Attendance, BiometricData, Employee, EmployeeReport, ProjectDetail, PropertyBooking, SiteVisit,
+)
+from .authentication import tokens_for_employee
+from .metrics import track_sql
+from .rollups import rebuild_rollups
+from .utils import get_open_session
+from .views import EmployeeReportViewSet, PropertyBookingViewSet, SiteVisitViewSet
+
+BENCH_PASSWORD = "bench-pass-123"
+
+DEFAULT_MIX = {
+    "login": 5,
+    "check_in": 10,
+    "report": 40,
+    "site_visits": 25,
+    "full_data": 20,
+    "missed_reports": 0,
+}
+
+QUERY_COUNT_HEADER = "X-Bench-Queries"
+
+# Recorded status for requests that never got a response (connection refused / reset)
+CONNECTION_FAILED = 599
+
+# Access tokens live five minutes by default; mint a fresh one well before that
+TOKEN_REUSE_SECONDS = 120
+
+
+# ----------------- SEEDING -----------------
+def seed(employees=200, projects=20, visits=1000, bookings=1000, history_days=30, rng=None):
+    """
+    Bulk-load a realistic dataset. Half the employees already have an open
+    session today (they post reports); the other half are left to check in.
+    Returns (checked_in employees, not yet checked-in employees).
+    """
+    rng = rng or random.Random(0)
+    password = make_password(BENCH_PASSWORD)  # hash once, share across users
+    today = timezone.localdate()
+    now = timezone.now()
+
+    User.objects.bulk_create(
+        User(username=f"bench{i}", first_name="Bench", last_name=f"User{i}", password=password)
+        for i in range(employees)
+    )
+    users = User.objects.filter(username__startswith="bench").order_by("id")
+    Employee.objects.bulk_create(
+        Employee(user=user, mobile=f"9{i:09d}", employee_id=f"B{i:07d}")
+        for i, user in enumerate(users)
+    )
+    staff = list(Employee.objects.select_related("user").order_by("id"))
+    BiometricData.objects.bulk_create(
+        BiometricData(employee=employee, device_id=f"bench-device-{i}", public_key="bench", status="success")
+        for i, employee in enumerate(staff)
+    )
+
+    ProjectDetail.objects.bulk_create(
+        ProjectDetail(
+            project_name=f"Bench Project {i}", builder_name="Bench Builders", project_type="plots",
+            city="Nagpur", address=f"Plot {i}", state="Maharashtra", zipcode="440001",
+            number_of_units=100, latitude=21.1 + i * 0.01, longitude=79.0 + i * 0.01,
+        )
+        for i in range(projects)
+    )
+    sites = list(ProjectDetail.objects.all())
+
+    SiteVisit.objects.bulk_create(
+        (
+            SiteVisit(
+                employee=rng.choice(staff), project=rng.choice(sites),
+                visit_date=today - timedelta(days=rng.randrange(90)),
+                status=rng.choice(["scheduled", "completed", "cancelled"]),
+                visitor_name=f"Visitor {i}", visitor_mobile=f"8{rng.randrange(10**9):09d}",
+                visitor_address="Nagpur", plot_number=str(rng.randrange(500)),
+                visitor_status=rng.choice(["interested", "not_interested"]),
+            )
+            for i in range(visits)
+        ),
+        batch_size=1000,
+    )
+    PropertyBooking.objects.bulk_create(
+        (
+            PropertyBooking(
+                employee=rng.choice(staff), project=rng.choice(sites),
+                visitor_name=f"Buyer {i}", visitor_mobile=f"7{rng.randrange(10**9):09d}",
+                plot_number=str(rng.randrange(500)), total_amount=1000000, advance_amount=100000,
+                remaining_amount=900000, booking_status=rng.choice(["pending", "confirmed", "cancelled"]),
+            )
+            for i in range(bookings)
+        ),
+        batch_size=1000,
+    )
+
+    history = []
+    for i, employee in enumerate(staff):
+        for day in range(1, history_days + 1):
+            check_in = now - timedelta(days=day, hours=1)
+            history.append(Attendance(
+                employee=employee, date=today - timedelta(days=day),
+                check_in_time=check_in, check_out_time=check_in + timedelta(hours=8),
+                scan_type="face", device_id=f"bench-device-{i}", status="success",
+            ))
+    Attendance.objects.bulk_create(history, batch_size=1000)
+
+    checked_in = staff[: len(staff) // 2]
+    waiting = staff[len(staff) // 2:]
+    Attendance.objects.bulk_create(
+        Attendance(
+            employee=employee, date=today, check_in_time=now - timedelta(minutes=20),
+            scan_type="face", device_id="bench", status="success",
+        )
+        for employee in checked_in
+    )
+    sessions = Attendance.objects.filter(date=today).select_related("employee")
+    EmployeeReport.objects.bulk_create(
+        EmployeeReport(employee=session.employee, attendance=session, report_text="Seed report")
+        for session in sessions
+    )
+    rebuild_rollups()
+
+    return checked_in, waiting
+
+
+def seed_reports(employee, count):
+    """`count` more reports on the employee's open session (one long report list)"""
+    attendance = get_open_session(employee)
+    now = timezone.now()
+    EmployeeReport.objects.bulk_create(
+        (
+            EmployeeReport(
+                employee=employee, attendance=attendance, report_text=f"Bench report {i}",
+                latitude=21.1, longitude=79.0, created_at=now - timedelta(minutes=i),
+            )
+            for i in range(count)
+        ),
+        batch_size=1000,
+    )
+
+
+def use_scratch_database(path, tuned=True):
+    """Point the default connection at the scratch file (same approach as Django's test runner)"""
+    connections["default"].close()
+    overrides = {"NAME": path}
+    if not tuned:
+        overrides.update(OPTIONS={}, CONN_MAX_AGE=0)
+    settings.DATABASES["default"].update(overrides)
+    connections["default"].settings_dict.update(overrides)
+
+
+# ----------------- SERVER -----------------
+def counting_application(application):
+    """Wrap the WSGI app so every response reports how many SQL queries it ran"""
+    def app(environ, start_response):
+        with track_sql() as sql:
+            def counted_start_response(status, headers, exc_info=None):
+                headers.append((QUERY_COUNT_HEADER, str(sql[0])))
+                return start_response(status, headers, exc_info)
+
+            return application(environ, counted_start_response)
+
+    return app
+
+
+def counting_asgi_application(application):
+    """ASGI counterpart of counting_application"""
+    async def app(scope, receive, send):
+        with track_sql() as sql:
+            async def counted_send(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = [*message["headers"], (QUERY_COUNT_HEADER.encode(), str(sql[0]).encode())]
+                await send(message)
+
+            await application(scope, receive, counted_send)
+
+    return app
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class BenchServer(ThreadedWSGIServer):
+    # socketserver's default listen backlog of 5 resets connections under many clients
+    request_queue_size = 128
+
+
+def start_server():
+    server = BenchServer(("127.0.0.1", 0), QuietHandler, allow_reuse_address=False)
+    server.set_app(counting_application(get_internal_wsgi_application()))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, thread
+
+
+# ----------------- CLIENTS -----------------
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}  # endpoint -> list of (seconds, status, queries)
+
+    def add(self, endpoint, seconds, status, queries):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((seconds, status, queries))
+
+
+def _headers(body, token):
+    headers = {"Host": "127.0.0.1"}
+    if body is not None:
+        headers["Content-Type"] = "application/json"
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return headers
+
+
+def _request(port, method, path, body=None, token=None):
+    headers = _headers(body, token)
+    if body is not None:
+        body = json.dumps(body)
+
+    http = HTTPConnection("127.0.0.1", port, timeout=60)
+    started = time.perf_counter()
+    try:
+        http.request(method, path, body=body, headers=headers)
+        response = http.getresponse()
+        response.read()
+        elapsed = time.perf_counter() - started
+        queries = response.getheader(QUERY_COUNT_HEADER)
+        return elapsed, response.status, int(queries) if queries is not None else None
+    except OSError:
+        return time.perf_counter() - started, CONNECTION_FAILED, None
+    finally:
+        http.close()
+
+
+async def _asgi_request(application, method, path, body=None, token=None):
+    """One request straight into the ASGI application (no sockets, like an ASGI server would)"""
+    path, _, query = path.partition("?")
+    request_body = json.dumps(body).encode() if body is not None else b""
+    headers = [(name.lower().encode(), value.encode()) for name, value in _headers(body, token).items()]
+    headers.append((b"content-length", str(len(request_body)).encode()))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": headers, "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 80),
+    }
+    disconnected = asyncio.Event()
+    result = {}
+
+    async def receive():
+        if "sent" not in result:
+            result["sent"] = True
+            return {"type": "http.request", "body": request_body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+            result["queries"] = dict(message["headers"]).get(QUERY_COUNT_HEADER.encode())
+
+    started = time.perf_counter()
+    try:
+        await application(scope, receive, send)
+    finally:
+        disconnected.set()
+    queries = result.get("queries")
+    return time.perf_counter() - started, result.get("status", CONNECTION_FAILED), int(queries) if queries else None
+
+
+class Workload:
+    """Shared state for the client threads: who is checked in, what is left to do"""
+
+    def __init__(self, checked_in, waiting, mix, total_requests, duration, seed=0):
+        self._tokens = {}  # employee_id -> (access token, minted at)
+        self.checked_in = list(checked_in)
+        self.waiting = list(waiting)
+        self.mix = mix
+        self.remaining = total_requests
+        self.deadline = time.monotonic() + duration if duration else None
+        self.seed = seed
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            if self.deadline is not None:
+                return time.monotonic() < self.deadline
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def token_for(self, employee):
+        """Access token for the employee, re-minted before it can expire mid-run"""
+        with self._lock:
+            token, minted_at = self._tokens.get(employee.employee_id, (None, 0))
+            if token is None or time.monotonic() - minted_at > TOKEN_REUSE_SECONDS:
+                token = str(tokens_for_employee(employee).access_token)
+                self._tokens[employee.employee_id] = (token, time.monotonic())
+            return token
+
+    def next_waiting(self):
+        with self._lock:
+            return self.waiting.pop() if self.waiting else None
+
+    def next_call(self, rng, names, weights):
+        """(endpoint, method, path, body, token) of the next request to send"""
+        operation = rng.choices(names, weights)[0]
+        employee = rng.choice(self.checked_in)
+        token = self.token_for(employee)
+
+        if operation == "check_in":
+            newcomer = self.next_waiting()
+            if newcomer is not None:
+                index = int(newcomer.employee_id[1:])
+                return operation, "POST", "/attendance/check-in/", {
+                    "employee_id": newcomer.employee_id, "check_in_latitude": 21.1,
+                    "check_in_longitude": 79.0, "scan_type": "face",
+                    "device_id": f"bench-device-{index}", "status": "success",
+                }, None
+            operation = "report"
+
+        if operation == "login":
+            return operation, "POST", "/login/", {"username": employee.mobile, "password": BENCH_PASSWORD}, None
+        if operation == "report":
+            return operation, "POST", "/reports/", {
+                "report_text": "Benchmark report", "latitude": 21.1, "longitude": 79.0,
+            }, token
+        if operation == "missed_reports":
+            return operation, "GET", "/missed_reports/missed_reports/", None, token
+        if operation == "site_visits":
+            return operation, "GET", "/site-visits/", None, token
+        return operation, "GET", f"/employee/{employee.employee_id}/full-data/", None, token
+
+    def run_client(self, port, recorder, client_index):
+        rng = random.Random(self.seed + client_index)
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+
+        while self.take():
+            operation, method, path, body, token = self.next_call(rng, names, weights)
+            recorder.add(operation, *_request(port, method, path, body, token))
+
+    async def run_async_client(self, application, recorder, client_index):
+        rng = random.Random(self.seed + client_index)
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+
+        while self.take():
+            operation, method, path, body, token = self.next_call(rng, names, weights)
+            recorder.add(operation, *await _asgi_request(application, method, path, body, token))
+
+
+# ----------------- RESULTS -----------------
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder, wall_seconds):
+    endpoints = {}
+    all_latencies = []
+    for name, samples in sorted(recorder.samples.items()):
+        latencies = sorted(seconds for seconds, _, _ in samples)
+        queries = [count for _, _, count in samples if count is not None]
+        all_latencies.extend(latencies)
+        endpoints[name] = {
+            "requests": len(samples),
+            "errors": sum(1 for _, status, _ in samples if status >= 400),
+            "rps": round(len(samples) / wall_seconds, 2),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "queries_avg": round(sum(queries) / len(queries), 2) if queries else None,
+            "queries_max": max(queries) if queries else None,
+        }
+
+    all_latencies.sort()
+    total = {
+        "requests": len(all_latencies),
+        "wall_seconds": round(wall_seconds, 3),
+        "rps": round(len(all_latencies) / wall_seconds, 2) if wall_seconds else None,
+        "p50_ms": round(percentile(all_latencies, 0.50) * 1000, 2) if all_latencies else None,
+        "p95_ms": round(percentile(all_latencies, 0.95) * 1000, 2) if all_latencies else None,
+        "p99_ms": round(percentile(all_latencies, 0.99) * 1000, 2) if all_latencies else None,
+    }
+    return {"endpoints": endpoints, "total": total}
+
+
+def run(workload, clients):
+    """Start the server, run `clients` concurrent client threads, return the summary"""
+    server, thread = start_server()
+    port = server.server_address[1]
+    recorder = Recorder()
+    try:
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=workload.run_client, args=(port, recorder, index))
+            for index in range(clients)
+        ]
+        for client in threads:
+            client.start()
+        for client in threads:
+            client.join()
+        wall_seconds = time.perf_counter() - started
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+    return summarize(recorder, wall_seconds)
+
+
+def run_asgi(workload, clients):
+    """Drive the ASGI application from `clients` concurrent coroutines on one event loop"""
+    application = counting_asgi_application(get_asgi_application())
+    recorder = Recorder()
+
+    async def main():
+        await asyncio.gather(*(
+            workload.run_async_client(application, recorder, index) for index in range(clients)
+        ))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    return summarize(recorder, time.perf_counter() - started)
+
+
+# ----------------- LIST READS -----------------
+def list_views():
+    """Endpoint name -> (list view, path) for the endpoints with the fast read path"""
+    return {
+        "site_visits": (SiteVisitViewSet.as_view({"get": "list"}), "/api/site-visits/"),
+        "property_bookings": (PropertyBookingViewSet.as_view({"get": "list"}), "/api/property-bookings/"),
+        "reports": (EmployeeReportViewSet.as_view({"get": "list"}), "/api/reports/"),
+    }
+
+
+def walk_list(view, path, user, page_size):
+    """Every page of a list view in-process (no HTTP, no middleware); returns (rows, [bodies])"""
+    factory = APIRequestFactory()
+    url = f"{path}?page_size={page_size}"
+    rows, bodies = 0, []
+    while url:
+        request = factory.get(url, HTTP_HOST="127.0.0.1")
+        force_authenticate(request, user=user)
+        response = view(request)
+        response.render()
+        bodies.append(response.content)
+        rows += len(response.data["results"])
+        url = response.data["next"]
+    return rows, bodies
+
+
+def run_list_reads(user, page_size, rounds):
+    """
+    Rows per second through each list endpoint with the serializers and with
+    FAST_LIST_READS, walking every page `rounds` times per path. Also checks
+    both paths rendered identical bytes.
+    """
+    results = {}
+    previous = getattr(settings, "FAST_LIST_READS", False)
+    try:
+        for name, (view, path) in list_views().items():
+            result = {}
+            bodies = {}
+            for label, fast in (("serializer", False), ("fast", True)):
+                settings.FAST_LIST_READS = fast
+                rows, bodies[label] = walk_list(view, path, user, page_size)  # warm-up
+                started = time.perf_counter()
+                for _ in range(rounds):
+                    walk_list(view, path, user, page_size)
+                elapsed = time.perf_counter() - started
+                result["rows"] = rows
+                result[f"{label}_rows_per_s"] = round(rows * rounds / elapsed, 1)
+            result["speedup"] = round(result["fast_rows_per_s"] / result["serializer_rows_per_s"], 2)
+            result["identical"] = bodies["serializer"] == bodies["fast"]
+            results[name] = result
+    finally:
+        settings.FAST_LIST_READS = previous
+    return results
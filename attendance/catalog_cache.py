@@ -0,0 +1,97 @@
+# attendance/catalog_cache.py
+"""
+Server-side cached, conditional-GET responses for reference-data viewsets
+(ProjectDetail, Service).
+
+Each model has a version token in the Django cache, bumped by post_save /
+post_delete signals. Rendered list and detail bodies are cached under that
+version and the full request URL, scheme and host included (the pagination
+links are absolute), with a strong ETag (hash of the body) and the
+version's Last-Modified time. A client revalidating unchanged data costs
+two cache lookups and gets an empty 304. The version also expires after
+CATALOG_CACHE_TTL, which bounds staleness when the cache is per-process
+(LocMemCache) and another worker made the change.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+
+
+def _ttl():
+    return getattr(settings, "CATALOG_CACHE_TTL", 300)
+
+
+def _version_key(model):
+    return f"catalog_version:{model._meta.label_lower}"
+
+
+def bump_catalog_version(model):
+    """New version token; Last-Modified strictly increases so If-Modified-Since sees every change"""
+    previous = cache.get(_version_key(model))
+    last_modified = int(time.time())
+    if previous is not None and last_modified <= previous[1]:
+        last_modified = previous[1] + 1
+    version = (uuid.uuid4().hex[:12], last_modified)
+    cache.set(_version_key(model), version, _ttl())
+    return version
+
+
+def catalog_version(model):
+    """(token, last_modified timestamp) of the model's current data"""
+    version = cache.get(_version_key(model))
+    if version is None:
+        version = bump_catalog_version(model)
+    return version
+
+
+class ConditionalCatalogMixin:
+    """
+    ModelViewSet mixin: list / retrieve served from the catalog cache with
+    ETag / Last-Modified and 304 Not Modified. Only JSON responses are cached;
+    other renderers (browsable API) fall through to the normal handler.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        if not isinstance(request.accepted_renderer, JSONRenderer):
+            return handler(request, *args, **kwargs)
+
+        model = self.get_queryset().model
+        # Read the version before the data: a change racing with this request
+        # is stored under the old version and never served under the new one
+        token, last_modified = catalog_version(model)
+        url_hash = hashlib.sha1(
+            f"{request.build_absolute_uri()}|{request.accepted_media_type}".encode()
+        ).hexdigest()
+        key = f"catalog:{model._meta.label_lower}:{token}:{url_hash}"
+
+        entry = cache.get(key)
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            body = request.accepted_renderer.render(
+                response.data, request.accepted_media_type, self.get_renderer_context()
+            )
+            entry = (f"\"{hashlib.sha1(body).hexdigest()}\"", body)
+            cache.set(key, entry, _ttl())
+
+        etag, body = entry
+        response = HttpResponse(body, content_type=request.accepted_media_type)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        # Per-user auth in front of shared data: private caches only, always revalidate
+        response["Cache-Control"] = "private, no-cache"
+        return get_conditional_response(request._request, etag, last_modified, response)
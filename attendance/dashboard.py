@@ -0,0 +1,123 @@
+# attendance/dashboard.py
+"""
+Per-project sales dashboard: site visits by status and by visitor status,
+bookings by status and the sums of the booking amounts.
+
+All figures for any number of projects come from two grouped queries, one
+over SiteVisit and one over PropertyBooking, with a conditional COUNT or
+SUM per figure. Summaries are cached per project under a version token
+that visit, booking and project saves replace (see signals.py). The token
+is read before the data, so a summary computed while a save races with it
+is stored under the old token and never served. DASHBOARD_CACHE_TTL bounds
+staleness after writes that send no signals (queryset.update(),
+bulk_create()) and for per-process caches.
+"""
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, Q, Sum
+
+from .models import ProjectDetail, PropertyBooking, SiteVisit
+
+AMOUNT_FIELDS = ("total_amount", "advance_amount", "remaining_amount")
+ZERO_AMOUNT = Decimal("0.00")
+# A project's sum outgrows the per-booking max_digits=12
+AMOUNT_SUM_FIELD = DecimalField(max_digits=20, decimal_places=2)
+
+
+def _ttl():
+    return getattr(settings, "DASHBOARD_CACHE_TTL", 300)
+
+
+def _version_key(project_id):
+    return f"sales_dashboard_version:{project_id}"
+
+
+def invalidate(*project_ids):
+    """New version tokens for these projects: their cached summaries are never read again"""
+    cache.set_many({_version_key(pk): uuid.uuid4().hex[:12] for pk in project_ids if pk is not None}, _ttl())
+
+
+def _versions(project_ids):
+    keys = {pk: _version_key(pk) for pk in project_ids}
+    found = cache.get_many(keys.values())
+    versions = {pk: found.get(key) for pk, key in keys.items()}
+    missing = {keys[pk]: uuid.uuid4().hex[:12] for pk, version in versions.items() if version is None}
+    if missing:
+        cache.set_many(missing, _ttl())
+        versions.update({pk: missing[keys[pk]] for pk in project_ids if versions[pk] is None})
+    return versions
+
+
+def _counts_by(model, field):
+    """One conditional COUNT per choice of `field`, aliased "<field>_<value>" """
+    return {
+        f"{field}_{value}": Count("pk", filter=Q(**{field: value}))
+        for value, _ in model._meta.get_field(field).choices
+    }
+
+
+def _by_choice(row, model, field):
+    return {value: row.get(f"{field}_{value}", 0) for value, _ in model._meta.get_field(field).choices}
+
+
+def compute(projects):
+    """Summaries of {project id: project name}, in two grouped queries"""
+    visits = SiteVisit.objects.filter(project_id__in=list(projects)).values("project_id").annotate(
+        total=Count("pk"), **_counts_by(SiteVisit, "status"), **_counts_by(SiteVisit, "visitor_status"),
+    ).order_by()
+    bookings = PropertyBooking.objects.filter(project_id__in=list(projects)).values("project_id").annotate(
+        total=Count("pk"), **_counts_by(PropertyBooking, "booking_status"),
+        **{field: Sum(field, output_field=AMOUNT_SUM_FIELD) for field in AMOUNT_FIELDS},
+    ).order_by()
+    visit_rows = {row["project_id"]: row for row in visits}
+    booking_rows = {row["project_id"]: row for row in bookings}
+
+    summaries = {}
+    for pk, name in projects.items():
+        visit = visit_rows.get(pk, {})
+        booking = booking_rows.get(pk, {})
+        summaries[pk] = {
+            "project": pk,
+            "project_name": name,
+            "visits": {
+                "total": visit.get("total", 0),
+                "by_status": _by_choice(visit, SiteVisit, "status"),
+                "by_visitor_status": _by_choice(visit, SiteVisit, "visitor_status"),
+            },
+            "bookings": {
+                "total": booking.get("total", 0),
+                "by_status": _by_choice(booking, PropertyBooking, "booking_status"),
+                # strings with two decimals, as DRF renders DecimalField
+                **{field: str((booking.get(field) or ZERO_AMOUNT).quantize(ZERO_AMOUNT)) for field in AMOUNT_FIELDS},
+            },
+        }
+    return summaries
+
+
+def project_summaries(project_id=None):
+    """
+    Dashboard rows of every project (or of one; [] if it does not exist),
+    ordered like the project list. One query for the projects, two more on
+    a cache miss whatever the number of projects missed.
+    """
+    projects = ProjectDetail.objects.order_by("-created_at", "-id").values_list("id", "project_name")
+    if project_id is not None:
+        projects = projects.filter(pk=project_id)
+    projects = dict(projects)
+    if not projects:
+        return []
+
+    versions = _versions(list(projects))
+    keys = {pk: f"sales_dashboard:{pk}:{versions[pk]}" for pk in projects}
+    cached = cache.get_many(keys.values())
+    summaries = {pk: cached[key] for pk, key in keys.items() if key in cached}
+
+    missing = {pk: name for pk, name in projects.items() if pk not in summaries}
+    if missing:
+        computed = compute(missing)
+        cache.set_many({keys[pk]: summary for pk, summary in computed.items()}, _ttl())
+        summaries.update(computed)
+    return [summaries[pk] for pk in projects]
@@ -0,0 +1,106 @@
+# attendance/devices.py
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .models import Employee
+
+
+class DeviceBindingCache:
+    """
+    Per-process LRU of employee_id -> registered device_id (None when the
+    employee has no biometric registration). BiometricData signals invalidate
+    entries in the worker that made the change; the TTL bounds how long other
+    workers keep serving the old binding. employee_ids that match no employee
+    are never cached.
+    """
+
+    def __init__(self, maxsize=4096, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, employee_ids):
+        """Registered device per employee_id; every miss is loaded with one shared query"""
+        found = {}
+        missing = []
+        now = time.monotonic()
+        with self._lock:
+            for employee_id in set(employee_ids):
+                entry = self._data.get(employee_id)
+                if entry is not None and entry[0] > now:
+                    self._data.move_to_end(employee_id)
+                    found[employee_id] = entry[1]
+                    self.hits += 1
+                else:
+                    missing.append(employee_id)
+                    self.misses += 1
+            generation = self._generation
+
+        if missing:
+            # Employees without a registration come back with None (LEFT JOIN);
+            # unknown employee_ids do not come back at all and are not stored
+            loaded = dict(
+                Employee.objects.filter(
+                    employee_id__in=missing
+                ).values_list("employee_id", "biometric_data__device_id")
+            )
+            found.update(dict.fromkeys(missing))
+            found.update(loaded)
+            expires_at = time.monotonic() + self.ttl
+            with self._lock:
+                # Skip storing if a binding changed while we were reading
+                if generation == self._generation:
+                    for employee_id, device_id in loaded.items():
+                        self._data[employee_id] = (expires_at, device_id)
+                        self._data.move_to_end(employee_id)
+                    while len(self._data) > self.maxsize:
+                        self._data.popitem(last=False)
+        return found
+
+    def get(self, employee_id):
+        return self.get_many([employee_id])[employee_id]
+
+    def invalidate(self, employee_id):
+        with self._lock:
+            self._data.pop(employee_id, None)
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+            self.hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+binding_cache = DeviceBindingCache(
+    maxsize=getattr(settings, "DEVICE_BINDING_CACHE_SIZE", 4096),
+    ttl=getattr(settings, "DEVICE_BINDING_TTL_SECONDS", 60),
+)
+
+
+def device_policy():
+    """"reject" refuses scans from unregistered devices, "flag" records them with device_verified=False"""
+    return getattr(settings, "ATTENDANCE_DEVICE_POLICY", "flag")
+
+
+def is_registered_device(employee_id, device_id):
+    registered = binding_cache.get(employee_id)
+    return registered is not None and registered == device_id
@@ -0,0 +1,76 @@
+# attendance/exports.py
+import csv
+import json
+
+from django.utils import timezone
+
+from .models import Attendance
+
+EXPORT_FORMATS = ("csv", "jsonl")
+
+# (output column, ORM path) - Attendance joined with Employee and User in one query
+EXPORT_COLUMNS = [
+    ("employee_id", "employee__employee_id"),
+    ("first_name", "employee__user__first_name"),
+    ("last_name", "employee__user__last_name"),
+    ("mobile", "employee__mobile"),
+    ("date", "date"),
+    ("check_in_time", "check_in_time"),
+    ("check_in_latitude", "check_in_latitude"),
+    ("check_in_longitude", "check_in_longitude"),
+    ("check_in_site", "check_in_site__project_name"),
+    ("check_out_time", "check_out_time"),
+    ("check_out_latitude", "check_out_latitude"),
+    ("check_out_longitude", "check_out_longitude"),
+    ("check_out_site", "check_out_site__project_name"),
+    ("scan_type", "scan_type"),
+    ("device_id", "device_id"),
+    ("device_verified", "device_verified"),
+    ("status", "status"),
+]
+
+CHUNK_SIZE = 2000
+
+
+def export_rows(date_from, date_to):
+    """Attendance rows in [date_from, date_to] as tuples, fetched CHUNK_SIZE at a time"""
+    return Attendance.objects.filter(
+        date__gte=date_from, date__lte=date_to
+    ).order_by("date", "id").values_list(
+        *[path for _, path in EXPORT_COLUMNS]
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _format_value(value):
+    if hasattr(value, "tzinfo") and value.tzinfo is not None:
+        return timezone.localtime(value).isoformat()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+class _Echo:
+    """File-like object whose write() hands the line back instead of storing it"""
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow([_format_value(value) for value in row])
+
+
+def jsonl_lines(rows):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, map(_format_value, row)))) + "\n"
+
+
+def export_lines(date_from, date_to, export_format="csv"):
+    """Lazily render the export; memory stays flat regardless of the row count"""
+    rows = export_rows(date_from, date_to)
+    if export_format == "jsonl":
+        return jsonl_lines(rows)
+    return csv_lines(rows)
@@ -0,0 +1,165 @@
+# attendance/fast_read.py
+"""
+Serializer-free read path for the large list endpoints (site visits,
+property bookings, employee reports), enabled with settings.FAST_LIST_READS.
+
+A ModelSerializer builds every row by walking its fields, resolving each
+source through get_attribute() and calling to_representation(). Here the
+list query fetches only the columns the serializer reads, with values(),
+and a converter compiled once per serializer class shapes each row: a
+list of (key, column, convert) where convert is None for values that
+render as the serializer would (ints, floats, strings, FK ids), an inlined
+copy of DRF's ISO 8601 output for datetimes (the current time zone looked
+up once per list rather than per value) and the serializer field's own
+to_representation otherwise (dates, decimals). The rendered JSON therefore
+matches the serializer's byte for byte; attendance/tests.py checks it.
+"""
+import threading
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# Serializer fields whose to_representation() returns a database value unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.FloatField,
+    serializers.IntegerField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+# Placeholder convert for datetimes, bound to the current time zone per list
+LOCAL_ISO_DATETIME = object()
+
+
+def enabled():
+    return getattr(settings, "FAST_LIST_READS", False)
+
+
+def full_name(first_name_column, last_name_column):
+    """Computed column matching User.get_full_name()"""
+    def convert(row):
+        return f"{row[first_name_column]} {row[last_name_column]}".strip()
+
+    convert.columns = (first_name_column, last_name_column)
+    return convert
+
+
+class RowConverter:
+    """values() columns of a serializer's output, and the function from a values() row to its output"""
+
+    def __init__(self, serializer_class, computed=None):
+        computed = computed or {}
+        model = serializer_class.Meta.model
+        self.columns = []
+        self.plan = []  # (key, column or None for computed, convert)
+        for field in serializer_class()._readable_fields:
+            if field.field_name in computed:
+                convert = computed[field.field_name]
+                self.columns.extend(convert.columns)
+                self.plan.append((field.field_name, None, convert))
+                continue
+            column = self._column(model, field)
+            if isinstance(field, PASSTHROUGH_FIELDS):
+                convert = None
+            elif self._is_local_iso_datetime(field):
+                convert = LOCAL_ISO_DATETIME
+            else:
+                convert = field.to_representation
+            self.columns.append(column)
+            self.plan.append((field.field_name, column, convert))
+
+    @staticmethod
+    def _column(model, field):
+        """values() lookup for the field's source, following relations: "project.project_name" -> "project__project_name" """
+        path = field.source_attrs
+        for depth, attr in enumerate(path):
+            try:
+                model_field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    f"{field.parent.__class__.__name__}.{field.field_name}: source '{field.source}' "
+                    f"is not a model field; give it a computed column"
+                )
+            if depth < len(path) - 1:
+                model = model_field.related_model
+        return "__".join(path)
+
+    @staticmethod
+    def _is_local_iso_datetime(field):
+        """DateTimeField rendered by DRF as ISO 8601 in the current time zone"""
+        return (
+            isinstance(field, serializers.DateTimeField)
+            and (getattr(field, "format", api_settings.DATETIME_FORMAT) or "").lower() == ISO_8601
+            and not hasattr(field, "timezone")
+            and settings.USE_TZ
+        )
+
+    def convert_many(self, rows):
+        current = timezone.get_current_timezone()
+
+        def iso_datetime(value):
+            # DateTimeField.to_representation() for an aware value
+            value = value.astimezone(current).isoformat()
+            return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+        plan = [
+            (key, column, iso_datetime if convert is LOCAL_ISO_DATETIME else convert)
+            for key, column, convert in self.plan
+        ]
+        return [self._convert(row, plan) for row in rows]
+
+    @staticmethod
+    def _convert(row, plan):
+        output = {}
+        for key, column, convert in plan:
+            if column is None:
+                output[key] = convert(row)
+                continue
+            value = row[column]
+            # Serializer.to_representation() never converts None either
+            output[key] = value if convert is None or value is None else convert(value)
+        return output
+
+
+_converters = {}
+_converters_lock = threading.Lock()
+
+
+def get_converter(serializer_class, computed=None):
+    converter = _converters.get(serializer_class)
+    if converter is None:
+        with _converters_lock:
+            converter = _converters.get(serializer_class)
+            if converter is None:
+                converter = _converters[serializer_class] = RowConverter(serializer_class, computed)
+    return converter
+
+
+class FastListMixin:
+    """
+    ModelViewSet mixin: with FAST_LIST_READS on, list() renders values() rows
+    through the compiled converter instead of the serializer. Only JSON
+    responses take this path; the browsable API keeps the serializer.
+    `fast_list_computed` maps serializer fields whose source is not a model
+    field to computed columns (see full_name()).
+    """
+    fast_list_computed = {}
+
+    def list(self, request, *args, **kwargs):
+        if not enabled() or not isinstance(request.accepted_renderer, JSONRenderer):
+            return super().list(request, *args, **kwargs)
+
+        converter = get_converter(self.get_serializer_class(), self.fast_list_computed)
+        queryset = self.filter_queryset(self.get_queryset()).values(*converter.columns)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(converter.convert_many(page))
+        return Response(converter.convert_many(queryset))
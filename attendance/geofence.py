@@ -0,0 +1,124 @@
+# attendance/geofence.py
+import math
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from .models import ProjectDetail
+
+EARTH_RADIUS_M = 6371000.0
+METRES_PER_DEGREE = 111320.0
+
+# Grid cell edge in degrees (~1.1 km of latitude)
+CELL_DEGREES = 0.01
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def _cell(lat, lon):
+    return (math.floor(lat / CELL_DEGREES), math.floor(lon / CELL_DEGREES))
+
+
+class GeofenceIndex:
+    """
+    In-memory grid of project sites.
+
+    Each site is registered in every grid cell its circle's bounding box
+    touches, so a lookup is one dict probe plus a distance check against the
+    handful of sites sharing the point's cell - independent of the total
+    number of sites.
+    """
+
+    def __init__(self, sites):
+        # sites: iterable of (pk, latitude, longitude, radius in metres)
+        self._cells = defaultdict(list)
+        self.size = 0
+        for pk, lat, lon, radius in sites:
+            self.add(pk, lat, lon, radius)
+
+    def add(self, pk, lat, lon, radius):
+        d_lat = radius / METRES_PER_DEGREE
+        d_lon = radius / (METRES_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        min_row, min_col = _cell(lat - d_lat, lon - d_lon)
+        max_row, max_col = _cell(lat + d_lat, lon + d_lon)
+        site = (pk, lat, lon, radius)
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                self._cells[(row, col)].append(site)
+        self.size += 1
+
+    def match(self, lat, lon):
+        """pk of the nearest site whose radius contains the point, or None (off-site)"""
+        best_pk, best_distance = None, None
+        for pk, site_lat, site_lon, radius in self._cells.get(_cell(lat, lon), ()):
+            distance = haversine_m(lat, lon, site_lat, site_lon)
+            if distance <= radius and (best_distance is None or distance < best_distance):
+                best_pk, best_distance = pk, distance
+        return best_pk
+
+    @classmethod
+    def from_db(cls):
+        return cls(
+            ProjectDetail.objects.filter(
+                latitude__isnull=False, longitude__isnull=False
+            ).values_list("pk", "latitude", "longitude", "geofence_radius")
+        )
+
+
+_index = None
+_built_at = 0.0
+_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Per-process index, rebuilt after invalidate() (ProjectDetail signals) or
+    once GEOFENCE_REFRESH_SECONDS pass, which covers edits made by other workers.
+    """
+    global _index, _built_at
+    ttl = getattr(settings, "GEOFENCE_REFRESH_SECONDS", 300)
+    index = _index
+    if index is not None and time.monotonic() - _built_at < ttl:
+        return index
+    with _lock:
+        if _index is None or time.monotonic() - _built_at >= ttl:
+            _index = GeofenceIndex.from_db()
+            _built_at = time.monotonic()
+        return _index
+
+
+def invalidate():
+    global _index
+    _index = None
+
+
+def match_sites(points):
+    """
+    Project site (pk) containing each (lat, lon); None when off-site or no coordinates.
+    The hits are checked against the database in one query: an index built before
+    another worker deleted a project rebuilds and matches again, so the pk stored
+    with a scan always exists. Call inside the transaction that stores it.
+    """
+    def lookup(index):
+        return [None if lat is None or lon is None else index.match(lat, lon) for lat, lon in points]
+
+    sites = lookup(get_index())
+    hits = {pk for pk in sites if pk is not None}
+    if hits and ProjectDetail.objects.filter(pk__in=hits).count() < len(hits):
+        invalidate()
+        sites = lookup(get_index())
+    return sites
+
+
+def match_site(lat, lon):
+    """match_sites() for one scan"""
+    return match_sites([(lat, lon)])[0]
@@ -0,0 +1,108 @@
+# attendance/leads.py
+"""
+Visitor leads: site visits and bookings linked by the canonical form of
+visitor_mobile.
+
+canonical_phone() reduces the numbers staff type in ("+91 98220 12345",
+"098220-12345", "9822012345") to one key: the digits, with the country
+code or trunk 0 dropped from Indian mobile numbers. Rows are linked to
+their Lead when saved (signals.py); rows written before leads existed, or
+with bulk_create() / update(), are linked by `manage.py backfill_leads`.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import Prefetch, prefetch_related_objects
+
+from .models import Lead, PropertyBooking, SiteVisit
+
+COUNTRY_CODE = "91"
+NATIONAL_NUMBER_LENGTH = 10
+MAX_PHONE_DIGITS = 15  # E.164
+_NON_DIGITS = re.compile(r"\D")
+
+
+def canonical_phone(raw):
+    """Canonical phone number of free text, or None if it cannot be one"""
+    digits = _NON_DIGITS.sub("", raw or "")
+    for prefix in (f"00{COUNTRY_CODE}", COUNTRY_CODE, "0"):
+        if len(digits) == NATIONAL_NUMBER_LENGTH + len(prefix) and digits.startswith(prefix):
+            digits = digits[len(prefix):]
+            break
+    if not digits or len(digits) > MAX_PHONE_DIGITS:
+        return None
+    return digits
+
+
+def lead_for(raw):
+    """The Lead of a visitor_mobile value (created on first sight), or None"""
+    phone = canonical_phone(raw)
+    if phone is None:
+        return None
+    lead, _ = Lead.objects.get_or_create(phone=phone)
+    return lead
+
+
+def history_prefetches():
+    """A lead's visits (newest first) and bookings (latest booking date first), as lists"""
+    return [
+        Prefetch(
+            "site_visits",
+            queryset=SiteVisit.objects.select_related("employee__user", "project").order_by("-created_at", "-id"),
+            to_attr="visit_history",
+        ),
+        Prefetch(
+            "bookings",
+            queryset=PropertyBooking.objects.order_by("-booking_date", "-id"),
+            to_attr="booking_history",
+        ),
+    ]
+
+
+def lookup(raw_numbers):
+    """
+    {canonical phone: Lead with visit_history / booking_history} for the
+    numbers that have a lead. Three queries (a unique-index probe for the
+    leads, then their visits and bookings by lead_id) per chunk of the
+    backend's bind-parameter limit.
+    """
+    phones = sorted({phone for phone in map(canonical_phone, raw_numbers) if phone is not None})
+    chunk_size = connection.features.max_query_params
+    found = {}
+    for start in range(0, len(phones), chunk_size):
+        leads = list(Lead.objects.filter(phone__in=phones[start:start + chunk_size]))
+        prefetch_related_objects(leads, *history_prefetches())
+        found.update((lead.phone, lead) for lead in leads)
+    return found
+
+
+def backfill(batch_size=500):
+    """
+    Link every visit and booking that has no lead yet, creating leads as
+    needed. Walks each table in pk order, batch_size rows at a time: per
+    batch, the rows, the known phone numbers, one INSERT of the new ones,
+    their ids and one bulk UPDATE. Safe to re-run. Returns (leads created,
+    rows linked).
+    """
+    created = linked = 0
+    for model in (SiteVisit, PropertyBooking):
+        last_pk = 0
+        while True:
+            rows = list(
+                model.objects.filter(pk__gt=last_pk, lead__isnull=True)
+                .order_by("pk").values_list("pk", "visitor_mobile")[:batch_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            phones = {pk: canonical_phone(mobile) for pk, mobile in rows}
+            wanted = set(phones.values()) - {None}
+            with transaction.atomic():
+                known = set(Lead.objects.filter(phone__in=wanted).values_list("phone", flat=True))
+                Lead.objects.bulk_create([Lead(phone=phone) for phone in wanted - known], ignore_conflicts=True)
+                created += len(wanted - known)
+                lead_ids = dict(Lead.objects.filter(phone__in=wanted).values_list("phone", "id"))
+                updates = [model(pk=pk, lead_id=lead_ids[phone]) for pk, phone in phones.items() if phone]
+                model.objects.bulk_update(updates, ["lead"])
+                linked += len(updates)
+    return created, linked
@@ -0,0 +1,17 @@
+# attendance/management/commands/backfill_leads.py
+from django.core.management.base import BaseCommand
+from attendance.leads import backfill
+
+class Command(BaseCommand):
+    help = "Link existing site visits and property bookings to leads by canonical phone number"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500,
+            help="Rows read and updated per transaction (default: 500)",
+        )
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write("Backfilling leads...")
+        created, linked = backfill(batch_size=kwargs["batch_size"])
+        self.stdout.write(f"Backfill completed. {created} lead(s) created, {linked} row(s) linked.")
@@ -0,0 +1,156 @@
+# attendance/management/commands/benchmark_api.py
+import importlib
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.urls import clear_url_caches
+
+from attendance import benchmark, report_buffer
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database, drive a mix of API calls from concurrent clients "
+        "against a local server and report latency, throughput and SQL queries per endpoint"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--employees", type=int, default=200)
+        parser.add_argument("--projects", type=int, default=20)
+        parser.add_argument("--visits", type=int, default=1000)
+        parser.add_argument("--bookings", type=int, default=1000)
+        parser.add_argument("--history-days", type=int, default=30, help="Closed attendance days per employee")
+        parser.add_argument("--clients", type=int, default=8, help="Concurrent clients")
+        parser.add_argument("--requests", type=int, default=2000, help="Total requests (ignored with --duration)")
+        parser.add_argument("--duration", type=float, default=0, help="Run for this many seconds instead")
+        parser.add_argument(
+            "--mix", default=",".join(f"{name}={weight}" for name, weight in benchmark.DEFAULT_MIX.items()),
+            help="Weighted endpoint mix, e.g. login=5,check_in=10,report=40,site_visits=25,full_data=20,missed_reports=0",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for data and request mix")
+        parser.add_argument("--database", help="Scratch SQLite file (default: a temporary file)")
+        parser.add_argument("--keep-database", action="store_true", help="Do not delete the scratch database")
+        parser.add_argument("--output", default="benchmark_results.json", help="Machine-readable results file")
+        parser.add_argument(
+            "--sqlite-defaults", action="store_true",
+            help="Drop the DATABASES OPTIONS / CONN_MAX_AGE tuning (rollback-journal baseline for comparison)",
+        )
+        parser.add_argument(
+            "--server", choices=["wsgi", "asgi"], default="wsgi",
+            help="Threaded WSGI server over HTTP, or concurrent coroutines calling the ASGI application",
+        )
+        parser.add_argument(
+            "--async-views", action="store_true",
+            help="Route check-in, check-out, reports and missed reports to the async views",
+        )
+        parser.add_argument(
+            "--report-write-behind", action="store_true",
+            help="Queue report inserts through the write-behind buffer (spooled next to the scratch database)",
+        )
+
+    def handle(self, *args, **options):
+        mix = self.parse_mix(options["mix"])
+        database = options["database"] or os.path.join(tempfile.mkdtemp(prefix="attendance-bench-"), "bench.sqlite3")
+        if os.path.exists(database):
+            raise CommandError(f"{database} already exists; the benchmark only runs on a fresh scratch database")
+
+        benchmark.use_scratch_database(database, tuned=not options["sqlite_defaults"])
+        # Every benchmark client shares one IP; the login throttle would turn the mix into 429s
+        settings.LOGIN_THROTTLE_RATES = {}
+        settings.REPORT_WRITE_BEHIND = options["report_write_behind"]
+        settings.REPORT_SPOOL_DIR = os.path.join(os.path.dirname(database), "spool")
+        self.use_view_mode(options["async_views"])
+        try:
+            self.stdout.write(f"Migrating scratch database {database}...")
+            call_command("migrate", verbosity=0, interactive=False)
+
+            self.stdout.write("Seeding data...")
+            checked_in, waiting = benchmark.seed(
+                employees=options["employees"], projects=options["projects"],
+                visits=options["visits"], bookings=options["bookings"],
+                history_days=options["history_days"], rng=random.Random(options["seed"]),
+            )
+            workload = benchmark.Workload(
+                checked_in, waiting, mix, options["requests"], options["duration"], seed=options["seed"],
+            )
+            connections.close_all()
+
+            self.stdout.write(f"Running with {options['clients']} client(s) over {options['server'].upper()}...")
+            if options["server"] == "asgi":
+                summary = benchmark.run_asgi(workload, options["clients"])
+            else:
+                summary = benchmark.run(workload, options["clients"])
+        finally:
+            if options["report_write_behind"]:
+                report_buffer.get_buffer().stop()
+            connections.close_all()
+            if not options["keep_database"]:
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(database + suffix):
+                        os.remove(database + suffix)
+                shutil.rmtree(settings.REPORT_SPOOL_DIR, ignore_errors=True)
+
+        results = {
+            "config": {
+                key: options[key] for key in (
+                    "employees", "projects", "visits", "bookings", "history_days",
+                    "clients", "requests", "duration", "seed", "server", "async_views", "report_write_behind",
+                )
+            },
+            "mix": mix,
+            "environment": {
+                "python": platform.python_version(),
+                "database_engine": settings.DATABASES["default"]["ENGINE"],
+                "database_options": settings.DATABASES["default"].get("OPTIONS", {}),
+                "conn_max_age": settings.DATABASES["default"].get("CONN_MAX_AGE", 0),
+            },
+            **summary,
+        }
+        with open(options["output"], "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+        self.print_table(summary)
+        self.stdout.write(f"Results written to {options['output']}")
+
+    def parse_mix(self, value):
+        mix = {}
+        for part in value.split(","):
+            name, _, weight = part.partition("=")
+            name = name.strip()
+            if name not in benchmark.DEFAULT_MIX:
+                raise CommandError(f"Unknown endpoint '{name}' in --mix (known: {', '.join(benchmark.DEFAULT_MIX)})")
+            try:
+                mix[name] = float(weight)
+            except ValueError:
+                raise CommandError(f"Invalid weight for '{name}' in --mix")
+        return mix
+
+    def use_view_mode(self, async_views):
+        """Apply ATTENDANCE_ASYNC_VIEWS, reloading the URLconf if it was already imported"""
+        settings.ATTENDANCE_ASYNC_VIEWS = async_views
+        for module in ("attendance.urls", settings.ROOT_URLCONF):
+            if module in sys.modules:
+                importlib.reload(sys.modules[module])
+        clear_url_caches()
+
+    def print_table(self, summary):
+        header = f"{'endpoint':<12} {'reqs':>6} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        rows = list(summary["endpoints"].items()) + [("TOTAL", summary["total"])]
+        for name, stats in rows:
+            queries = stats.get("queries_avg")
+            self.stdout.write(
+                f"{name:<12} {stats['requests']:>6} {stats.get('errors', ''):>5} {stats['rps']:>8} "
+                f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8} "
+                f"{'' if queries is None else queries:>8}"
+            )
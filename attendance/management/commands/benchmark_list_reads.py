@@ -0,0 +1,80 @@
+# attendance/management/commands/benchmark_list_reads.py
+import json
+import os
+import random
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from attendance import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database and measure rows per second through the site-visit, "
+        "property-booking and report lists, with the serializers and with FAST_LIST_READS"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--employees", type=int, default=50)
+        parser.add_argument("--projects", type=int, default=20)
+        parser.add_argument("--visits", type=int, default=5000)
+        parser.add_argument("--bookings", type=int, default=5000)
+        parser.add_argument("--reports", type=int, default=5000, help="Reports on the measured employee's session")
+        parser.add_argument("--page-size", type=int, default=settings.API_MAX_PAGE_SIZE)
+        parser.add_argument("--rounds", type=int, default=3, help="Full walks of every list per path")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for the data")
+        parser.add_argument("--database", help="Scratch SQLite file (default: a temporary file)")
+        parser.add_argument("--keep-database", action="store_true", help="Do not delete the scratch database")
+        parser.add_argument("--output", default="list_read_results.json", help="Machine-readable results file")
+
+    def handle(self, *args, **options):
+        database = options["database"] or os.path.join(tempfile.mkdtemp(prefix="attendance-bench-"), "bench.sqlite3")
+        if os.path.exists(database):
+            raise CommandError(f"{database} already exists; the benchmark only runs on a fresh scratch database")
+
+        benchmark.use_scratch_database(database)
+        try:
+            self.stdout.write(f"Migrating scratch database {database}...")
+            call_command("migrate", verbosity=0, interactive=False)
+
+            self.stdout.write("Seeding data...")
+            checked_in, _ = benchmark.seed(
+                employees=options["employees"], projects=options["projects"],
+                visits=options["visits"], bookings=options["bookings"],
+                history_days=1, rng=random.Random(options["seed"]),
+            )
+            employee = checked_in[0]
+            benchmark.seed_reports(employee, options["reports"])
+
+            self.stdout.write(f"Walking every list {options['rounds']} time(s) per path...")
+            results = benchmark.run_list_reads(employee.user, options["page_size"], options["rounds"])
+        finally:
+            connections.close_all()
+            if not options["keep_database"]:
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(database + suffix):
+                        os.remove(database + suffix)
+
+        with open(options["output"], "w", encoding="utf-8") as handle:
+            json.dump({
+                "config": {
+                    key: options[key] for key in (
+                        "employees", "projects", "visits", "bookings", "reports", "page_size", "rounds", "seed",
+                    )
+                },
+                "endpoints": results,
+            }, handle, indent=2)
+
+        header = f"{'endpoint':<18} {'rows':>6} {'serializer rows/s':>18} {'fast rows/s':>12} {'speedup':>8} {'identical':>10}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<18} {result['rows']:>6} {result['serializer_rows_per_s']:>18} "
+                f"{result['fast_rows_per_s']:>12} {result['speedup']:>8} {'yes' if result['identical'] else 'NO':>10}"
+            )
+        self.stdout.write(f"Results written to {options['output']}")
@@ -1,11 +1,30 @@
 # attendance/management/commands/check_missing_reports.py
 from django.core.management.base import BaseCommand
 from attendance.utils import check_missing_reports
+from attendance.scheduler import ReportDeadlineScheduler
 
 class Command(BaseCommand):
     help = "Check for employees who missed half-hourly reports"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--daemon", action="store_true",
+            help="Keep running and alert as soon as each session's report deadline expires",
+        )
+        parser.add_argument(
+            "--poll-interval", type=int, default=60,
+            help="Seconds between polls for new check-ins in daemon mode (default: 60)",
+        )
+
     def handle(self, *args, **kwargs):
+        if kwargs["daemon"]:
+            scheduler = ReportDeadlineScheduler(poll_interval=kwargs["poll_interval"], stdout=self.stdout)
+            try:
+                scheduler.run()
+            except KeyboardInterrupt:
+                self.stdout.write("Scheduler stopped.")
+            return
+
         self.stdout.write("Running missing report check...")
-        check_missing_reports()
-        self.stdout.write("Check completed.")
+        overdue = check_missing_reports()
+        self.stdout.write(f"Check completed. {len(overdue)} session(s) overdue.")
@@ -0,0 +1,37 @@
+# attendance/management/commands/export_attendance.py
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from attendance.exports import EXPORT_FORMATS, export_lines
+
+class Command(BaseCommand):
+    help = "Stream attendance for a date range to a CSV or JSONL file (for payroll)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="date_from", required=True, help="First date (YYYY-MM-DD)")
+        parser.add_argument("--to", dest="date_to", required=True, help="Last date (YYYY-MM-DD)")
+        parser.add_argument("--format", dest="export_format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument("--output", help="File to write (default: stdout)")
+
+    def handle(self, *args, **kwargs):
+        try:
+            date_from = parse_date(kwargs["date_from"])
+            date_to = parse_date(kwargs["date_to"])
+        except ValueError:
+            date_from = date_to = None
+        if date_from is None or date_to is None:
+            raise CommandError("--from and --to must be dates in YYYY-MM-DD format")
+
+        lines = export_lines(date_from, date_to, kwargs["export_format"])
+        if not kwargs["output"]:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+
+        count = 0
+        with open(kwargs["output"], "w", newline="", encoding="utf-8") as handle:
+            for line in lines:
+                handle.write(line)
+                count += 1
+        if kwargs["export_format"] == "csv":
+            count -= 1  # header
+        self.stdout.write(f"Export completed. {count} row(s) written to {kwargs['output']}.")
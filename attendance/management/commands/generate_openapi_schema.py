@@ -0,0 +1,21 @@
+# attendance/management/commands/generate_openapi_schema.py
+from django.core.management.base import BaseCommand
+
+from attendance_project import openapi
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the OpenAPI schema to versioned files (openapi.<version>.json/.yaml and "
+        "manifest.json) for serving without live drf_yasg generation"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output-dir", help="Default: settings.OPENAPI_SCHEMA_DIR")
+
+    def handle(self, *args, **options):
+        directory = options["output_dir"] or openapi.schema_dir()
+        manifest = openapi.write_schema_files(directory)
+        for name in manifest["files"].values():
+            self.stdout.write(f"Wrote {directory}/{name}")
+        self.stdout.write(self.style.SUCCESS(f"Schema version {manifest['version']}"))
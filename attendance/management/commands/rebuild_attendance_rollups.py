@@ -0,0 +1,11 @@
+# attendance/management/commands/rebuild_attendance_rollups.py
+from django.core.management.base import BaseCommand
+from attendance.rollups import rebuild_rollups
+
+class Command(BaseCommand):
+    help = "Recompute the monthly attendance rollups from scratch"
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write("Rebuilding attendance rollups...")
+        count = rebuild_rollups()
+        self.stdout.write(f"Rebuild completed. {count} rollup(s) written.")
@@ -0,0 +1,16 @@
+# attendance/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+from attendance.search import rebuild
+
+class Command(BaseCommand):
+    help = "Refill the full-text search indexes of projects, site visits and property bookings"
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write("Rebuilding search indexes...")
+        indexed = rebuild()
+        if not indexed:
+            self.stdout.write("Nothing to do: full-text search indexes are SQLite only.")
+            return
+        for table, count in indexed.items():
+            self.stdout.write(f"{table}: {count} row(s) indexed.")
+        self.stdout.write("Rebuild completed.")
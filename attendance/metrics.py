@@ -0,0 +1,166 @@
+# attendance/metrics.py
+"""
+In-process request metrics, rendered in the Prometheus text format.
+
+MetricsMiddleware feeds one observation per request: the resolved URL name,
+HTTP method, status code, latency and the SQL queries it ran. Aggregates are
+plain counters per (view, method), so recording costs a dict lookup and a
+few additions under a lock. Every worker process keeps and exposes its own
+counters; Prometheus sums them across scrape targets.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds in seconds; +Inf is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+PREFIX = "attendance"
+
+
+# ----------------- SQL TRACKING -----------------
+# Counters of the active track_sql() blocks. A ContextVar rather than a
+# per-connection wrapper: async views run their queries on sync_to_async
+# threads (other connections), which still see the request's context.
+_sql_counters = ContextVar("attendance_sql_counters", default=())
+
+
+def count_sql(execute, sql, params, many, context):
+    """execute_wrapper installed on every connection (see install_sql_tracking)"""
+    counters = _sql_counters.get()
+    if not counters:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        for counter in counters:
+            counter[0] += 1
+            counter[1] += elapsed
+
+
+def install_sql_tracking(sender, connection, **kwargs):
+    """connection_created receiver"""
+    if count_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_sql)
+
+
+@contextmanager
+def track_sql():
+    """Yields [queries, seconds] for the SQL run in this context; blocks may nest"""
+    counter = [0, 0.0]
+    token = _sql_counters.set(_sql_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _sql_counters.reset(token)
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class EndpointStats:
+    __slots__ = ("latency", "queries", "sql_seconds", "statuses")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.sql_seconds = 0.0
+        self.statuses = {}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}  # (view, method) -> EndpointStats
+
+    def observe(self, view, method, status, seconds, queries, sql_seconds):
+        key = (view, method)
+        with self._lock:
+            stats = self._endpoints.get(key)
+            if stats is None:
+                stats = self._endpoints[key] = EndpointStats()
+            stats.latency.observe(seconds)
+            stats.queries.observe(queries)
+            stats.sql_seconds += sql_seconds
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            snapshot = sorted(self._endpoints.items())
+            lines = []
+            self._render_histogram(
+                lines, f"{PREFIX}_http_request_duration_seconds",
+                "Request latency by URL name and method", snapshot, "latency",
+            )
+            self._render_histogram(
+                lines, f"{PREFIX}_db_queries_per_request",
+                "SQL queries per request by URL name and method", snapshot, "queries",
+            )
+
+            name = f"{PREFIX}_http_requests_total"
+            lines.append(f"# HELP {name} Responses by URL name, method and status code")
+            lines.append(f"# TYPE {name} counter")
+            for (view, method), stats in snapshot:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f"{name}{{{_labels(view, method)},status=\"{status}\"}} {count}")
+
+            name = f"{PREFIX}_db_queries_total"
+            lines.append(f"# HELP {name} SQL queries executed by URL name and method")
+            lines.append(f"# TYPE {name} counter")
+            for (view, method), stats in snapshot:
+                lines.append(f"{name}{{{_labels(view, method)}}} {stats.queries.sum}")
+
+            name = f"{PREFIX}_db_query_seconds_total"
+            lines.append(f"# HELP {name} Time spent executing SQL by URL name and method")
+            lines.append(f"# TYPE {name} counter")
+            for (view, method), stats in snapshot:
+                lines.append(f"{name}{{{_labels(view, method)}}} {stats.sql_seconds:.6f}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(lines, name, help_text, snapshot, attribute):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for (view, method), stats in snapshot:
+            histogram = getattr(stats, attribute)
+            labels = _labels(view, method)
+            cumulative = 0
+            for bound, count in zip(histogram.bounds + (None,), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound is None else repr(bound)
+                lines.append(f"{name}_bucket{{{labels},le=\"{le}\"}} {cumulative}")
+            lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(view, method):
+    return f"view=\"{_escape(view)}\",method=\"{_escape(method)}\""
+
+
+registry = MetricsRegistry()
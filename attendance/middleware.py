@@ -0,0 +1,81 @@
+# attendance/middleware.py
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .metrics import registry, track_sql
+
+UNRESOLVED_VIEW = "<unresolved>"
+# Anything else is recorded as OTHER, so clients cannot create label values at will
+KNOWN_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+
+class MetricsMiddleware:
+    """
+    Times every request and counts the SQL it runs (through the execute_wrapper
+    installed on every connection), then records both under the resolved URL
+    name. Place it first in MIDDLEWARE so the timing covers the other
+    middleware. Runs natively under WSGI and ASGI. Queries run while a
+    StreamingHttpResponse is consumed happen after this returns and are not
+    counted.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with track_sql() as sql:
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, sql)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with track_sql() as sql:
+            response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, sql)
+        return response
+
+    @staticmethod
+    def record(request, response, elapsed, sql):
+        match = request.resolver_match
+        view = match.view_name if match is not None else UNRESOLVED_VIEW
+        method = request.method if request.method in KNOWN_METHODS else "OTHER"
+        registry.observe(view, method, response.status_code, elapsed, sql[0], sql[1])
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that can also run as async middleware. The stock class is
+    sync-only, so under ASGI Django would run everything below it (async
+    views included) on a worker thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
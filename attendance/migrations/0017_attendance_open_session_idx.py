@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0016_alter_attendance_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(condition=models.Q(('check_out_time__isnull', True)), fields=['employee', 'check_in_time'], name='attendance_open_session_idx'),
+        ),
+    ]
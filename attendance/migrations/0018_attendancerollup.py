@@ -0,0 +1,70 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:07
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_rollups(apps, schema_editor):
+    # Without this every month reads 0 present days until rebuild_attendance_rollups runs.
+    # The grouped query of attendance.rollups, written against the models as of this migration.
+    Attendance = apps.get_model("attendance", "Attendance")
+    AttendanceRollup = apps.get_model("attendance", "AttendanceRollup")
+    db_alias = schema_editor.connection.alias
+    late_after = getattr(settings, "ATTENDANCE_LATE_AFTER", datetime.time(10, 0))
+
+    rows = Attendance.objects.using(db_alias).filter(check_in_time__isnull=False).annotate(
+        month=TruncMonth("date")
+    ).values("employee_id", "month").annotate(
+        present_days=Count("id"),
+        worked_time=Sum(
+            ExpressionWrapper(F("check_out_time") - F("check_in_time"), output_field=DurationField()),
+            filter=Q(check_out_time__isnull=False),
+        ),
+        late_arrivals=Count("id", filter=Q(check_in_time__time__gt=late_after)),
+        missing_checkouts=Count("id", filter=Q(check_out_time__isnull=True)),
+    ).order_by()
+
+    AttendanceRollup.objects.using(db_alias).bulk_create([
+        AttendanceRollup(
+            employee_id=row["employee_id"],
+            month=row["month"],
+            present_days=row["present_days"],
+            worked_time=row["worked_time"] or datetime.timedelta(),
+            late_arrivals=row["late_arrivals"],
+            missing_checkouts=row["missing_checkouts"],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0017_attendance_open_session_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('present_days', models.PositiveIntegerField(default=0)),
+                ('worked_time', models.DurationField(default=datetime.timedelta)),
+                ('late_arrivals', models.PositiveIntegerField(default=0)),
+                ('missing_checkouts', models.IntegerField(default=0, help_text='Sessions without a check-out (includes open ones)')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='attendance.employee')),
+            ],
+            options={
+                'verbose_name': 'Attendance Rollup',
+                'verbose_name_plural': 'Attendance Rollups',
+                'ordering': ['-month'],
+                'unique_together': {('employee', 'month')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
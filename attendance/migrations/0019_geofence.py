@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0018_attendancerollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='check_in_site',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='check_ins', to='attendance.projectdetail'),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='check_out_site',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='check_outs', to='attendance.projectdetail'),
+        ),
+        migrations.AddField(
+            model_name='projectdetail',
+            name='geofence_radius',
+            field=models.PositiveIntegerField(default=200, help_text='Radius in metres'),
+        ),
+        migrations.AddField(
+            model_name='projectdetail',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectdetail',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0019_geofence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='device_verified',
+            field=models.BooleanField(default=True),
+        ),
+    ]
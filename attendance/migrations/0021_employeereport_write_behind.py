@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:25
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0020_attendance_device_verified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employeereport',
+            name='spool_id',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='employeereport',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0021_employeereport_write_behind'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employeereport',
+            index=models.Index(fields=['employee', 'created_at', 'id'], name='report_emp_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeservicestatus',
+            index=models.Index(fields=['created_at', 'id'], name='servicestatus_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectdetail',
+            index=models.Index(fields=['created_at', 'id'], name='project_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertybooking',
+            index=models.Index(fields=['booking_date', 'id'], name='booking_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['name', 'id'], name='service_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sitevisit',
+            index=models.Index(fields=['created_at', 'id'], name='sitevisit_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workdetail',
+            index=models.Index(fields=['created_at', 'id'], name='workdetail_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workplan',
+            index=models.Index(fields=['created_at', 'id'], name='workplan_created_id_idx'),
+        ),
+    ]
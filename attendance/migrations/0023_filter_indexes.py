@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0022_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'id'], name='attendance_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeereport',
+            index=models.Index(fields=['attendance', 'created_at'], name='report_att_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertybooking',
+            index=models.Index(fields=['employee', 'booking_date', 'id'], name='booking_emp_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertybooking',
+            index=models.Index(fields=['project', 'booking_date', 'id'], name='booking_proj_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propertybooking',
+            index=models.Index(fields=['booking_status', 'booking_date', 'id'], name='booking_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sitevisit',
+            index=models.Index(fields=['employee', 'created_at', 'id'], name='sitevisit_emp_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sitevisit',
+            index=models.Index(fields=['project', 'created_at', 'id'], name='sitevisit_proj_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sitevisit',
+            index=models.Index(fields=['visitor_status', 'created_at', 'id'], name='sitevisit_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0023_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='propertybooking',
+            index=models.Index(fields=['project', 'booking_status', 'total_amount', 'advance_amount', 'remaining_amount'], name='booking_dashboard_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sitevisit',
+            index=models.Index(fields=['project', 'status', 'visitor_status'], name='sitevisit_dashboard_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0024_sales_dashboard_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone', models.CharField(max_length=15, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Lead',
+                'verbose_name_plural': 'Leads',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='propertybooking',
+            name='lead',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='attendance.lead'),
+        ),
+        migrations.AddField(
+            model_name='sitevisit',
+            name='lead',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='site_visits', to='attendance.lead'),
+        ),
+    ]
@@ -0,0 +1,113 @@
+# Full-text search index (attendance/search.py): one FTS5 table per searchable
+# model, filled from a view that joins the searched columns, and triggers that
+# keep it in step with every write, including bulk_create() and update().
+# SQLite only; other backends keep the admin's icontains search.
+
+from django.db import migrations
+
+SEPARATOR = " || char(10) || "
+
+SOURCES = {
+    "attendance_projectdetail": (
+        "SELECT p.id, {body} AS body FROM attendance_projectdetail p",
+        ["p.project_name", "p.builder_name", "p.city", "p.state", "p.zipcode", "p.khasra_number"],
+    ),
+    "attendance_sitevisit": (
+        "SELECT v.id, {body} AS body FROM attendance_sitevisit v"
+        " JOIN attendance_employee e ON e.id = v.employee_id"
+        " JOIN auth_user u ON u.id = e.user_id"
+        " JOIN attendance_projectdetail p ON p.id = v.project_id",
+        ["v.visitor_name", "v.visitor_mobile", "v.visitor_address", "v.plot_number",
+         "u.first_name", "u.last_name", "p.project_name"],
+    ),
+    "attendance_propertybooking": (
+        "SELECT b.id, {body} AS body FROM attendance_propertybooking b",
+        ["b.visitor_name", "b.visitor_mobile", "b.plot_number"],
+    ),
+}
+
+# Columns whose change re-indexes a row of the table itself
+WATCHED = {
+    "attendance_projectdetail": ["project_name", "builder_name", "city", "state", "zipcode", "khasra_number"],
+    "attendance_sitevisit": ["visitor_name", "visitor_mobile", "visitor_address", "plot_number",
+                             "employee_id", "project_id"],
+    "attendance_propertybooking": ["visitor_name", "visitor_mobile", "plot_number"],
+}
+
+# Site visits also index their employee's name and their project's name
+DEPENDENT_VISITS = {
+    "attendance_projectdetail": (["project_name"], "SELECT id FROM attendance_sitevisit WHERE project_id = new.id"),
+    "attendance_employee": (["user_id"], "SELECT id FROM attendance_sitevisit WHERE employee_id = new.id"),
+    "auth_user": (
+        ["first_name", "last_name"],
+        "SELECT v.id FROM attendance_sitevisit v JOIN attendance_employee e ON e.id = v.employee_id"
+        " WHERE e.user_id = new.id",
+    ),
+}
+
+
+def _changed(columns):
+    return " OR ".join(f"old.{column} IS NOT new.{column}" for column in columns)
+
+
+def _reindex(table, ids):
+    return (
+        f"DELETE FROM {table}_fts WHERE rowid IN ({ids}); "
+        f"INSERT INTO {table}_fts(rowid, body) SELECT id, body FROM {table}_search_source WHERE id IN ({ids});"
+    )
+
+
+def _forward_sql():
+    statements = []
+    for table, (select, columns) in SOURCES.items():
+        body = SEPARATOR.join(f"coalesce({column}, '')" for column in columns)
+        statements += [
+            f"CREATE VIEW {table}_search_source AS {select.format(body=body)}",
+            f"CREATE VIRTUAL TABLE {table}_fts USING fts5(body, tokenize = 'trigram')",
+            f"CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} BEGIN "
+            f"{_reindex(table, 'new.id')} END",
+            f"CREATE TRIGGER {table}_fts_update AFTER UPDATE ON {table} WHEN {_changed(WATCHED[table])} BEGIN "
+            f"{_reindex(table, 'new.id')} END",
+            f"CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM {table}_fts WHERE rowid = old.id; END",
+            f"INSERT INTO {table}_fts(rowid, body) SELECT id, body FROM {table}_search_source",
+        ]
+    for table, (columns, ids) in DEPENDENT_VISITS.items():
+        statements.append(
+            f"CREATE TRIGGER {table}_sitevisit_fts_update AFTER UPDATE ON {table} WHEN {_changed(columns)} BEGIN "
+            f"{_reindex('attendance_sitevisit', ids)} END"
+        )
+    return statements
+
+
+def _backward_sql():
+    statements = [f"DROP TRIGGER IF EXISTS {table}_sitevisit_fts_update" for table in DEPENDENT_VISITS]
+    for table in SOURCES:
+        statements += [
+            f"DROP TRIGGER IF EXISTS {table}_fts_{event}" for event in ("insert", "update", "delete")
+        ] + [
+            f"DROP TABLE IF EXISTS {table}_fts",
+            f"DROP VIEW IF EXISTS {table}_search_source",
+        ]
+    return statements
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for statement in statements():
+            schema_editor.execute(statement, params=None)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0025_leads'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(_forward_sql), _run(_backward_sql)),
+    ]
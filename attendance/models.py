@@ -5,6 +5,7 @@ import string
 from django.utils import timezone
 from django.db import models
 from django.core.exceptions import ValidationError
+from datetime import timedelta
 
 # ----------------- UTILITY -----------------
 
@@ -91,18 +92,65 @@ class Attendance(models.Model):
     check_out_longitude = models.FloatField(null=True, blank=True)
 
     scan_type = models.CharField(max_length=10, choices=[('face', 'Face'), ('finger', 'Fingerprint')])
-    date = models.DateField(auto_now_add=True)
+    date = models.DateField(default=timezone.localdate)  # set from the scan time for replayed (offline) events
 
     # 🔹 New fields
     device_id = models.CharField(max_length=255)  # Must match registered device (BiometricData.device_id)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
 
+    # False when a scan came from a device other than the registered one (see ATTENDANCE_DEVICE_POLICY)
+    device_verified = models.BooleanField(default=True)
+
+    # Geofence result: project site the scan fell inside, empty = off-site
+    check_in_site = models.ForeignKey(
+        "ProjectDetail", on_delete=models.SET_NULL, null=True, blank=True, related_name="check_ins"
+    )
+    check_out_site = models.ForeignKey(
+        "ProjectDetail", on_delete=models.SET_NULL, null=True, blank=True, related_name="check_outs"
+    )
+
     def __str__(self):
         return f"{self.employee.employee_id} - {self.date} ({self.status})"
 
     class Meta:
         ordering = ['-date']
         unique_together = ('employee', 'date')
+        indexes = [
+            # "Open session" lookups: check-out, report submission, missed-report scan
+            models.Index(
+                fields=["employee", "check_in_time"],
+                condition=models.Q(check_out_time__isnull=True),
+                name="attendance_open_session_idx",
+            ),
+            # date-range exports and scans, in (date, id) order
+            models.Index(fields=["date", "id"], name="attendance_date_id_idx"),
+        ]
+
+
+# ----------------- ATTENDANCE ROLLUP -----------------
+
+class AttendanceRollup(models.Model):
+    """Monthly attendance totals per employee, kept current by check-in / check-out"""
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="attendance_rollups")
+    month = models.DateField(help_text="First day of the month")
+
+    present_days = models.PositiveIntegerField(default=0)
+    worked_time = models.DurationField(default=timedelta)
+    late_arrivals = models.PositiveIntegerField(default=0)
+    missing_checkouts = models.IntegerField(default=0, help_text="Sessions without a check-out (includes open ones)")
+
+    class Meta:
+        verbose_name = "Attendance Rollup"
+        verbose_name_plural = "Attendance Rollups"
+        ordering = ["-month"]
+        unique_together = ("employee", "month")
+
+    def __str__(self):
+        return f"{self.employee.employee_id} - {self.month:%Y-%m}"
+
+    @property
+    def worked_minutes(self):
+        return int(self.worked_time.total_seconds() // 60)
 
 
 class ProjectDetail(models.Model):
@@ -127,6 +175,11 @@ class ProjectDetail(models.Model):
     state = models.CharField(max_length=100)
     zipcode = models.CharField(max_length=20)
 
+    # Geofence (check-in / check-out scans within the radius count as on-site)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geofence_radius = models.PositiveIntegerField(default=200, help_text="Radius in metres")
+
     # Project details
     number_of_units = models.PositiveIntegerField()
     launch_date = models.DateField(blank=True, null=True)
@@ -139,11 +192,32 @@ class ProjectDetail(models.Model):
         verbose_name = "Project Detail"
         verbose_name_plural = "Project Details"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="project_created_id_idx"),
+        ]
 
     def __str__(self):
         return f"{self.project_name} ({self.city}, {self.state})"
 
 
+# ----------------- LEAD -----------------
+class Lead(models.Model):
+    """
+    A visitor, identified by the canonical form of their phone number
+    (attendance.leads.canonical_phone). Site visits and bookings link to it
+    when saved, so a lead's history is an index probe instead of a text scan.
+    """
+    phone = models.CharField(max_length=15, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Lead"
+        verbose_name_plural = "Leads"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return self.phone
+
 
 class SiteVisit(models.Model):
     VISIT_STATUS_CHOICES = [
@@ -164,6 +238,10 @@ class SiteVisit(models.Model):
     project = models.ForeignKey(
         ProjectDetail, on_delete=models.CASCADE, related_name="site_visits"
     )
+    # set from visitor_mobile on save (signals.py)
+    lead = models.ForeignKey(
+        Lead, on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name="site_visits"
+    )
 
     # Visit info
     visit_date = models.DateField(blank=True, null=True)   # ✅ made optional
@@ -190,6 +268,16 @@ class SiteVisit(models.Model):
         verbose_name = "Site Visit"
         verbose_name_plural = "Site Visits"
         ordering = ["-visit_date", "-created_at"]
+        indexes = [
+            # keyset pagination of the list endpoint: (created_at, id)
+            models.Index(fields=["created_at", "id"], name="sitevisit_created_id_idx"),
+            # the list endpoint's ?employee= / ?project= / ?visitor_status= filters, same key
+            models.Index(fields=["employee", "created_at", "id"], name="sitevisit_emp_created_idx"),
+            models.Index(fields=["project", "created_at", "id"], name="sitevisit_proj_created_idx"),
+            models.Index(fields=["visitor_status", "created_at", "id"], name="sitevisit_status_created_idx"),
+            # sales dashboard: per-project counts from the index alone
+            models.Index(fields=["project", "status", "visitor_status"], name="sitevisit_dashboard_idx"),
+        ]
 
     def __str__(self):
         return f"{self.visitor_name} - {self.project.project_name} ({self.visit_date})"
@@ -215,6 +303,10 @@ class PropertyBooking(models.Model):
     project = models.ForeignKey(
         ProjectDetail, on_delete=models.CASCADE, related_name="bookings"
     )
+    # set from visitor_mobile on save (signals.py)
+    lead = models.ForeignKey(
+        Lead, on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name="bookings"
+    )
 
     # Visitor Info
     visitor_name = models.CharField(max_length=255)
@@ -250,6 +342,18 @@ class PropertyBooking(models.Model):
         verbose_name = "Property Booking"
         verbose_name_plural = "Property Bookings"
         ordering = ["-booking_date", "-created_at"]
+        indexes = [
+            models.Index(fields=["booking_date", "id"], name="booking_date_id_idx"),
+            # the list endpoint's ?employee= / ?project= / ?booking_status= filters, same key
+            models.Index(fields=["employee", "booking_date", "id"], name="booking_emp_date_idx"),
+            models.Index(fields=["project", "booking_date", "id"], name="booking_proj_date_idx"),
+            models.Index(fields=["booking_status", "booking_date", "id"], name="booking_status_date_idx"),
+            # sales dashboard: per-project counts and amount sums from the index alone
+            models.Index(
+                fields=["project", "booking_status", "total_amount", "advance_amount", "remaining_amount"],
+                name="booking_dashboard_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.visitor_name} - {self.project.project_name} ({self.plot_number or 'N/A'})"
@@ -271,6 +375,9 @@ class Service(models.Model):
         verbose_name = "Service"
         verbose_name_plural = "Services"
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["name", "id"], name="service_name_id_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -311,6 +418,7 @@ class EmployeeServiceStatus(models.Model):
         verbose_name_plural = "Employee Service Statuses"
         indexes = [
             models.Index(fields=["employee", "service", "project", "property_name"]),
+            models.Index(fields=["created_at", "id"], name="servicestatus_created_id_idx"),
         ]  # ✅ for faster lookups (no uniqueness restriction)
 
     def clean(self):
@@ -332,12 +440,22 @@ class EmployeeReport(models.Model):
     report_text = models.TextField()
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # default rather than auto_now_add so reports flushed later by the
+    # write-behind buffer keep the time they were submitted
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Set on reports queued by the write-behind buffer; makes spool replays idempotent
+    spool_id = models.UUIDField(null=True, blank=True, unique=True, editable=False)
 
     class Meta:
         verbose_name = "Employee Report"
         verbose_name_plural = "Employee Reports"
         ordering = ["-created_at"]
+        indexes = [
+            # an employee's own reports, newest first (keyset pages)
+            models.Index(fields=["employee", "created_at", "id"], name="report_emp_created_id_idx"),
+            # a session's latest report (with_last_activity): covering, no table lookup
+            models.Index(fields=["attendance", "created_at"], name="report_att_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.employee.employee_id} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
@@ -369,6 +487,9 @@ class WorkPlan(models.Model):
         verbose_name = "Work Plan"
         verbose_name_plural = "Work Plans"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="workplan_created_id_idx"),
+        ]
 
     def __str__(self):
         return f"{self.employee} - {self.plan_type} ({self.start_date})"
@@ -404,6 +525,9 @@ class WorkDetail(models.Model):
         verbose_name = "Work Detail"
         verbose_name_plural = "Work Details"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="workdetail_created_id_idx"),
+        ]
 
     def __str__(self):
         return f"{self.work_plan} - {self.title} ({self.status})"
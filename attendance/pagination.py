@@ -0,0 +1,113 @@
+# attendance/pagination.py
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param
+
+
+class InvalidCursorMixin:
+    """A malformed or tampered cursor is a 400, where CursorPagination answers 404"""
+
+    def decode_cursor(self, request):
+        try:
+            return super().decode_cursor(request)
+        except NotFound:
+            raise ParseError(self.invalid_cursor_message)
+
+
+class AttendanceRecordPagination(InvalidCursorMixin, CursorPagination):
+    """Cursor pages of one employee's attendance history, newest first"""
+    ordering = "-date"  # unique per employee
+    page_size = 31
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        try:
+            return super().paginate_queryset(queryset, request, view)
+        except ValidationError:  # the cursor's position is not a date
+            raise ParseError(self.invalid_cursor_message)
+
+
+class KeysetPagination(InvalidCursorMixin, CursorPagination):
+    """
+    Default pagination for list endpoints: keyset pages on (ordering field, pk).
+
+    DRF's CursorPagination seeks on the first ordering field only and steps
+    over ties with an offset. Here the cursor carries the field value and the
+    pk, so any page, however deep, is one index range seek of page_size + 1
+    rows and never a COUNT. The view's `ordering` (a single field such as
+    "-created_at") selects the key; back it with an index on (field, id).
+    """
+    ordering = "-created_at"
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = getattr(settings, "API_MAX_PAGE_SIZE", 200)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        ordering = getattr(view, "ordering", None) or self.ordering
+        self.field = ordering.lstrip("-")
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        # A previous-page cursor walks the key the other way, then flips the page
+        descending = ordering.startswith("-") != reverse
+
+        if self.cursor is not None:
+            try:
+                value, pk = json.loads(self.cursor.position)
+                queryset = queryset.filter(self._beyond(value, pk, descending))
+            except (TypeError, ValueError, ValidationError):
+                raise ParseError(self.invalid_cursor_message)
+
+        order = (f"-{self.field}", "-pk") if descending else (self.field, "pk")
+        results = list(queryset.order_by(*order)[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = self.cursor is not None, has_more
+        return self.page
+
+    def _beyond(self, value, pk, descending):
+        """Rows after (value, pk) in walk order; the first term is an index range seek"""
+        bound, strict = ("lte", "lt") if descending else ("gte", "gt")
+        return Q(**{f"{self.field}__{bound}": value}) & (
+            Q(**{f"{self.field}__{strict}": value}) | Q(**{f"pk__{strict}": pk})
+        )
+
+    def _position(self, row):
+        """Cursor position of a model instance or a values() row (attendance.fast_read)"""
+        if isinstance(row, dict):
+            value, pk = row[self.field], row["id"]
+        else:
+            value, pk = getattr(row, self.field), row.pk
+        if hasattr(value, "isoformat"):
+            value = value.isoformat()
+        return json.dumps([value, pk])
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self._position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # walked past rows deleted meanwhile: start over from the first page
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self._position(self.page[0])))
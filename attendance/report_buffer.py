@@ -0,0 +1,258 @@
+# attendance/report_buffer.py
+"""
+Write-behind buffer for EmployeeReport inserts (settings.REPORT_WRITE_BEHIND).
+
+A validated report is appended to a per-process spool file and acknowledged
+immediately; a background thread inserts the buffered reports with one
+bulk_create per batch every REPORT_FLUSH_INTERVAL_MS, or sooner once
+REPORT_FLUSH_BATCH_SIZE reports are waiting. The spool only keeps reports
+that are not yet committed, so a crashed worker loses nothing: the next
+process to start a buffer on the same spool directory replays it. Every
+report carries a spool_id (unique), which makes a replay of rows that were
+already inserted a no-op.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import EmployeeReport
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): run a single process per spool directory
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SPOOL_PREFIX = "reports-"
+SPOOL_SUFFIX = ".jsonl"
+
+
+def _lock_file(handle, blocking=True):
+    """Exclusive flock: held by a live process for as long as it owns the spool"""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    except BlockingIOError:
+        return False
+    return True
+
+
+class ReportWriteBehind:
+    def __init__(self, spool_dir, flush_interval=0.2, batch_size=500, fsync=False):
+        self.spool_dir = str(spool_dir)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self._pending = []  # spooled entries not yet committed, oldest first
+        self._lock = threading.Lock()  # guards _pending and the spool file
+        self._flush_lock = threading.Lock()  # one flush at a time
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._spool = None
+        self._pid = None
+        self._thread = None
+
+    # ----------------- SUBMIT -----------------
+    def submit(self, employee_id, attendance_id, report_text, latitude=None, longitude=None):
+        """Spool one report and return its entry (spool_id, created_at, ...)"""
+        entry = {
+            "spool_id": str(uuid.uuid4()),
+            "employee_id": employee_id,
+            "attendance_id": attendance_id,
+            "report_text": report_text,
+            "latitude": latitude,
+            "longitude": longitude,
+            "created_at": timezone.now().isoformat(),
+        }
+        with self._lock:
+            self._ensure_started()
+            self._append([entry])
+            self._pending.append(entry)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wakeup.set()
+        return entry
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    # ----------------- FLUSH -----------------
+    def flush(self):
+        """Insert everything buffered so far; returns the number of reports written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._pending[: self.batch_size]
+                if not batch:
+                    return written
+                self._insert(batch)
+                with self._lock:
+                    # submit() only appends, so the batch is still the head of the list
+                    del self._pending[: len(batch)]
+                    self._compact()
+                written += len(batch)
+
+    def _insert(self, batch):
+        reports = [
+            EmployeeReport(
+                spool_id=entry["spool_id"],
+                employee_id=entry["employee_id"],
+                attendance_id=entry["attendance_id"],
+                report_text=entry["report_text"],
+                latitude=entry["latitude"],
+                longitude=entry["longitude"],
+                created_at=parse_datetime(entry["created_at"]),
+            )
+            for entry in batch
+        ]
+        try:
+            try:
+                with transaction.atomic():
+                    EmployeeReport.objects.bulk_create(reports, ignore_conflicts=True)
+            except IntegrityError:
+                # A session or employee was deleted after its report was queued;
+                # insert one by one and drop only the reports that cannot be saved
+                for report in reports:
+                    try:
+                        with transaction.atomic():
+                            EmployeeReport.objects.bulk_create([report], ignore_conflicts=True)
+                    except IntegrityError as exc:
+                        logger.warning("Dropping spooled report %s: %s", report.spool_id, exc)
+        finally:
+            close_old_connections()
+
+    # ----------------- SPOOL FILE -----------------
+    def _spool_path(self, pid):
+        return os.path.join(self.spool_dir, f"{SPOOL_PREFIX}{pid}{SPOOL_SUFFIX}")
+
+    def _append(self, entries):
+        self._spool.write("".join(json.dumps(entry) + "\n" for entry in entries))
+        self._spool.flush()
+        if self.fsync:
+            os.fsync(self._spool.fileno())
+
+    def _compact(self):
+        """Drop committed entries from the spool (caller holds _lock)"""
+        if not self._pending:
+            self._spool.seek(0)
+            self._spool.truncate()
+            return
+        path = self._spool_path(self._pid)
+        replacement = open(path + ".tmp", "w", encoding="utf-8")
+        _lock_file(replacement)
+        old, self._spool = self._spool, replacement
+        self._append(self._pending)
+        os.replace(path + ".tmp", path)
+        old.close()
+
+    def _recover(self):
+        """Adopt the spools of dead processes (their flock is free) into ours"""
+        recovered = []
+        own = os.path.basename(self._spool_path(self._pid))
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not (name.startswith(SPOOL_PREFIX) and name.endswith(SPOOL_SUFFIX)):
+                continue
+            path = os.path.join(self.spool_dir, name)
+            if name == own:
+                continue
+            with open(path, "r+", encoding="utf-8") as handle:
+                if not _lock_file(handle, blocking=False):
+                    continue  # owned by a live process
+                entries = [json.loads(line) for line in handle if line.strip()]
+                # copy into our spool before removing theirs, so a crash in
+                # between duplicates entries (harmless) rather than losing them
+                self._append(entries)
+                recovered.extend(entries)
+                os.remove(path)
+        return recovered
+
+    # ----------------- LIFECYCLE -----------------
+    def _ensure_started(self):
+        """Open the spool and start the flusher, once per process (caller holds _lock)"""
+        pid = os.getpid()
+        if self._pid == pid:
+            if self._thread is None:  # restarted after stop()
+                self._stopping = False
+                self._start_thread()
+            return
+        # First use, or a forked child: the parent keeps its own spool and buffer
+        if self._spool is not None:
+            self._spool.close()  # the parent's lock survives: it holds the same open file
+        self._pending = []
+        self._pid = pid
+        self._stopping = False
+        os.makedirs(self.spool_dir, exist_ok=True)
+        path = self._spool_path(pid)
+        stale = []
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as handle:
+                stale = [json.loads(line) for line in handle if line.strip()]
+        self._spool = open(path, "w", encoding="utf-8")
+        _lock_file(self._spool)
+        self._append(stale)
+        self._pending.extend(stale)
+        self._pending.extend(self._recover())
+        self._start_thread()
+        atexit.register(self.stop)
+
+    def _start_thread(self):
+        self._thread = threading.Thread(target=self._run, name="report-write-behind", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Reports stay buffered and spooled; the next tick retries them
+                logger.exception("Report write-behind flush failed")
+
+    def stop(self):
+        """Stop the flusher after a final flush (anything left stays spooled)"""
+        thread = self._thread
+        if thread is None or self._pid != os.getpid():
+            return
+        self._stopping = True
+        self._wakeup.set()
+        thread.join()
+        self._thread = None
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Final report write-behind flush failed")
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def enabled():
+    return getattr(settings, "REPORT_WRITE_BEHIND", False)
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = ReportWriteBehind(
+                    getattr(settings, "REPORT_SPOOL_DIR", os.path.join(settings.BASE_DIR, "spool")),
+                    flush_interval=getattr(settings, "REPORT_FLUSH_INTERVAL_MS", 200) / 1000,
+                    batch_size=getattr(settings, "REPORT_FLUSH_BATCH_SIZE", 500),
+                    fsync=getattr(settings, "REPORT_SPOOL_FSYNC", False),
+                )
+    return _buffer
@@ -0,0 +1,155 @@
+# attendance/rollups.py
+from collections import defaultdict
+from datetime import time, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Subquery, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Attendance, AttendanceRollup
+
+
+def late_after():
+    """Local time after which a check-in counts as a late arrival"""
+    return getattr(settings, "ATTENDANCE_LATE_AFTER", time(10, 0))
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def check_in_delta(attendance):
+    late = timezone.localtime(attendance.check_in_time).time() > late_after()
+    return {
+        "present_days": 1,
+        "late_arrivals": 1 if late else 0,
+        "missing_checkouts": 1,  # until the check-out arrives
+    }
+
+
+def check_out_delta(attendance):
+    return {
+        "worked_time": attendance.check_out_time - attendance.check_in_time,
+        "missing_checkouts": -1,
+    }
+
+
+def add_delta(deltas, attendance, delta):
+    """Merge one session's delta into a {(employee pk, month): {field: increment}} map"""
+    totals = deltas[(attendance.employee_id, month_start(attendance.date))]
+    for field, value in delta.items():
+        totals[field] = totals[field] + value if field in totals else value
+
+
+def apply_deltas(deltas):
+    """Increment rollup rows in place (F() expressions, safe under concurrent writers)"""
+    for (employee_pk, month), delta in deltas.items():
+        rollups = AttendanceRollup.objects.filter(employee_id=employee_pk, month=month)
+        increments = {field: F(field) + value for field, value in delta.items()}
+        if rollups.update(**increments):
+            continue
+        try:
+            with transaction.atomic():
+                AttendanceRollup.objects.create(
+                    employee_id=employee_pk,
+                    month=month,
+                    **{field: max(value, 0) if field == "missing_checkouts" else value
+                       for field, value in delta.items()},
+                )
+        except IntegrityError:
+            # Another writer created the row first
+            rollups.update(**increments)
+
+
+def record_check_in(attendance):
+    deltas = defaultdict(dict)
+    add_delta(deltas, attendance, check_in_delta(attendance))
+    apply_deltas(deltas)
+
+
+def record_check_out(employee_id, checked_out_at):
+    """
+    Add the session just closed at `checked_out_at` to its month in one UPDATE.
+    The worked time is computed by the database, so the check-out path never
+    has to read the attendance row back. A month with no rollup row yet (its
+    check-ins predate the rollups or were never counted) is recomputed from
+    its sessions instead.
+    """
+    closed = Attendance.objects.filter(
+        employee__employee_id=employee_id, check_out_time=checked_out_at
+    )
+    worked = closed.annotate(
+        worked=ExpressionWrapper(F("check_out_time") - F("check_in_time"), output_field=DurationField())
+    ).values("worked")[:1]
+
+    updated = AttendanceRollup.objects.filter(
+        employee=Subquery(closed.values("employee")[:1]),
+        month=Subquery(closed.annotate(session_month=TruncMonth("date")).values("session_month")[:1]),
+    ).update(
+        worked_time=F("worked_time") + Subquery(worked, output_field=DurationField()),
+        missing_checkouts=F("missing_checkouts") - 1,
+    )
+    if not updated:
+        session = closed.values("employee_id", "date").first()
+        if session is not None:
+            rebuild_month(session["employee_id"], month_start(session["date"]))
+
+
+def _rollup_rows(attendance):
+    """Grouped totals per (employee_id, month) of an Attendance queryset"""
+    checked_in = Q(check_in_time__isnull=False)
+    closed = checked_in & Q(check_out_time__isnull=False)
+
+    return attendance.filter(checked_in).annotate(
+        month=TruncMonth("date")
+    ).values("employee_id", "month").annotate(
+        present_days=Count("id"),
+        worked_time=Sum(
+            ExpressionWrapper(F("check_out_time") - F("check_in_time"), output_field=DurationField()),
+            filter=closed,
+        ),
+        late_arrivals=Count("id", filter=Q(check_in_time__time__gt=late_after())),
+        missing_checkouts=Count("id", filter=Q(check_out_time__isnull=True)),
+    ).order_by()
+
+
+def _rollup_fields(row):
+    return {
+        "present_days": row["present_days"],
+        "worked_time": row["worked_time"] or timedelta(),
+        "late_arrivals": row["late_arrivals"],
+        "missing_checkouts": row["missing_checkouts"],
+    }
+
+
+def rebuild_month(employee_pk, month):
+    """Recompute one employee's rollup row for the month starting `month`"""
+    next_month = (month + timedelta(days=31)).replace(day=1)
+    rows = list(_rollup_rows(
+        Attendance.objects.filter(employee_id=employee_pk, date__gte=month, date__lt=next_month)
+    ))
+    if not rows:
+        AttendanceRollup.objects.filter(employee_id=employee_pk, month=month).delete()
+        return
+    AttendanceRollup.objects.update_or_create(
+        employee_id=employee_pk, month=month, defaults=_rollup_fields(rows[0])
+    )
+
+
+def rebuild_rollups():
+    """
+    Recompute every rollup from Attendance with one grouped query. The read runs
+    inside the transaction (IMMEDIATE: it holds the write lock), so a check-in
+    or check-out cannot commit between the snapshot and the replacement.
+    """
+    with transaction.atomic():
+        rollups = [
+            AttendanceRollup(employee_id=row["employee_id"], month=row["month"], **_rollup_fields(row))
+            for row in _rollup_rows(Attendance.objects.all())
+        ]
+        AttendanceRollup.objects.all().delete()
+        AttendanceRollup.objects.bulk_create(rollups, batch_size=1000)
+
+    return len(rollups)
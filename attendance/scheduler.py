@@ -0,0 +1,132 @@
+# attendance/scheduler.py
+import heapq
+import time
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Attendance
+from .utils import open_sessions, with_last_activity, send_missed_report_alert, REPORT_INTERVAL
+
+
+class ReportDeadlineScheduler:
+    """
+    Long-running missed-report checker.
+
+    Keeps the next report deadline of every open session in a min-heap and only
+    goes to the database when a deadline expires, plus a cheap primary-key
+    cursor poll that picks up new check-ins (the change feed).
+
+    Reports and check-outs written by other processes need no notification:
+    expired deadlines are re-validated in one query before alerting, so a
+    session that reported in the meantime is re-armed and a closed one dropped.
+    """
+
+    def __init__(self, poll_interval=60, stdout=None):
+        self.poll_interval = timedelta(seconds=poll_interval)
+        self.stdout = stdout
+        self._heap = []        # (deadline, attendance pk)
+        self._deadlines = {}   # attendance pk -> live deadline; other heap entries are stale
+        self._last_pk = 0
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def schedule(self, attendance_pk, deadline):
+        self._deadlines[attendance_pk] = deadline
+        heapq.heappush(self._heap, (deadline, attendance_pk))
+
+    def discard(self, attendance_pk):
+        self._deadlines.pop(attendance_pk, None)
+
+    def _is_live(self, entry):
+        deadline, attendance_pk = entry
+        return self._deadlines.get(attendance_pk) == deadline
+
+    def load(self):
+        """
+        Seed the queue from the open sessions (attendance_open_session_idx) and
+        start the change feed at the newest row, so startup never reads the
+        closed history. The cursor is read first: a check-in racing with the
+        seeding is seen twice at worst, and scheduling it again is harmless.
+        """
+        self._heap.clear()
+        self._deadlines.clear()
+        self._last_pk = Attendance.objects.aggregate(last_pk=Max("pk"))["last_pk"] or 0
+        rows = with_last_activity(open_sessions()).order_by().values_list("pk", "last_activity")
+        for attendance_pk, last_activity in rows:
+            self.schedule(attendance_pk, last_activity + REPORT_INTERVAL)
+
+    def poll(self):
+        """Schedule sessions created since the last poll (one indexed range query)"""
+        rows = with_last_activity(
+            Attendance.objects.filter(pk__gt=self._last_pk)
+        ).values_list("pk", "check_in_time", "check_out_time", "last_activity")
+
+        for attendance_pk, check_in_time, check_out_time, last_activity in rows:
+            self._last_pk = max(self._last_pk, attendance_pk)
+            if check_in_time is not None and check_out_time is None:
+                self.schedule(attendance_pk, last_activity + REPORT_INTERVAL)
+
+    def fire(self, now=None):
+        """Re-validate expired deadlines, alert the sessions that are really overdue"""
+        now = now or timezone.now()
+        due = set()
+        while self._heap and self._heap[0][0] < now:
+            entry = heapq.heappop(self._heap)
+            if self._is_live(entry):
+                due.add(entry[1])
+        if not due:
+            return []
+
+        alerted = []
+        sessions = with_last_activity(
+            Attendance.objects.filter(pk__in=due)
+        ).select_related("employee")
+
+        for attendance in sessions:
+            due.discard(attendance.pk)
+            if attendance.check_out_time is not None:
+                self.discard(attendance.pk)
+                continue
+
+            deadline = attendance.last_activity + REPORT_INTERVAL
+            if deadline >= now:
+                # Reported since this deadline was armed
+                self.schedule(attendance.pk, deadline)
+                continue
+
+            send_missed_report_alert(attendance)
+            alerted.append(attendance)
+            # Remind again one interval later unless a report arrives first
+            self.schedule(attendance.pk, now + REPORT_INTERVAL)
+
+        # Whatever is left was deleted
+        for attendance_pk in due:
+            self.discard(attendance_pk)
+
+        return alerted
+
+    def next_wakeup(self, now):
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+
+        wakeup = now + self.poll_interval
+        if self._heap:
+            wakeup = min(wakeup, self._heap[0][0])
+        return wakeup
+
+    def run(self):
+        self.load()
+        if self.stdout:
+            self.stdout.write(f"Scheduler started, tracking {len(self)} open session(s).")
+
+        while True:
+            close_old_connections()
+            self.poll()
+            self.fire()
+
+            now = timezone.now()
+            time.sleep(max(0.0, (self.next_wakeup(now) - now).total_seconds()))
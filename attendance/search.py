@@ -0,0 +1,208 @@
+# attendance/search.py
+"""
+Full-text search over projects, site visits and property bookings, for the
+API's ?q= parameter and the admin search box.
+
+On SQLite each model has a trigram FTS5 table (migration 0026) kept in step
+by triggers; `manage.py rebuild_search_index` refills them. A search keeps
+the SEARCH_MAX_MATCHES newest matching rows of the queryset it is given.
+Other backends fall back to an icontains search.
+"""
+from functools import reduce
+from operator import and_, or_
+
+from django.conf import settings
+from django.contrib import messages
+from django.db import connections, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.text import smart_split, unescape_string_literal
+
+MIN_INDEXED_TERM = 3  # trigrams
+# Filtered querysets up to this many rows are searched row by row rather than through the index
+FILTERED_SCAN_ROWS = 10000
+
+# model label -> (FTS5 table, source view, the columns it indexes as ORM lookups)
+INDEXES = {
+    "attendance.projectdetail": (
+        "attendance_projectdetail_fts",
+        "attendance_projectdetail_search_source",
+        ("project_name", "builder_name", "city", "state", "zipcode", "khasra_number"),
+    ),
+    "attendance.sitevisit": (
+        "attendance_sitevisit_fts",
+        "attendance_sitevisit_search_source",
+        (
+            "visitor_name", "visitor_mobile", "visitor_address", "plot_number",
+            "employee__user__first_name", "employee__user__last_name", "project__project_name",
+        ),
+    ),
+    "attendance.propertybooking": (
+        "attendance_propertybooking_fts",
+        "attendance_propertybooking_search_source",
+        ("visitor_name", "visitor_mobile", "plot_number"),
+    ),
+}
+
+
+def terms(text):
+    """Search terms of the text, split like the admin splits them: on spaces, "quoted phrases" kept whole"""
+    found = []
+    for bit in smart_split(text or ""):
+        if bit[:1] in ('"', "'") and bit[-1:] == bit[:1] and len(bit) > 1:
+            bit = unescape_string_literal(bit)
+        if bit.strip():
+            found.append(bit)
+    return found
+
+
+def _like_pattern(term):
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _max_matches():
+    return getattr(settings, "SEARCH_MAX_MATCHES", 1000)
+
+
+def _is_small(queryset):
+    """True when the queryset has at most FILTERED_SCAN_ROWS rows (one index-only probe)"""
+    return queryset.order_by().values("pk")[:FILTERED_SCAN_ROWS + 1].count() <= FILTERED_SCAN_ROWS
+
+
+def matching_ids(queryset, text, limit):
+    """
+    (SQL selecting the ids of the newest `limit` rows of the queryset that
+    match every term, params). A filtered queryset's filters are part of
+    the FTS5 query, so they apply before the limit does.
+    """
+    table, _, _ = INDEXES[queryset.model._meta.label_lower]
+    filtered = bool(queryset.query.where)
+    small = filtered and _is_small(queryset)
+    conditions, params = [], []
+    if small:
+        # FTS5 looks these rows up by rowid. A MATCH would be re-run per
+        # row, so every term is a LIKE instead (ASCII-only case folding,
+        # where the tokenizer also folds other scripts).
+        within, within_params = queryset.order_by().values("pk").query.sql_with_params()
+        conditions.append(f"rowid IN ({within})")
+        params.extend(within_params)
+        long_terms, short_terms = [], terms(text)
+    else:
+        long_terms = [term for term in terms(text) if len(term) >= MIN_INDEXED_TERM]
+        short_terms = [term for term in terms(text) if len(term) < MIN_INDEXED_TERM]
+    if long_terms:
+        conditions.append(f"{table} MATCH %s")
+        params.append(" ".join('"{}"'.format(term.replace('"', '""')) for term in long_terms))
+    for term in short_terms:
+        # "+body": filtered after the scan, not handed to FTS5. Too short for
+        # trigrams either way, and SQLite 3.40 crashes on a LIKE the trigram
+        # tokenizer is given alongside a MATCH.
+        conditions.append("+body LIKE %s ESCAPE '\\'")
+        params.append(_like_pattern(term))
+    if filtered and not small:
+        # Many filtered rows: check each match against the filters by primary key
+        row = queryset.filter(pk=RawSQL(f"{table}.rowid", ())).order_by().values("pk")
+        row_sql, row_params = row.query.sql_with_params()
+        conditions.append(f"EXISTS ({row_sql})")
+        params.extend(row_params)
+    params.append(limit)
+    return f"SELECT rowid FROM {table} WHERE {' AND '.join(conditions)} ORDER BY rowid DESC LIMIT %s", params
+
+
+def _related_paths(tree, prefix=""):
+    """select_related() arguments for a Query.select_related tree ({"employee": {"user": {}}} -> employee__user)"""
+    for name, subtree in tree.items():
+        if subtree:
+            yield from _related_paths(subtree, f"{prefix}{name}__")
+        else:
+            yield f"{prefix}{name}"
+
+
+def _uses_index(queryset):
+    return connections[queryset.db].vendor == "sqlite"
+
+
+def search(queryset, text):
+    """
+    The queryset's rows matching every search term, in its order and with its
+    select_related; all of it when there are none
+    """
+    if not terms(text):
+        return queryset
+    if _uses_index(queryset):
+        ids = RawSQL(*matching_ids(queryset, text, _max_matches()))
+        # The ids already satisfy the filters. Repeated here, they would have
+        # SQLite walk the filter's index instead of fetching the ids by pk.
+        matched = queryset.model._default_manager.db_manager(queryset.db).filter(pk__in=ids)
+        if queryset.query.select_related is True:
+            matched = matched.select_related()
+        elif queryset.query.select_related:
+            matched = matched.select_related(*_related_paths(queryset.query.select_related))
+        if queryset.query.order_by or not queryset.ordered:
+            matched = matched.order_by(*queryset.query.order_by)
+        return matched
+    _, _, fields = INDEXES[queryset.model._meta.label_lower]
+    return queryset.filter(reduce(and_, (
+        reduce(or_, (Q(**{f"{field}__icontains": term}) for field in fields)) for term in terms(text)
+    )))
+
+
+def is_truncated(queryset, text):
+    """True when search(queryset, text) left out older matches: more than SEARCH_MAX_MATCHES rows match"""
+    if not terms(text) or not _uses_index(queryset):
+        return False
+    sql, params = matching_ids(queryset, text, _max_matches() + 1)
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f"SELECT count(*) FROM ({sql})", params)
+        return cursor.fetchone()[0] > _max_matches()
+
+
+def rebuild(using="default"):
+    """Refill every search index from its source view. Returns {FTS5 table: rows indexed}"""
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return {}
+    indexed = {}
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        for table, source, _ in INDEXES.values():
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(f"INSERT INTO {table}(rowid, body) SELECT id, body FROM {source}")
+            indexed[table] = cursor.rowcount
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+    return indexed
+
+
+class SearchViewMixin:
+    """
+    ModelViewSet mixin: ?q= narrows the filtered list to the rows matching
+    every term, and the paginated body gains "search_truncated": true when
+    only the SEARCH_MAX_MATCHES newest of them were kept (false otherwise).
+    """
+    search_query_param = "q"
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        text = self.request.query_params.get(self.search_query_param)
+        if not terms(text):
+            return queryset
+        self.search_truncated = is_truncated(queryset, text)
+        return search(queryset, text)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if hasattr(self, "search_truncated"):
+            response.data["search_truncated"] = self.search_truncated
+        return response
+
+
+class SearchAdminMixin:
+    """ModelAdmin mixin: the search box queries the model's search index (search_fields still shows it)"""
+
+    def get_search_results(self, request, queryset, search_term):
+        if is_truncated(queryset, search_term):
+            messages.warning(
+                request,
+                f"Only the {_max_matches()} newest matches are listed; add terms or filters to narrow the search.",
+            )
+        return search(queryset, search_term), False
@@ -52,6 +52,30 @@ class AttendanceCheckOutSerializer(serializers.ModelSerializer):
             'scan_type', 'device_id', 'status'
         ]
 
+
+class AttendanceBulkEventSerializer(serializers.Serializer):
+    """One queued check-in / check-out scan replayed by an offline device"""
+    EVENT_CHOICES = [
+        ("check_in", "Check In"),
+        ("check_out", "Check Out"),
+    ]
+
+    event = serializers.ChoiceField(choices=EVENT_CHOICES)
+    employee_id = serializers.CharField(max_length=8)
+    timestamp = serializers.DateTimeField()
+    latitude = serializers.FloatField(required=False, allow_null=True)
+    longitude = serializers.FloatField(required=False, allow_null=True)
+    scan_type = serializers.ChoiceField(choices=[('face', 'Face'), ('finger', 'Fingerprint')])
+    device_id = serializers.CharField(max_length=255)
+    status = serializers.ChoiceField(choices=Attendance.STATUS_CHOICES, default="pending")
+
+
+class AttendanceBulkSerializer(serializers.Serializer):
+    """Envelope for a batch of queued scans (validated one by one in the view)"""
+    events = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False, max_length=500
+    )
+
 # ----------------- BIOMETRIC -----------------
 class BiometricRegisterSerializer(serializers.ModelSerializer):
     employee_id = serializers.CharField(write_only=True)
@@ -99,23 +123,29 @@ class BiometricRegisterSerializer(serializers.ModelSerializer):
 
 # ----------------- EMPLOYEE FULL DATA -----------------
 from datetime import date
+from django.utils import timezone
+from .models import AttendanceRollup
 
 class AttendanceRecordSerializer(serializers.ModelSerializer):
     class Meta:
         model = Attendance
         fields = [
             'date',
-            'check_in_time', 'check_in_latitude', 'check_in_longitude',
-            'check_out_time', 'check_out_latitude', 'check_out_longitude',
-            'scan_type', 'device_id', 'status'
+            'check_in_time', 'check_in_latitude', 'check_in_longitude', 'check_in_site',
+            'check_out_time', 'check_out_latitude', 'check_out_longitude', 'check_out_site',
+            'scan_type', 'device_id', 'device_verified', 'status'
         ]
 
 
 class EmployeeFullDataSerializer(serializers.ModelSerializer):
+    """
+    Profile, biometric data and current-month summary. The attendance history is
+    paginated and attached by EmployeeFullDataAPIView.
+    """
     user = UserSerializer()
-    attendance_records = AttendanceRecordSerializer(many=True, source='attendance_set')
     biometric_data = BiometricRegisterSerializer(read_only=True)
     present_days_in_month = serializers.SerializerMethodField()
+    current_month = serializers.SerializerMethodField()
 
     class Meta:
         model = Employee
@@ -125,20 +155,32 @@ class EmployeeFullDataSerializer(serializers.ModelSerializer):
             'employee_id',
             'aadhaar_number', 'aadhaar_photo',
             'bank_name', 'account_number', 'ifsc_code',
-            'attendance_records',
             'biometric_data',
             'present_days_in_month',
+            'current_month',
         ]
 
+    def _current_rollup(self, obj):
+        """This month's rollup row (one query, shared by the summary fields)"""
+        if not hasattr(self, "_rollup"):
+            month = timezone.localdate().replace(day=1)
+            self._rollup = AttendanceRollup.objects.filter(employee=obj, month=month).first()
+        return self._rollup
+
     def get_present_days_in_month(self, obj):
-        """Count attendance days with at least a check-in in the current month"""
-        today = date.today()
-        return Attendance.objects.filter(
-            employee=obj,
-            date__year=today.year,
-            date__month=today.month,
-            check_in_time__isnull=False
-        ).count()
+        """Attendance days with at least a check-in in the current month (from the monthly rollup)"""
+        rollup = self._current_rollup(obj)
+        return rollup.present_days if rollup else 0
+
+    def get_current_month(self, obj):
+        rollup = self._current_rollup(obj)
+        return {
+            'month': timezone.localdate().strftime('%Y-%m'),
+            'present_days': rollup.present_days if rollup else 0,
+            'worked_minutes': rollup.worked_minutes if rollup else 0,
+            'late_arrivals': rollup.late_arrivals if rollup else 0,
+            'missing_checkouts': rollup.missing_checkouts if rollup else 0,
+        }
 
 
 
@@ -234,6 +276,13 @@ class EmployeeReportSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at"]
 
 
+class EmployeeReportInputSerializer(serializers.ModelSerializer):
+    """Client-supplied report fields; employee and session come from the token (no DB lookups)"""
+    class Meta:
+        model = EmployeeReport
+        fields = ["report_text", "latitude", "longitude"]
+
+
 
 from rest_framework import serializers
 from .models import WorkPlan, WorkDetail
@@ -293,3 +342,24 @@ class WorkDetailSerializer(serializers.ModelSerializer):
 
 
 
+
+
+from django.conf import settings
+from .models import Lead
+
+
+class LeadHistorySerializer(serializers.ModelSerializer):
+    """A lead with its prefetched history (attendance.leads.lookup)"""
+    visits = SiteVisitSerializer(source="visit_history", many=True, read_only=True)
+    bookings = PropertyBookingSerializer(source="booking_history", many=True, read_only=True)
+
+    class Meta:
+        model = Lead
+        fields = ["id", "phone", "created_at", "visits", "bookings"]
+
+
+class LeadBatchLookupSerializer(serializers.Serializer):
+    phones = serializers.ListField(
+        child=serializers.CharField(max_length=32), allow_empty=False,
+        max_length=getattr(settings, "LEAD_LOOKUP_MAX_BATCH", 5000),
+    )
@@ -0,0 +1,87 @@
+# attendance/signals.py
+from django.db.backends.signals import connection_created
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.contrib.auth.models import User
+from django.dispatch import receiver
+
+from .models import ProjectDetail, BiometricData, Employee, Service, SiteVisit, PropertyBooking
+from . import dashboard, geofence, leads
+from .catalog_cache import bump_catalog_version
+from .devices import binding_cache
+from .throttles import forget_unknown_mobile
+from .authentication import principal_cache
+from .metrics import install_sql_tracking
+
+
+# ----------------- GEOFENCE -----------------
+@receiver([post_save, post_delete], sender=ProjectDetail)
+def refresh_geofence_index(sender, **kwargs):
+    geofence.invalidate()
+
+
+# ----------------- DEVICE BINDING -----------------
+@receiver([post_save, post_delete], sender=BiometricData)
+def invalidate_device_binding(sender, instance, **kwargs):
+    binding_cache.invalidate(instance.employee.employee_id)
+
+
+# ----------------- LOGIN -----------------
+@receiver(post_save, sender=Employee)
+def clear_unknown_mobile(sender, instance, **kwargs):
+    forget_unknown_mobile(instance.mobile)
+
+
+# ----------------- AUTH PRINCIPAL -----------------
+@receiver([post_save, post_delete], sender=User)
+def evict_user_principal(sender, instance, **kwargs):
+    principal_cache.invalidate(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Employee)
+def evict_employee_principal(sender, instance, **kwargs):
+    principal_cache.invalidate(instance.user_id)
+
+
+# ----------------- CATALOG RESPONSES -----------------
+@receiver([post_save, post_delete], sender=ProjectDetail)
+@receiver([post_save, post_delete], sender=Service)
+def bump_catalog(sender, **kwargs):
+    bump_catalog_version(sender)
+
+
+# ----------------- SALES DASHBOARD -----------------
+@receiver(pre_save, sender=SiteVisit)
+@receiver(pre_save, sender=PropertyBooking)
+def remember_dashboard_project(sender, instance, **kwargs):
+    """The project a visit / booking is moving away from also needs a fresh summary"""
+    if not instance._state.adding:
+        instance._previous_project_id = sender.objects.filter(pk=instance.pk).values_list(
+            "project_id", flat=True
+        ).first()
+
+
+@receiver([post_save, post_delete], sender=SiteVisit)
+@receiver([post_save, post_delete], sender=PropertyBooking)
+def invalidate_project_dashboard(sender, instance, **kwargs):
+    project_ids = {instance.project_id, getattr(instance, "_previous_project_id", None)}
+    # After commit: a summary computed before then is stored under the old token
+    transaction.on_commit(lambda: dashboard.invalidate(*project_ids))
+
+
+@receiver([post_save, post_delete], sender=ProjectDetail)
+def invalidate_renamed_project_dashboard(sender, instance, **kwargs):
+    project_id = instance.pk  # delete() clears it before on_commit callbacks run
+    transaction.on_commit(lambda: dashboard.invalidate(project_id))
+
+
+# ----------------- LEADS -----------------
+@receiver(pre_save, sender=SiteVisit)
+@receiver(pre_save, sender=PropertyBooking)
+def link_lead(sender, instance, raw=False, **kwargs):
+    if not raw:  # fixtures carry their own lead_id
+        instance.lead = leads.lead_for(instance.visitor_mobile)
+
+
+# ----------------- METRICS -----------------
+connection_created.connect(install_sql_tracking)
@@ -1,3 +1,2413 @@
-from django.test import TestCase
+import csv
+import importlib
+import io
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+from base64 import b64decode, b64encode
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import parse_qs, urlencode, urlsplit
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.http import StreamingHttpResponse
+from django.test import AsyncClient, AsyncRequestFactory, Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, resolve
+from django.utils import timezone
+from django.utils.http import parse_http_date
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from . import catalog_cache, dashboard, devices, geofence, leads, metrics, report_buffer, rollups, search
+from .async_views import AsyncAPIView, AsyncEmployeeReportView
+from .authentication import EmployeeJWTAuthentication, PrincipalCache, principal_cache, tokens_for_employee
+from .benchmark import seed
+from .exports import EXPORT_COLUMNS, export_rows
+from .models import (
+    Attendance, AttendanceRollup, BiometricData, Employee, EmployeeReport, EmployeeServiceStatus, Lead, ProjectDetail,
+    PropertyBooking,
+    Service, SiteVisit, WorkDetail, WorkPlan,
+)
+from .pagination import AttendanceRecordPagination, KeysetPagination
+from .scheduler import ReportDeadlineScheduler
+from .throttles import LoginThrottle, is_unknown_mobile
+from .utils import (
+    REPORT_INTERVAL, check_missing_reports, get_open_session, open_sessions, overdue_sessions, with_last_activity,
+)
+from .views import EmployeeReportViewSet, PropertyBookingViewSet, SiteVisitViewSet
+
+# "SCAN <table>" with no index: every row of the table is read
+FULL_SCAN = re.compile(r"^SCAN \S+$")
+
+
+# ----------------- QUERY PLANS -----------------
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN QUERY PLAN of the hot queries. Each must seek the index meant for
+    it; a full table scan or a sort of the whole result (TEMP B-TREE) fails.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(employees=6, projects=3, visits=40, bookings=40, history_days=3, rng=random.Random(0))
+        cls.employee = Employee.objects.select_related("user").filter(
+            attendance__in=open_sessions()
+        ).first()
+        cls.project = ProjectDetail.objects.first()
+
+    def query_plan(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def queryset_plan(self, queryset):
+        return self.query_plan(*queryset.query.sql_with_params())
+
+    def capture_selects(self, func):
+        """(sql, params) of every SELECT run by func()"""
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            if sql.startswith("SELECT"):
+                statements.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            func()
+        return statements
+
+    def assertIndexSeek(self, plan, *indexes):
+        text = "\n".join(plan)
+        for index in indexes:
+            self.assertIn(f"INDEX {index}", text)
+        for line in plan:
+            self.assertIsNone(FULL_SCAN.match(line), f"full table scan:\n{text}")
+        self.assertNotIn("USE TEMP B-TREE", text)
+
+    def list_page_selects(self, viewset, params, paginator_class=KeysetPagination):
+        """SELECTs of a list endpoint's first page and of the page its next link points to"""
+        factory = APIRequestFactory()
+        statements = []
+        url = factory.get("/", {**params, "page_size": 1}).get_full_path()
+        for _ in range(2):
+            self.assertIsNotNone(url, "seed data should fill more than one page")
+            view = viewset(action="list", action_map={"get": "list"}, format_kwarg=None)
+            request = view.initialize_request(factory.get(url))
+            request.user = self.employee.user
+            view.request = request
+            paginator = paginator_class()
+            queryset = view.filter_queryset(view.get_queryset())
+            statements += self.capture_selects(lambda: paginator.paginate_queryset(queryset, request, view))
+            url = paginator.get_next_link()
+        return statements
+
+    def test_site_visit_list_filters(self):
+        cases = [
+            ({}, "sitevisit_created_id_idx"),
+            ({"employee": self.employee.pk}, "sitevisit_emp_created_idx"),
+            ({"project": self.project.pk}, "sitevisit_proj_created_idx"),
+            ({"visitor_status": "interested"}, "sitevisit_status_created_idx"),
+        ]
+        for params, index in cases:
+            with self.subTest(params=params):
+                for sql, sql_params in self.list_page_selects(SiteVisitViewSet, params):
+                    self.assertIndexSeek(self.query_plan(sql, sql_params), index)
+
+    def test_property_booking_list_filters(self):
+        cases = [
+            ({}, "booking_date_id_idx"),
+            ({"employee": self.employee.pk}, "booking_emp_date_idx"),
+            ({"project": self.project.pk}, "booking_proj_date_idx"),
+            ({"booking_status": "pending"}, "booking_status_date_idx"),
+        ]
+        for params, index in cases:
+            with self.subTest(params=params):
+                for sql, sql_params in self.list_page_selects(PropertyBookingViewSet, params):
+                    self.assertIndexSeek(self.query_plan(sql, sql_params), index)
+
+    def test_employee_report_list(self):
+        self.employee.reports.create(attendance=get_open_session(self.employee), report_text="Second")
+        for sql, params in self.list_page_selects(EmployeeReportViewSet, {}):
+            self.assertIndexSeek(self.query_plan(sql, params), "report_emp_created_id_idx")
+
+    def test_open_session_lookups(self):
+        latest_open = open_sessions().filter(employee=self.employee).order_by("-check_in_time")
+        self.assertIndexSeek(self.queryset_plan(latest_open[:1]), "attendance_open_session_idx")
+
+        # check-out: the same lookup by employee_id, as a subquery of the UPDATE
+        by_employee_id = open_sessions().filter(
+            employee__employee_id=self.employee.employee_id
+        ).order_by("-check_in_time").values("pk")[:1]
+        self.assertIndexSeek(self.queryset_plan(by_employee_id), "attendance_open_session_idx")
+
+    def test_missed_report_lookup(self):
+        attendance = with_last_activity(
+            open_sessions().filter(employee=self.employee)
+        ).order_by("-check_in_time")[:1]
+        self.assertIndexSeek(
+            self.queryset_plan(attendance), "attendance_open_session_idx", "report_att_created_idx"
+        )
+
+    def test_overdue_sessions_scan_open_sessions_only(self):
+        self.assertIndexSeek(
+            self.queryset_plan(overdue_sessions()), "attendance_open_session_idx", "report_att_created_idx"
+        )
+
+    def test_attendance_history_page(self):
+        today = timezone.localdate()
+        records = Attendance.objects.filter(
+            employee=self.employee, date__gte=today - timedelta(days=30), date__lte=today
+        )
+        paginator = AttendanceRecordPagination()
+        request = Request(APIRequestFactory().get("/", {"page_size": 2}))
+        for sql, params in self.capture_selects(lambda: paginator.paginate_queryset(records, request)):
+            self.assertIndexSeek(self.query_plan(sql, params))
+
+    def test_sales_dashboard(self):
+        projects = dict(ProjectDetail.objects.values_list("id", "project_name"))
+        visits, bookings = self.capture_selects(lambda: dashboard.compute(projects))
+        for (sql, params), index in [(visits, "sitevisit_dashboard_idx"), (bookings, "booking_dashboard_idx")]:
+            plan = self.query_plan(sql, params)
+            self.assertIndexSeek(plan, index)
+            self.assertIn(f"USING COVERING INDEX {index}", "\n".join(plan))
+
+    def test_search(self):
+        visit = SiteVisit.objects.first()
+        for params in [{"q": visit.visitor_name}, {"q": visit.employee.user.first_name, "employee": visit.employee_id}]:
+            for scan_rows in [search.FILTERED_SCAN_ROWS, 0]:
+                with self.subTest(params=params, scan_rows=scan_rows), \
+                        mock.patch.object(search, "FILTERED_SCAN_ROWS", scan_rows):
+                    self.assertSearchPlan(params)
+
+    def assertSearchPlan(self, params):
+        for sql, params in self.list_page_selects(SiteVisitViewSet, params):
+            # at most SEARCH_MAX_MATCHES matches, fetched by primary key; only they are sorted
+            plan = self.query_plan(sql, params)
+            text = "\n".join(plan)
+            self.assertIn("SCAN attendance_sitevisit_fts VIRTUAL TABLE INDEX", text)
+            self.assertEqual(plan[0], "SEARCH attendance_sitevisit USING INTEGER PRIMARY KEY (rowid=?)")
+            for line in plan:
+                self.assertIsNone(FULL_SCAN.match(line), f"full table scan:\n{text}")
+
+    def test_export_date_range(self):
+        today = timezone.localdate()
+        for sql, params in self.capture_selects(lambda: list(export_rows(today - timedelta(days=7), today))):
+            self.assertIndexSeek(self.query_plan(sql, params), "attendance_date_id_idx")
+
+
+# ----------------- LIST QUERY COUNTS -----------------
+class ListQueryCountTests(TestCase):
+    """
+    Every list endpoint runs the same number of queries whatever the number of
+    rows: the relations its serializer reads are joined or prefetched, not
+    fetched row by row. Each row gets its own employee, project and plan, so a
+    missing select_related / prefetch_related shows up as extra queries.
+    """
+    ENDPOINTS = [
+        "/api/site-visits/",
+        "/api/property-bookings/",
+        "/api/projects/",
+        "/api/services/",
+        "/api/employee-service-status/",
+        "/api/reports/",
+        "/api/work-plans/",
+        "/api/work-details/",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("lister", first_name="List", last_name="Er")
+        cls.employee = Employee.objects.create(user=cls.user, mobile="9000000001")
+        cls.attendance = Attendance.objects.create(
+            employee=cls.employee, check_in_time=timezone.now(), device_id="test"
+        )
+        cls.rows = 0
+
+    def setUp(self):
+        cache.clear()  # catalog responses
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_rows(self, count):
+        for _ in range(count):
+            i = self.rows = self.rows + 1
+            user = User.objects.create_user(f"row{i}", first_name="Row", last_name=str(i))
+            employee = Employee.objects.create(user=user, mobile=f"8{i:09d}")
+            project = ProjectDetail.objects.create(
+                project_name=f"Project {i}", builder_name="Builder", project_type="plots", city="Nagpur",
+                address="Address", state="Maharashtra", zipcode="440001", number_of_units=10,
+            )
+            service = Service.objects.create(name=f"Service {i}")
+            SiteVisit.objects.create(
+                employee=employee, project=project, visitor_name=f"Visitor {i}", visitor_mobile="7000000000",
+            )
+            PropertyBooking.objects.create(
+                employee=employee, project=project, visitor_name=f"Buyer {i}", visitor_mobile="7000000000",
+                total_amount=100, advance_amount=10,
+            )
+            EmployeeServiceStatus.objects.create(
+                employee=employee, project=project, service=service, property_name=f"Plot {i}",
+                status="completed",
+            )
+            EmployeeReport.objects.create(employee=self.employee, attendance=self.attendance, report_text=str(i))
+            plan = WorkPlan.objects.create(employee=employee)
+            WorkDetail.objects.create(work_plan=plan, title="Calls", target_quantity=10)
+            WorkDetail.objects.create(work_plan=plan, title="Visits", target_quantity=5)
+
+    def list_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(queries), len(response.json()["results"])
+
+    def test_query_count_independent_of_rows(self):
+        self.add_rows(2)
+        for url in self.ENDPOINTS:
+            self.list_queries(url)  # warm per-process caches (user, principal)
+        few = {url: self.list_queries(url) for url in self.ENDPOINTS}
+        self.add_rows(6)
+        for url in self.ENDPOINTS:
+            with self.subTest(url=url):
+                queries, rows = self.list_queries(url)
+                self.assertGreater(rows, few[url][1])
+                self.assertEqual(queries, few[url][0])
+
+
+# ----------------- FAST LIST READS -----------------
+class FastListReadTests(TestCase):
+    """FAST_LIST_READS renders exactly the bytes the serializers do, on every page"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(employees=5, projects=3, visits=30, bookings=30, history_days=2, rng=random.Random(1))
+        cls.employee = Employee.objects.select_related("user").filter(
+            attendance__in=open_sessions()
+        ).first()
+        user = cls.employee.user
+        user.first_name, user.last_name = "Ärjun", ""
+        user.save()
+        visit = SiteVisit.objects.filter(employee=cls.employee).first() or SiteVisit.objects.first()
+        visit.visit_date, visit.remarks, visit.latitude = None, "“quoted” \\ remarks", 21.123456789
+        visit.save()
+        PropertyBooking.objects.filter(pk=PropertyBooking.objects.first().pk).update(plot_area="1234.50")
+        for i in range(4):
+            cls.employee.reports.create(
+                attendance=get_open_session(cls.employee), report_text=f"Report {i} ✓", latitude=21.1 + i,
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee.user)
+
+    def walk(self, url):
+        """Bodies of every page, following next links"""
+        bodies = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            bodies.append(response.content)
+            url = response.json()["next"]
+        return bodies
+
+    def test_output_matches_serializers(self):
+        urls = [
+            "/api/site-visits/?page_size=7",
+            f"/api/site-visits/?page_size=4&employee={self.employee.pk}",
+            "/api/property-bookings/?page_size=7",
+            "/api/property-bookings/?page_size=5&booking_status=pending",
+            "/api/reports/?page_size=2",
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with override_settings(FAST_LIST_READS=False):
+                    expected = self.walk(url)
+                with override_settings(FAST_LIST_READS=True):
+                    self.assertEqual(self.walk(url), expected)
+                self.assertGreater(len(expected), 1)
+
+
+# ----------------- SALES DASHBOARD -----------------
+class SalesDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("manager", is_staff=True)
+        cls.employee = employee = Employee.objects.create(
+            user=User.objects.create_user("seller"), mobile="9000000002"
+        )
+        project_fields = dict(
+            builder_name="Builder", project_type="plots", city="Nagpur", address="Address",
+            state="Maharashtra", zipcode="440001", number_of_units=10,
+        )
+        cls.project = ProjectDetail.objects.create(project_name="Green Acres", **project_fields)
+        cls.other = ProjectDetail.objects.create(project_name="Empty Plots", **project_fields)
+        for status, visitor_status in [
+            ("scheduled", "interested"), ("completed", "interested"), ("completed", "not_interested"),
+        ]:
+            SiteVisit.objects.create(
+                employee=employee, project=cls.project, visitor_name="Visitor", visitor_mobile="7000000000",
+                status=status, visitor_status=visitor_status,
+            )
+        for booking_status, total, advance in [
+            ("pending", Decimal("1000.50"), Decimal("100.25")), ("confirmed", Decimal("2000"), Decimal("500")),
+        ]:
+            PropertyBooking.objects.create(
+                employee=employee, project=cls.project, visitor_name="Buyer", visitor_mobile="7000000000",
+                booking_status=booking_status, total_amount=total, advance_amount=advance,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_figures(self):
+        summary = self.get(f"/api/dashboard/projects/{self.project.pk}/")
+        self.assertEqual(summary["project_name"], "Green Acres")
+        self.assertEqual(summary["visits"], {
+            "total": 3,
+            "by_status": {"scheduled": 1, "completed": 2, "cancelled": 0},
+            "by_visitor_status": {"interested": 2, "not_interested": 1},
+        })
+        self.assertEqual(summary["bookings"], {
+            "total": 2,
+            "by_status": {"pending": 1, "confirmed": 1, "cancelled": 0},
+            "total_amount": "3000.50",
+            "advance_amount": "600.25",
+            "remaining_amount": "2400.25",
+        })
+
+        empty = self.get("/api/dashboard/projects/")[0]  # newest project first
+        self.assertEqual(empty["project"], self.other.pk)
+        self.assertEqual(empty["visits"]["total"], 0)
+        self.assertEqual(empty["bookings"]["total_amount"], "0.00")
+
+    def test_fixed_query_count_and_cache(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.get("/api/dashboard/projects/")
+        with CaptureQueriesContext(connection) as warm:
+            self.get("/api/dashboard/projects/")
+        self.assertEqual(len(cold) - len(warm), 2)  # the two grouped queries
+
+    def test_saves_invalidate_the_project(self):
+        url = f"/api/dashboard/projects/{self.project.pk}/"
+        self.assertEqual(self.get(url)["visits"]["total"], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            visit = SiteVisit.objects.create(
+                employee=self.employee, project=self.project, visitor_name="Late", visitor_mobile="7000000000",
+            )
+        self.assertEqual(self.get(url)["visits"]["total"], 4)
+
+        # moving a visit refreshes both projects
+        self.get(f"/api/dashboard/projects/{self.other.pk}/")
+        with self.captureOnCommitCallbacks(execute=True):
+            visit.project = self.other
+            visit.save()
+        self.assertEqual(self.get(url)["visits"]["total"], 3)
+        self.assertEqual(self.get(f"/api/dashboard/projects/{self.other.pk}/")["visits"]["total"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PropertyBooking.objects.filter(booking_status="pending").get().delete()
+        self.assertEqual(self.get(url)["bookings"]["total_amount"], "2000.00")
+
+    def test_managers_only(self):
+        self.client.force_authenticate(self.employee.user)
+        self.assertEqual(self.client.get("/api/dashboard/projects/").status_code, 403)
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get("/api/dashboard/projects/999999/").status_code, 404)
+
+
+# ----------------- LEADS -----------------
+class LeadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = Employee.objects.create(
+            user=User.objects.create_user("agent", first_name="Field", last_name="Agent"), mobile="9000000003"
+        )
+        cls.project = ProjectDetail.objects.create(
+            project_name="Green Acres", builder_name="Builder", project_type="plots", city="Nagpur",
+            address="Address", state="Maharashtra", zipcode="440001", number_of_units=10,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee.user)
+
+    def visit(self, mobile, **fields):
+        return SiteVisit.objects.create(
+            employee=self.employee, project=self.project, visitor_name="Visitor", visitor_mobile=mobile, **fields
+        )
+
+    def booking(self, mobile):
+        return PropertyBooking.objects.create(
+            employee=self.employee, project=self.project, visitor_name="Buyer", visitor_mobile=mobile,
+            total_amount=Decimal("100"), advance_amount=Decimal("10"),
+        )
+
+    def test_canonical_phone(self):
+        for raw in ["9822012345", "+91 98220 12345", "098220-12345", "0091 9822012345", "(982) 201-2345"]:
+            with self.subTest(raw=raw):
+                self.assertEqual(leads.canonical_phone(raw), "9822012345")
+        self.assertEqual(leads.canonical_phone("0712 2555555"), "7122555555")
+        self.assertIsNone(leads.canonical_phone("n/a"))
+        self.assertIsNone(leads.canonical_phone(""))
+
+    def test_saves_link_one_lead_per_number(self):
+        first = self.visit("+91 98220 12345")
+        second = self.visit("09822012345")
+        booking = self.booking("9822012345")
+        self.assertIsNotNone(first.lead_id)
+        self.assertEqual({first.lead_id, second.lead_id, booking.lead_id}, {first.lead_id})
+        self.assertIsNone(self.visit("unknown").lead_id)
+
+        first.visitor_mobile = "9822099999"
+        first.save()
+        self.assertNotEqual(first.lead_id, second.lead_id)
+
+    def test_lookup_one(self):
+        self.visit("9822012345", status="completed")
+        self.visit("+919822012345")
+        self.booking("098220 12345")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/leads/lookup/", {"phone": "+91-98220-12345"})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(queries), 3)  # lead probe, visits, bookings
+        data = response.json()
+        self.assertEqual(data["phone"], "9822012345")
+        self.assertEqual(len(data["visits"]), 2)
+        self.assertEqual(data["visits"][1]["status"], "completed")  # newest first
+        self.assertEqual(data["visits"][0]["employee_name"], "Field Agent")
+        self.assertEqual(len(data["bookings"]), 1)
+
+        self.assertEqual(self.client.get("/api/leads/lookup/", {"phone": "9999999999"}).status_code, 404)
+        self.assertEqual(self.client.get("/api/leads/lookup/", {"phone": "abc"}).status_code, 400)
+
+    def test_batch_lookup(self):
+        for i in range(30):
+            self.visit(f"98{i:08d}")
+        self.booking("9800000007")
+        numbers = [f"+91 98{i:08d}" for i in range(30)] + ["9111111111", "not a number"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/leads/lookup/", {"phones": numbers}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(queries), 3)
+        results = response.json()["results"]
+        self.assertEqual([result["phone"] for result in results], numbers)
+        self.assertEqual(len(results[7]["lead"]["bookings"]), 1)
+        self.assertEqual(len(results[8]["lead"]["visits"]), 1)
+        self.assertIsNone(results[-2]["lead"])
+        self.assertIsNone(results[-1]["lead"])
+
+    def test_backfill(self):
+        SiteVisit.objects.bulk_create([
+            SiteVisit(employee=self.employee, project=self.project, visitor_name="Old", visitor_mobile=mobile)
+            for mobile in ["9822012345", "+91 9822012345", "9822000000", "-"]
+        ])
+        PropertyBooking.objects.bulk_create([
+            PropertyBooking(employee=self.employee, project=self.project, visitor_name="Old",
+                            visitor_mobile="0 9822000000", total_amount=Decimal("100"))
+        ])
+        self.assertEqual(leads.backfill(batch_size=2), (2, 4))
+        self.assertEqual(Lead.objects.count(), 2)
+        lead = Lead.objects.get(phone="9822000000")
+        self.assertEqual((lead.site_visits.count(), lead.bookings.count()), (1, 1))
+        self.assertEqual(leads.backfill(), (0, 0))
+
+
+# ----------------- SEARCH -----------------
+class SearchTests(TestCase):
+    """The FTS5 indexes behind ?q= and the admin search, kept in step by the triggers of migration 0026"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("searcher", first_name="Sunita", last_name="Deshmukh")
+        cls.employee = Employee.objects.create(user=cls.user, mobile="9000000004")
+        cls.project = ProjectDetail.objects.create(
+            project_name="Shanti Nagar", builder_name="Lotus Developers", project_type="plots", city="Nagpur",
+            address="Address", state="Maharashtra", zipcode="440001", number_of_units=10, khasra_number="KH-42/1",
+        )
+        cls.other_project = ProjectDetail.objects.create(
+            project_name="River View", builder_name="Builder", project_type="plots", city="Pune",
+            address="Address", state="Maharashtra", zipcode="411001", number_of_units=10,
+        )
+
+    def setUp(self):
+        cache.clear()  # catalog responses
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def visit(self, name, project=None, **fields):
+        return SiteVisit.objects.create(
+            employee=self.employee, project=project or self.project, visitor_name=name,
+            visitor_mobile="9822012345", **fields
+        )
+
+    def found(self, model, text):
+        return set(search.search(model.objects.all(), text).values_list("pk", flat=True))
+
+    def test_terms(self):
+        self.assertEqual(search.terms(' ramesh  "plot 12" '), ["ramesh", "plot 12"])
+        self.assertEqual(search.terms("   "), [])
+
+    def test_matches_like_the_admin_icontains_search(self):
+        ramesh = self.visit("Ramesh Patil", plot_number="B-17", visitor_address="Wardha Road")
+        priya = self.visit("Priya Joshi", project=self.other_project)
+        cases = [
+            ("mesh", {ramesh.pk}),              # inside a word
+            ("RAMESH", {ramesh.pk}),            # any case
+            ("ramesh wardha", {ramesh.pk}),     # every term, in any column
+            ("ramesh pune", set()),
+            ("sunita", {ramesh.pk, priya.pk}),  # employee name
+            ("river", {priya.pk}),              # project name
+            ("b-17", {ramesh.pk}),
+            ("b-", {ramesh.pk}),                # shorter than a trigram
+            ('"wardha road"', {ramesh.pk}),
+            ('"road wardha"', set()),
+            ('ra" OR * NEAR(', set()),          # FTS5 syntax is searched for, not parsed
+            ("%", set()),
+        ]
+        for text, expected in cases:
+            with self.subTest(text=text):
+                self.assertEqual(self.found(SiteVisit, text), expected)
+
+    def test_triggers_follow_every_write(self):
+        visit = self.visit("Ramesh Patil")
+        SiteVisit.objects.filter(pk=visit.pk).update(visitor_name="Mahesh Patil")
+        self.assertEqual(self.found(SiteVisit, "ramesh"), set())
+        self.assertEqual(self.found(SiteVisit, "mahesh"), {visit.pk})
+
+        self.user.first_name = "Anita"
+        self.user.save()
+        self.assertEqual(self.found(SiteVisit, "anita"), {visit.pk})
+        ProjectDetail.objects.filter(pk=self.project.pk).update(project_name="Lake Side")
+        self.assertEqual(self.found(SiteVisit, "lake side"), {visit.pk})
+        self.assertEqual(self.found(ProjectDetail, "lake side"), {self.project.pk})
+        self.assertEqual(self.found(ProjectDetail, "shanti"), set())
+
+        bulk = SiteVisit.objects.bulk_create([
+            SiteVisit(employee=self.employee, project=self.project, visitor_name="Bulk Visitor", visitor_mobile="1")
+        ])
+        self.assertEqual(self.found(SiteVisit, "bulk"), {bulk[0].pk})
+        SiteVisit.objects.all().delete()
+        self.assertEqual(self.found(SiteVisit, "patil"), set())
+
+    def test_api(self):
+        ramesh = self.visit("Ramesh Patil")
+        self.visit("Priya Joshi")
+        PropertyBooking.objects.create(
+            employee=self.employee, project=self.project, visitor_name="Ramesh Patil", visitor_mobile="1",
+            plot_number="C-9", total_amount=Decimal("100"), advance_amount=Decimal("10"),
+        )
+        response = self.client.get("/api/site-visits/", {"q": "ramesh", "project": self.project.pk})
+        self.assertEqual([row["id"] for row in response.json()["results"]], [ramesh.pk])
+        response = self.client.get("/api/property-bookings/", {"q": "c-9"})
+        self.assertEqual([row["plot_number"] for row in response.json()["results"]], ["C-9"])
+        response = self.client.get("/api/projects/", {"q": "KH-42"})
+        self.assertEqual([row["project_name"] for row in response.json()["results"]], ["Shanti Nagar"])
+        self.assertEqual(len(self.client.get("/api/projects/").json()["results"]), 2)
+
+    @override_settings(SEARCH_MAX_MATCHES=2)
+    def test_keeps_the_newest_matches(self):
+        visits = [self.visit(f"Visitor {i}") for i in range(3)]
+        self.assertEqual(self.found(SiteVisit, "visitor"), {visits[1].pk, visits[2].pk})
+        self.assertTrue(search.is_truncated(SiteVisit.objects.all(), "visitor"))
+        self.assertFalse(search.is_truncated(SiteVisit.objects.all(), '"visitor 1"'))
+
+    def test_cap_applies_after_the_filters(self):
+        # a small filtered set is searched row by row, a large one through the index
+        for scan_rows in [search.FILTERED_SCAN_ROWS, 0]:
+            with self.subTest(scan_rows=scan_rows), mock.patch.object(search, "FILTERED_SCAN_ROWS", scan_rows):
+                self.assertCapAfterFilters()
+                SiteVisit.objects.all().delete()
+                User.objects.filter(username="other").delete()
+
+    @override_settings(SEARCH_MAX_MATCHES=2)
+    def assertCapAfterFilters(self):
+        own = [self.visit(f"Visitor {i}", plot_number=f"Q{i}") for i in range(3)]
+        other = Employee.objects.create(user=User.objects.create_user("other"), mobile="9000000005")
+        for i in range(3):  # newer matches of another employee
+            SiteVisit.objects.create(employee=other, project=self.project, visitor_name=f"Visitor {i}", visitor_mobile="1")
+
+        response = self.client.get("/api/site-visits/", {"q": "visitor", "employee": self.employee.pk})
+        body = response.json()
+        self.assertEqual([row["id"] for row in body["results"]], [own[2].pk, own[1].pk])
+        self.assertIs(body["search_truncated"], True)
+
+        response = self.client.get("/api/site-visits/", {"q": '"visitor 0"', "employee": self.employee.pk})
+        body = response.json()
+        self.assertEqual([row["id"] for row in body["results"]], [own[0].pk])
+        self.assertIs(body["search_truncated"], False)
+        self.assertNotIn("search_truncated", self.client.get("/api/site-visits/").json())
+
+        response = self.client.get("/api/site-visits/", {"q": "q2", "employee": self.employee.pk})
+        self.assertEqual([row["id"] for row in response.json()["results"]], [own[2].pk])
+
+        self.client.force_login(User.objects.get_or_create(username="admin", is_staff=True, is_superuser=True)[0])
+        response = self.client.get("/admin/attendance/sitevisit/", {"q": "visitor", "employee__id__exact": self.employee.pk})
+        self.assertEqual(set(response.context["cl"].result_list), {own[1], own[2]})
+        self.assertIn("Only the 2 newest matches are listed", response.content.decode())
+        self.client.force_authenticate(self.user)
+
+    def test_admin_search(self):
+        visit = self.visit("Ramesh Patil")
+        self.visit("Priya Joshi")
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        response = self.client.get("/admin/attendance/sitevisit/", {"q": "sunita ramesh"})
+        self.assertEqual(list(response.context["cl"].result_list), [visit])
+
+    def test_keeps_the_querysets_ordering_and_related_rows(self):
+        visits = [self.visit(f"Ramesh {name}", plot_number=plot) for name, plot in (("A", "3"), ("B", "1"), ("C", "2"))]
+        self.visit("Priya Joshi")
+        queryset = SiteVisit.objects.select_related("employee__user", "project").filter(
+            employee=self.employee
+        ).order_by("plot_number")
+
+        matched = search.search(queryset, "ramesh")
+        # The filters are not repeated around the id lookup
+        where = str(matched.query).split(" WHERE ", 1)[1]
+        self.assertTrue(where.startswith('"attendance_sitevisit"."id" IN (SELECT rowid FROM attendance_sitevisit_fts '))
+        with self.assertNumQueries(1):
+            rows = [(visit.pk, visit.employee.user.first_name, visit.project.project_name) for visit in matched]
+        self.assertEqual(rows, [(visit.pk, "Sunita", "Shanti Nagar") for visit in (visits[1], visits[2], visits[0])])
+
+        unordered = search.search(SiteVisit.objects.order_by(), "ramesh")
+        self.assertFalse(unordered.ordered)
+
+    def test_rebuild(self):
+        visit = self.visit("Ramesh Patil")
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM attendance_sitevisit_fts")
+        self.assertEqual(self.found(SiteVisit, "ramesh"), set())
+        self.assertEqual(search.rebuild(), {
+            "attendance_projectdetail_fts": 2, "attendance_sitevisit_fts": 1, "attendance_propertybooking_fts": 0,
+        })
+        self.assertEqual(self.found(SiteVisit, "ramesh"), {visit.pk})
+
+
+# ----------------- ATTENDANCE ROLLUPS -----------------
+class AttendanceRollupTests(TestCase):
+    """Rollups kept by check-in / check-out increments equal the ones rebuild_rollups() recomputes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employees = [
+            Employee.objects.create(user=User.objects.create_user(f"rollup{i}"), mobile=f"900000010{i}")
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def snapshot(self):
+        return list(AttendanceRollup.objects.order_by("employee_id", "month").values_list(
+            "employee_id", "month", "present_days", "worked_time", "late_arrivals", "missing_checkouts",
+        ))
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        rollups.rebuild_rollups()
+        self.assertEqual(incremental, self.snapshot())
+        return incremental
+
+    def check_in(self, employee):
+        response = self.client.post("/api/attendance/check-in/", {
+            "employee_id": employee.employee_id, "check_in_latitude": 21.1, "check_in_longitude": 79.0,
+            "scan_type": "face", "device_id": "phone",
+        })
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def check_out(self, employee):
+        response = self.client.post("/api/attendance/check-out/", {
+            "employee_id": employee.employee_id, "check_out_latitude": 21.1, "check_out_longitude": 79.0,
+            "scan_type": "face", "device_id": "phone",
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def replay(self, *events):
+        response = self.client.post("/api/attendance/bulk/", {"events": [
+            {"event": event, "employee_id": employee.employee_id, "timestamp": at.isoformat(),
+             "scan_type": "face", "device_id": "phone"}
+            for event, employee, at in events
+        ]}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["summary"]["created"], len(events))
+
+    def test_increments_match_rebuild(self):
+        first, second = self.employees
+        now = timezone.localtime()
+        early = now.replace(hour=9, minute=0, second=0, microsecond=0)
+        late = now.replace(hour=11, minute=30, second=0, microsecond=0)
+        self.replay(
+            ("check_in", first, early - timedelta(days=45)),
+            ("check_out", first, early - timedelta(days=45, hours=-8)),
+            ("check_in", first, late - timedelta(days=44)),           # late, never checked out
+            ("check_in", second, late - timedelta(days=2)),
+            ("check_out", second, late - timedelta(days=2, hours=-6)),
+        )
+        self.check_in(first)
+        self.check_in(second)
+        self.check_out(first)
+
+        rows = self.assertMatchesRebuild()
+        self.assertEqual(sum(row[2] for row in rows), 5)  # present days
+        self.assertEqual(sum(row[5] for row in rows), 2)  # missing check-outs
+
+    def test_check_out_creates_a_missing_row(self):
+        employee = self.employees[0]
+        self.check_in(employee)
+        AttendanceRollup.objects.all().delete()  # e.g. checked in before the rollups were deployed
+        self.check_out(employee)
+        rows = self.assertMatchesRebuild()
+        self.assertEqual([(row[2], row[5]) for row in rows], [(1, 0)])
+
+    def test_rebuild_reads_inside_its_transaction(self):
+        # A check-in committed between the grouped read and the replacement would be lost
+        self.check_in(self.employees[0])
+        outside = []
+        depth = len(connection.atomic_blocks)
+
+        def record(execute, sql, params, many, context):
+            if '"attendance_attendance"' in sql and len(connection.atomic_blocks) <= depth:
+                outside.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            self.assertEqual(rollups.rebuild_rollups(), 1)
+        self.assertEqual(outside, [])
+
+    def test_migration_backfills_existing_attendance(self):
+        first, second = self.employees
+        early = timezone.localtime().replace(hour=9, minute=0, second=0, microsecond=0)
+        self.replay(
+            ("check_in", first, early - timedelta(days=40)),
+            ("check_out", first, early - timedelta(days=40, hours=-8)),
+            ("check_in", first, early - timedelta(days=39, hours=-3)),  # late
+            ("check_in", second, early - timedelta(days=3)),
+        )
+        expected = self.snapshot()
+        AttendanceRollup.objects.all().delete()
+
+        migration = "0018_attendancerollup"
+        historical_apps = MigrationLoader(connection).project_state(("attendance", migration)).apps
+        importlib.import_module(f"attendance.migrations.{migration}").backfill_rollups(
+            historical_apps, mock.Mock(connection=connection)
+        )
+        self.assertEqual(self.snapshot(), expected)
+        self.assertEqual(sum(row[2] for row in expected), 3)  # present days
+
+
+# ----------------- DEVICE BINDING CACHE -----------------
+class DeviceBindingCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.registered = Employee.objects.create(user=User.objects.create_user("bound"), mobile="9000000201")
+        cls.unregistered = Employee.objects.create(user=User.objects.create_user("unbound"), mobile="9000000202")
+        BiometricData.objects.create(employee=cls.registered, device_id="phone-1", public_key="key", status="success")
+
+    def setUp(self):
+        self.cache = devices.DeviceBindingCache(maxsize=10, ttl=60)
+        devices.binding_cache.clear()
+
+    def test_hit_and_miss(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                self.cache.get_many([self.registered.employee_id, self.unregistered.employee_id]),
+                {self.registered.employee_id: "phone-1", self.unregistered.employee_id: None},
+            )
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cache.get(self.registered.employee_id), "phone-1")
+            self.assertIsNone(self.cache.get(self.unregistered.employee_id))
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+
+    def test_unknown_employee_ids_are_not_cached(self):
+        self.assertIsNone(self.cache.get("NOSUCHID"))
+        self.assertEqual(self.cache.stats()["size"], 0)
+        with self.assertNumQueries(1):
+            self.cache.get("NOSUCHID")
+
+    def test_invalidated_by_registration_saves(self):
+        employee_id = self.unregistered.employee_id
+        self.assertIsNone(devices.binding_cache.get(employee_id))
+        BiometricData.objects.create(employee=self.unregistered, device_id="phone-2", public_key="key", status="success")
+        self.assertEqual(devices.binding_cache.get(employee_id), "phone-2")
+
+        biometric = self.unregistered.biometric_data
+        biometric.device_id = "phone-3"
+        biometric.save()
+        self.assertEqual(devices.binding_cache.get(employee_id), "phone-3")
+        biometric.delete()
+        self.assertIsNone(devices.binding_cache.get(employee_id))
+
+    def test_expiry_picks_up_changes_made_by_other_workers(self):
+        employee_id = self.registered.employee_id
+        now = 1000.0
+        with mock.patch("attendance.devices.time.monotonic", side_effect=lambda: now):
+            self.assertEqual(self.cache.get(employee_id), "phone-1")
+            # another worker re-registers: no signal reaches this cache
+            BiometricData.objects.filter(employee=self.registered).update(device_id="phone-9")
+            now += 59
+            self.assertEqual(self.cache.get(employee_id), "phone-1")
+            now += 2
+            self.assertEqual(self.cache.get(employee_id), "phone-9")
+
+    @override_settings(ATTENDANCE_DEVICE_POLICY="reject")
+    def test_reject_policy_accepts_a_registration_once_the_cached_miss_expires(self):
+        payload = {
+            "employee_id": self.unregistered.employee_id, "check_in_latitude": 21.1, "check_in_longitude": 79.0,
+            "scan_type": "face", "device_id": "phone-2",
+        }
+        now = 1000.0
+        with mock.patch("attendance.devices.time.monotonic", side_effect=lambda: now):
+            self.assertEqual(self.client.post("/api/attendance/check-in/", payload).status_code, 403)
+            BiometricData.objects.bulk_create([  # no signal, as when another worker registers
+                BiometricData(employee=self.unregistered, device_id="phone-2", public_key="key", status="success")
+            ])
+            self.assertEqual(self.client.post("/api/attendance/check-in/", payload).status_code, 403)
+            now += devices.binding_cache.ttl + 1
+            self.assertEqual(self.client.post("/api/attendance/check-in/", payload).status_code, 201)
+
+
+# ----------------- REPORT DEADLINE SCHEDULER -----------------
+@mock.patch("attendance.scheduler.send_missed_report_alert")
+class ReportDeadlineSchedulerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.now()
+        cls.silent, cls.reporting, cls.gone = [
+            Employee.objects.create(user=User.objects.create_user(f"scheduled{i}"), mobile=f"900000030{i}")
+            for i in range(3)
+        ]
+        today = timezone.localdate(cls.now)
+        # closed history the scheduler must not read
+        for days in range(1, 4):
+            Attendance.objects.create(
+                employee=cls.silent, date=today - timedelta(days=days), device_id="phone",
+                check_in_time=cls.now - timedelta(days=days, hours=8), check_out_time=cls.now - timedelta(days=days),
+            )
+        cls.silent_session = Attendance.objects.create(
+            employee=cls.silent, check_in_time=cls.now - timedelta(hours=2), device_id="phone"
+        )
+        cls.reporting_session = Attendance.objects.create(
+            employee=cls.reporting, check_in_time=cls.now - timedelta(hours=2), device_id="phone"
+        )
+        cls.report_time = cls.now - timedelta(minutes=5)
+        EmployeeReport.objects.create(
+            employee=cls.reporting, attendance=cls.reporting_session, report_text="On site", created_at=cls.report_time
+        )
+        cls.closed_today = Attendance.objects.create(
+            employee=cls.gone, check_in_time=cls.now - timedelta(hours=3), check_out_time=cls.now, device_id="phone"
+        )
+
+    def test_load_seeds_only_open_sessions(self, alert):
+        scheduler = ReportDeadlineScheduler()
+        with self.assertNumQueries(2):  # newest pk, open sessions
+            scheduler.load()
+        self.assertEqual(scheduler._deadlines, {
+            self.silent_session.pk: self.silent_session.check_in_time + REPORT_INTERVAL,
+            self.reporting_session.pk: self.report_time + REPORT_INTERVAL,
+        })
+        self.assertEqual(scheduler._last_pk, Attendance.objects.order_by("-pk").first().pk)
+
+        with self.assertNumQueries(1):
+            scheduler.poll()
+        self.assertEqual(len(scheduler), 2)
+        newcomer = Employee.objects.create(user=User.objects.create_user("newcomer"), mobile="9000000309")
+        checked_in = Attendance.objects.create(employee=newcomer, check_in_time=self.now, device_id="phone")
+        scheduler.poll()
+        self.assertEqual(scheduler._deadlines[checked_in.pk], self.now + REPORT_INTERVAL)
+
+    def test_fires_expired_deadlines_and_rearms(self, alert):
+        scheduler = ReportDeadlineScheduler()
+        scheduler.load()
+        self.assertEqual(scheduler.fire(self.now), [self.silent_session])
+        alert.assert_called_once_with(self.silent_session)
+        self.assertEqual(scheduler._deadlines[self.silent_session.pk], self.now + REPORT_INTERVAL)
+
+        alert.reset_mock()
+        self.assertEqual(scheduler.fire(self.now + timedelta(minutes=1)), [])
+        # one interval on, the reminder is due, and so is the reporting session's next report
+        self.assertCountEqual(
+            scheduler.fire(self.now + REPORT_INTERVAL + timedelta(seconds=1)),
+            [self.silent_session, self.reporting_session],
+        )
+
+    def test_report_since_the_deadline_was_armed_rearms_without_alert(self, alert):
+        scheduler = ReportDeadlineScheduler()
+        scheduler.load()
+        # armed from the check-in, then a report arrives through another process
+        scheduler.schedule(self.silent_session.pk, self.silent_session.check_in_time + REPORT_INTERVAL)
+        reported_at = self.now - timedelta(minutes=1)
+        EmployeeReport.objects.create(
+            employee=self.silent, attendance=self.silent_session, report_text="Late", created_at=reported_at
+        )
+        self.assertEqual(scheduler.fire(self.now), [])
+        alert.assert_not_called()
+        self.assertEqual(scheduler._deadlines[self.silent_session.pk], reported_at + REPORT_INTERVAL)
+
+    def test_checked_out_and_deleted_sessions_are_dropped(self, alert):
+        scheduler = ReportDeadlineScheduler()
+        scheduler.load()
+        Attendance.objects.filter(pk=self.silent_session.pk).update(check_out_time=self.now)
+        self.reporting_session.delete()
+        self.assertEqual(scheduler.fire(self.now + timedelta(hours=1)), [])
+        alert.assert_not_called()
+        self.assertEqual(len(scheduler), 0)
+        self.assertEqual(scheduler.next_wakeup(self.now), self.now + scheduler.poll_interval)
+
+
+# ----------------- BULK ATTENDANCE REPLAY -----------------
+class AttendanceBulkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = Employee.objects.create(user=User.objects.create_user("offline"), mobile="9000000401")
+        BiometricData.objects.create(employee=cls.employee, device_id="phone", public_key="key", status="success")
+
+    def setUp(self):
+        devices.binding_cache.clear()
+        self.morning = timezone.localtime().replace(hour=9, minute=0, second=0, microsecond=0) - timedelta(days=1)
+
+    def event(self, event, at, employee_id=None, **fields):
+        return {
+            "event": event, "employee_id": employee_id or self.employee.employee_id, "timestamp": at.isoformat(),
+            "scan_type": "face", "device_id": "phone", **fields,
+        }
+
+    def replay(self, *events):
+        response = self.client.post("/api/attendance/bulk/", {"events": list(events)}, content_type="application/json")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def results(self, body):
+        return [(result["result"], result.get("error")) for result in body["results"]]
+
+    def test_per_event_results(self):
+        body = self.replay(
+            self.event("check_out", self.morning + timedelta(hours=8)),  # applied after the check-in (scan order)
+            self.event("check_in", self.morning),
+            self.event("check_in", self.morning + timedelta(hours=1)),
+            self.event("check_in", self.morning, employee_id="NOSUCHID"),
+            self.event("check_out", self.morning + timedelta(days=-3)),
+            {"event": "check_in"},
+        )
+        self.assertEqual(self.results(body), [
+            ("created", None),
+            ("created", None),
+            ("duplicate", None),
+            ("rejected", "Invalid employee_id"),
+            ("rejected", "No active check-in found"),
+            ("rejected", None),
+        ])
+        self.assertIn("employee_id", body["results"][5]["errors"])
+        self.assertEqual(body["summary"], {"created": 2, "duplicate": 1, "rejected": 3})
+        session = Attendance.objects.get(employee=self.employee)
+        self.assertEqual(session.check_out_time - session.check_in_time, timedelta(hours=8))
+
+    def test_replaying_a_batch_again_reports_duplicates(self):
+        batch = [self.event("check_in", self.morning), self.event("check_out", self.morning + timedelta(hours=8))]
+        self.assertEqual(self.replay(*batch)["summary"], {"created": 2, "duplicate": 0, "rejected": 0})
+        self.assertEqual(self.replay(*batch)["summary"], {"created": 0, "duplicate": 2, "rejected": 0})
+        self.assertEqual(Attendance.objects.filter(employee=self.employee).count(), 1)
+        self.assertEqual(AttendanceRollup.objects.get(employee=self.employee).present_days, 1)
+
+    def test_check_out_before_check_in_and_overnight(self):
+        evening = self.morning + timedelta(hours=12)
+        self.replay(self.event("check_in", evening))
+        body = self.replay(self.event("check_out", evening - timedelta(hours=1)))
+        self.assertEqual(self.results(body), [("rejected", "Check-out is before check-in")])
+        body = self.replay(self.event("check_out", evening + timedelta(hours=14)))  # next day
+        self.assertEqual(self.results(body), [("created", None)])
+
+    def test_replaying_an_overnight_session_reports_duplicates(self):
+        evening = self.morning + timedelta(hours=13)  # 22:00
+        next_morning = evening + timedelta(hours=11)
+        batch = [self.event("check_in", evening), self.event("check_out", evening + timedelta(hours=8))]
+        self.assertEqual(self.results(self.replay(*batch)), [("created", None), ("created", None)])
+        self.assertEqual(self.results(self.replay(*batch)), [("duplicate", None), ("duplicate", None)])
+        # still a duplicate once the next day's session exists
+        self.assertEqual(self.results(self.replay(self.event("check_in", next_morning))), [("created", None)])
+        self.assertEqual(self.results(self.replay(*batch)), [("duplicate", None), ("duplicate", None)])
+        overnight = Attendance.objects.get(employee=self.employee, date=timezone.localdate(evening))
+        self.assertEqual(overnight.check_out_time, evening + timedelta(hours=8))
+        day_session = Attendance.objects.get(employee=self.employee, date=timezone.localdate(next_morning))
+        self.assertIsNone(day_session.check_out_time)
+
+    @override_settings(ATTENDANCE_DEVICE_POLICY="reject")
+    def test_reject_policy(self):
+        body = self.replay(self.event("check_in", self.morning, device_id="other-phone"))
+        self.assertEqual(self.results(body), [("rejected", "Device not registered for this employee")])
+
+    def test_lookups_run_inside_the_write_transaction(self):
+        # A replay racing with this one must wait for it rather than both
+        # passing the duplicate check and one failing on unique (employee, date)
+        # (TestCase runs each test in a transaction: count the view's own blocks)
+        outside = []
+        depth = len(connection.atomic_blocks)
+
+        def record(execute, sql, params, many, context):
+            if '"attendance_attendance"' in sql and len(connection.atomic_blocks) <= depth:
+                outside.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            self.replay(self.event("check_in", self.morning))
+        self.assertEqual(outside, [])
+
+
+# ----------------- CHECK-OUT -----------------
+class AttendanceCheckOutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = Employee.objects.create(user=User.objects.create_user("leaving"), mobile="9000000501")
+        BiometricData.objects.create(employee=cls.employee, device_id="phone", public_key="key", status="success")
+
+    def setUp(self):
+        devices.binding_cache.clear()
+
+    def check_out(self, employee_id=None, **fields):
+        return self.client.post("/api/attendance/check-out/", {
+            "employee_id": employee_id or self.employee.employee_id, "check_out_latitude": "28.600000",
+            "check_out_longitude": "77.200000", "scan_type": "face", "device_id": "phone", **fields,
+        }, content_type="application/json")
+
+    def check_in(self, at):
+        return Attendance.objects.create(
+            employee=self.employee, date=timezone.localdate(at), check_in_time=at, scan_type="face", device_id="phone",
+        )
+
+    def test_closes_the_open_session(self):
+        session = self.check_in(timezone.now() - timedelta(hours=8))
+        response = self.check_out()
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json(), {"message": "Check-out successful"})
+        session.refresh_from_db()
+        self.assertIsNotNone(session.check_out_time)
+        self.assertEqual(session.check_out_latitude, 28.6)
+        self.assertTrue(session.device_verified)
+        self.assertIsNone(get_open_session(self.employee))
+
+    def test_no_open_session(self):
+        response = self.check_out()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "No active check-in found"})
+
+    def test_unknown_employee_id(self):
+        response = self.check_out(employee_id="NOSUCHID")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "Invalid employee_id"})
+
+    def test_session_crossing_midnight(self):
+        today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        session = self.check_in(today - timedelta(hours=2))  # 22:00 yesterday
+        response = self.check_out()
+        self.assertEqual(response.status_code, 200, response.content)
+        session.refresh_from_db()
+        self.assertEqual(session.date, timezone.localdate(today - timedelta(hours=2)))
+        self.assertGreater(session.check_out_time, today)
+
+    def test_second_check_out_is_refused(self):
+        session = self.check_in(timezone.now() - timedelta(hours=8))
+        self.assertEqual(self.check_out().status_code, 200)
+        session.refresh_from_db()
+        checked_out_at = session.check_out_time
+        response = self.check_out()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "No active check-in found"})
+        session.refresh_from_db()
+        self.assertEqual(session.check_out_time, checked_out_at)
+
+    def test_closes_only_the_latest_open_session(self):
+        older = self.check_in(timezone.now() - timedelta(days=2))
+        latest = self.check_in(timezone.now() - timedelta(hours=8))
+        self.assertEqual(self.check_out().status_code, 200)
+        older.refresh_from_db()
+        latest.refresh_from_db()
+        self.assertIsNone(older.check_out_time)
+        self.assertIsNotNone(latest.check_out_time)
+
+
+# ----------------- EMPLOYEE FULL DATA -----------------
+class EmployeeFullDataTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = Employee.objects.create(user=User.objects.create_user("history"), mobile="9000000601")
+        cls.first_day = timezone.localdate().replace(day=1) - timedelta(days=60)
+        cls.days = [cls.first_day + timedelta(days=offset) for offset in range(40)]
+        for day in cls.days:
+            check_in = timezone.make_aware(datetime.combine(day, time(9)))
+            Attendance.objects.create(employee=cls.employee, date=day, check_in_time=check_in, device_id="phone")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee.user)
+        self.url = f"/api/employee/{self.employee.employee_id}/full-data/"
+
+    def get(self, url=None, **params):
+        response = self.client.get(url or self.url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def dates(self, body):
+        return [record["date"] for record in body["attendance_records"]]
+
+    def test_date_range(self):
+        body = self.get(**{"from": self.days[5].isoformat(), "to": self.days[9].isoformat()})
+        self.assertEqual(self.dates(body), [day.isoformat() for day in reversed(self.days[5:10])])
+        self.assertIsNone(body["attendance_next"])
+        body = self.get(**{"from": self.days[35].isoformat()})
+        self.assertEqual(self.dates(body), [day.isoformat() for day in reversed(self.days[35:])])
+
+    def test_invalid_and_inverted_dates(self):
+        for params in (
+            {"from": "2024-13-01"},
+            {"to": "yesterday"},
+            {"from": "2024-02-30"},
+            {"from": self.days[9].isoformat(), "to": self.days[5].isoformat()},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+    def test_summary_only(self):
+        body = self.get(summary="true")
+        self.assertEqual(body["employee_id"], self.employee.employee_id)
+        self.assertIn("current_month", body)
+        self.assertNotIn("attendance_records", body)
+        self.assertNotIn("attendance_next", body)
+
+    def test_pages_cover_the_history_once(self):
+        body = self.get(page_size=15)
+        self.assertIsNone(body["attendance_previous"])
+        pages = [self.dates(body)]
+        while body["attendance_next"]:
+            body = self.get(body["attendance_next"])
+            pages.append(self.dates(body))
+        self.assertEqual([len(page) for page in pages], [15, 15, 10])
+        self.assertEqual(sum(pages, []), [day.isoformat() for day in reversed(self.days)])
+
+        # and back again from the last page
+        back = self.get(body["attendance_previous"])
+        self.assertEqual(self.dates(back), pages[1])
+
+    def test_page_size_is_capped(self):
+        with mock.patch.object(AttendanceRecordPagination, "max_page_size", 25):
+            body = self.get(page_size=1000)
+        self.assertEqual(len(body["attendance_records"]), 25)
+        body = self.get()
+        self.assertEqual(len(body["attendance_records"]), AttendanceRecordPagination.page_size)
+        self.assertIsNotNone(body["attendance_next"])
+
+    def test_unknown_employee(self):
+        self.assertEqual(self.client.get("/api/employee/NOSUCHID/full-data/").status_code, 404)
+
+
+# ----------------- PAYROLL EXPORT -----------------
+class AttendanceExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("payroll", is_staff=True)
+        user = User.objects.create_user("quoted", first_name='Ann, "Jr"', last_name="O'Neil\nSmith")
+        cls.employee = Employee.objects.create(user=user, mobile="9000000701")
+        cls.day = timezone.localdate() - timedelta(days=10)
+        for offset in (-1, 0, 1, 2):
+            day = cls.day + timedelta(days=offset)
+            check_in = timezone.make_aware(datetime.combine(day, time(9)))
+            Attendance.objects.create(
+                employee=cls.employee, date=day, check_in_time=check_in, check_out_time=check_in + timedelta(hours=8),
+                check_in_latitude=28.6, scan_type="face", device_id="phone", status="present",
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, **params):
+        params = {"from": self.day.isoformat(), "to": (self.day + timedelta(days=1)).isoformat(), **params}
+        response = self.client.get("/api/attendance/export/", params)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response, content = self.export()
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(
+            response["Content-Disposition"],
+            f'attachment; filename="attendance_{self.day}_{self.day + timedelta(days=1)}.csv"',
+        )
+        rows = list(csv.reader(io.StringIO(content, newline="")))
+        self.assertEqual(rows[0], [name for name, _ in EXPORT_COLUMNS])
+        self.assertEqual(len(rows), 3)  # header + the two days in range
+        first = dict(zip(rows[0], rows[1]))
+        self.assertEqual(first["employee_id"], self.employee.employee_id)
+        self.assertEqual(first["first_name"], 'Ann, "Jr"')
+        self.assertEqual(first["last_name"], "O'Neil\nSmith")
+        self.assertEqual(first["date"], self.day.isoformat())
+        self.assertEqual(first["check_in_time"], timezone.make_aware(datetime.combine(self.day, time(9))).isoformat())
+        self.assertEqual(first["check_out_site"], "")
+        self.assertEqual(dict(zip(rows[0], rows[2]))["date"], (self.day + timedelta(days=1)).isoformat())
+        self.assertIn('"Ann, ""Jr"""', content)
+
+    def test_jsonl(self):
+        response, content = self.export(type="jsonl")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertTrue(content.endswith("\n"))
+        lines = content.splitlines()
+        self.assertEqual(len(lines), 2)
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(list(records[0]), [name for name, _ in EXPORT_COLUMNS])
+        self.assertEqual(records[0]["first_name"], 'Ann, "Jr"')
+        self.assertEqual(records[0]["last_name"], "O'Neil\nSmith")
+        self.assertEqual(records[0]["check_in_latitude"], 28.6)
+        self.assertIs(records[0]["device_verified"], True)
+        self.assertIsNone(records[0]["check_out_site"])
+        self.assertEqual(
+            [record["date"] for record in records], [self.day.isoformat(), (self.day + timedelta(days=1)).isoformat()]
+        )
+
+    def test_empty_range_is_just_the_header(self):
+        _, content = self.export(**{"from": "2001-01-01", "to": "2001-01-31"})
+        self.assertEqual(list(csv.reader(io.StringIO(content, newline=""))), [[name for name, _ in EXPORT_COLUMNS]])
+        _, content = self.export(**{"from": "2001-01-01", "to": "2001-01-31", "type": "jsonl"})
+        self.assertEqual(content, "")
+
+    def test_bad_parameters(self):
+        for params in ({"from": ""}, {"to": "2024-02-30"}, {"type": "xlsx"}):
+            with self.subTest(params=params):
+                query = {"from": self.day.isoformat(), "to": self.day.isoformat(), **params}
+                response = self.client.get("/api/attendance/export/", query)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+    def test_admins_only(self):
+        self.client.force_authenticate(self.employee.user)
+        day = self.day.isoformat()
+        response = self.client.get("/api/attendance/export/", {"from": day, "to": day})
+        self.assertEqual(response.status_code, 403)
+
+
+# ----------------- LOGIN THROTTLING -----------------
+@override_settings(
+    LOGIN_THROTTLE_RATES={"mobile": "3/min", "ip": "100/min"},
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class LoginThrottleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user("signin", password="secret")
+        cls.employee = Employee.objects.create(user=user, mobile="9000000801")
+
+    def setUp(self):
+        cache.clear()
+        self.now = 1_000_000.0
+        patcher = mock.patch.object(LoginThrottle, "timer", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def login(self, mobile="9000000801", password="wrong"):
+        return self.client.post(
+            "/api/login/", {"username": mobile, "password": password}, content_type="application/json"
+        )
+
+    def test_bucket_refuses_before_the_lookup_and_the_hash(self):
+        with mock.patch.object(User, "check_password", autospec=True, return_value=False) as check_password:
+            for _ in range(3):
+                self.assertEqual(self.login().status_code, 400)
+            self.assertEqual(check_password.call_count, 3)
+            with self.assertNumQueries(0):
+                response = self.login()
+            self.assertEqual(check_password.call_count, 3)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "20")  # one token at 3/min
+        # another mobile has its own bucket
+        self.assertEqual(self.login(mobile="9000000802").status_code, 400)
+
+    def test_bucket_refills(self):
+        for _ in range(3):
+            self.login()
+        self.assertEqual(self.login().status_code, 429)
+        self.now += 20
+        response = self.login(password="secret")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.login().status_code, 429)
+
+    @override_settings(LOGIN_THROTTLE_RATES={"ip": "2/min"})
+    def test_ip_bucket(self):
+        self.assertEqual(self.login(mobile="9000000811").status_code, 400)
+        self.assertEqual(self.login(mobile="9000000812").status_code, 400)
+        self.assertEqual(self.login(mobile="9000000813").status_code, 429)
+        self.assertEqual(self.client.post("/api/login/", {}, REMOTE_ADDR="10.0.0.9").status_code, 400)
+
+    def test_unknown_mobile_is_answered_from_the_cache(self):
+        with self.assertNumQueries(1):
+            response = self.login(mobile="9000000899")
+        self.assertEqual(response.json(), {"error": "Invalid mobile"})
+        self.assertTrue(is_unknown_mobile("9000000899"))
+        with self.assertNumQueries(0):
+            response = self.login(mobile="9000000899")
+        self.assertEqual((response.status_code, response.json()), (400, {"error": "Invalid mobile"}))
+
+    def test_wrong_password_is_not_cached_as_unknown(self):
+        self.assertEqual(self.login().json(), {"error": "Invalid password"})
+        self.assertFalse(is_unknown_mobile(self.employee.mobile))
+
+    def test_saving_an_employee_forgets_the_mobile(self):
+        self.login(mobile="9000000898")
+        self.assertTrue(is_unknown_mobile("9000000898"))
+        Employee.objects.create(user=User.objects.create_user("newcomer", password="secret"), mobile="9000000898")
+        self.assertFalse(is_unknown_mobile("9000000898"))
+        response = self.login(mobile="9000000898", password="secret")
+        self.assertEqual(response.status_code, 200, response.content)
+
+        # and so does moving an existing employee onto a remembered mobile
+        self.login(mobile="9000000897")
+        self.employee.mobile = "9000000897"
+        self.employee.save()
+        self.assertFalse(is_unknown_mobile("9000000897"))
+
+
+# ----------------- AUTH PRINCIPAL CACHE -----------------
+class PrincipalCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("principal", first_name="Prin")
+        cls.employee = Employee.objects.create(user=cls.user, mobile="9000000901")
+
+    def setUp(self):
+        principal_cache.clear()
+        self.addCleanup(principal_cache.clear)
+        self.token = tokens_for_employee(self.employee).access_token
+
+    def authenticate(self, token=None):
+        return EmployeeJWTAuthentication().get_user(token or self.token)
+
+    def test_second_request_is_served_from_the_cache(self):
+        with self.assertNumQueries(1):
+            user = self.authenticate()
+        self.assertEqual(user.employee.pk, self.employee.pk)
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.assertEqual(user.employee.employee_id, self.employee.employee_id)
+        # end to end: the profile endpoint authenticates from the cache too
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/profile/", HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["employee_id"], self.employee.employee_id)
+
+    def test_requests_get_their_own_copies(self):
+        first = self.authenticate()
+        first.first_name = "Changed"
+        first.employee.mobile = "0000000000"
+        second = self.authenticate()
+        self.assertEqual((second.first_name, second.employee.mobile), ("Prin", "9000000901"))
+        self.assertIs(second.employee.user, second)
+
+    def test_saving_or_deleting_evicts(self):
+        for change, queries in (
+            ("user saved", 1),
+            ("employee saved", 1),
+            ("unrelated save", 0),
+        ):
+            self.authenticate()
+            if change == "user saved":
+                User.objects.get(pk=self.user.pk).save()
+            elif change == "employee saved":
+                Employee.objects.get(pk=self.employee.pk).save()
+            else:
+                Service.objects.create(name="unrelated")
+            with self.subTest(change=change), self.assertNumQueries(queries):
+                self.authenticate()
+
+        self.authenticate()
+        self.employee.delete()
+        self.assertIsNone(principal_cache.get(self.user.pk))
+        self.authenticate()
+        User.objects.filter(pk=self.user.pk).get().delete()
+        self.assertIsNone(principal_cache.get(self.user.pk))
+
+    def test_entries_expire(self):
+        clock = mock.Mock(return_value=1000.0)
+        with mock.patch("attendance.authentication.time.monotonic", clock):
+            cache_ = PrincipalCache(ttl=60)
+            cache_.set(self.user.pk, self.user)
+            clock.return_value = 1059.0
+            self.assertIsNotNone(cache_.get(self.user.pk))
+            clock.return_value = 1061.0
+            self.assertIsNone(cache_.get(self.user.pk))
+            self.assertIsNone(cache_.get(str(self.user.pk)))
+
+    def test_least_recently_used_entry_is_dropped_past_maxsize(self):
+        cache_ = PrincipalCache(maxsize=2)
+        cache_.set(1, self.user)
+        cache_.set(2, self.user)
+        cache_.get("1")
+        cache_.set(3, self.user)
+        self.assertIsNotNone(cache_.get(1))
+        self.assertIsNone(cache_.get(2))
+        self.assertIsNotNone(cache_.get(3))
+
+    def test_principal_that_disagrees_with_the_token_is_reloaded(self):
+        # A cached principal with another employee (or none), e.g. left by a
+        # worker that has not seen the change yet
+        stale = User.objects.get(pk=self.user.pk)
+        stale.employee = Employee(pk=self.employee.pk + 1000, user=stale, mobile="0")
+        principal_cache.set(self.user.pk, stale)
+        with self.assertNumQueries(1):
+            user = self.authenticate()
+        self.assertEqual(user.employee.pk, self.employee.pk)
+
+        principal_cache.set(self.user.pk, User.objects.get(pk=self.user.pk))  # employee not loaded
+        with self.assertNumQueries(1):
+            user = self.authenticate()
+        self.assertEqual(user.employee.pk, self.employee.pk)
+        with self.assertNumQueries(0):
+            self.authenticate()
+
+    def test_deleted_user_is_refused(self):
+        self.authenticate()
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+
+# ----------------- REPORT WRITE-BEHIND -----------------
+class ReportWriteBehindTests(TestCase):
+    """
+    The flusher thread is not started: these tests flush from the test's own
+    thread and connection, and stand in for a crash by closing a buffer's
+    spool (releasing its flock) without flushing.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = Employee.objects.create(user=User.objects.create_user("reporter"), mobile="9000001001")
+        cls.session = Attendance.objects.create(
+            employee=cls.employee, check_in_time=timezone.now() - timedelta(hours=1), device_id="phone"
+        )
+
+    def setUp(self):
+        self.spool_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(mock.patch.object(report_buffer.ReportWriteBehind, "_start_thread"))
+
+    def buffer(self, **options):
+        return report_buffer.ReportWriteBehind(self.spool_dir, **options)
+
+    def submit(self, buffer, text):
+        return buffer.submit(self.employee.pk, self.session.pk, text, 28.6, 77.2)
+
+    def crash(self, buffer):
+        buffer._spool.close()
+
+    def spooled(self, name):
+        with open(f"{self.spool_dir}/{name}", encoding="utf-8") as handle:
+            return [json.loads(line)["spool_id"] for line in handle]
+
+    def test_submit_then_flush(self):
+        buffer = self.buffer()
+        entries = [self.submit(buffer, f"report {i}") for i in range(3)]
+        own_spool = f"reports-{buffer._pid}.jsonl"
+        self.assertEqual(buffer.pending(), 3)
+        self.assertEqual(self.spooled(own_spool), [entry["spool_id"] for entry in entries])
+        self.assertFalse(EmployeeReport.objects.exists())
+
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(buffer.pending(), 0)
+        self.assertEqual(self.spooled(own_spool), [])
+        reports = EmployeeReport.objects.order_by("report_text")
+        self.assertEqual([str(report.spool_id) for report in reports], [entry["spool_id"] for entry in entries])
+        self.assertEqual(reports[0].created_at.isoformat(), entries[0]["created_at"])
+        self.assertEqual((reports[0].latitude, reports[0].attendance_id), (28.6, self.session.pk))
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_flushes_in_batches_of_batch_size(self):
+        buffer = self.buffer(batch_size=2)
+        for i in range(5):
+            self.submit(buffer, f"report {i}")
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(buffer.flush(), 5)
+        self.assertEqual(len([query for query in queries if query["sql"].startswith("INSERT")]), 3)
+        self.assertEqual(EmployeeReport.objects.count(), 5)
+
+    def test_restart_replays_its_own_spool(self):
+        crashed = self.buffer()
+        entry = self.submit(crashed, "before the crash")
+        self.crash(crashed)
+
+        restarted = self.buffer()
+        self.submit(restarted, "after the restart")
+        self.assertEqual(restarted.pending(), 2)
+        self.assertEqual(restarted.flush(), 2)
+        self.assertTrue(EmployeeReport.objects.filter(spool_id=entry["spool_id"]).exists())
+
+    def test_replays_a_dead_process_spool(self):
+        crashed = self.buffer()
+        entries = [self.submit(crashed, f"report {i}") for i in range(2)]
+        self.crash(crashed)
+        dead_path = os.path.join(self.spool_dir, "reports-999999999.jsonl")
+        os.replace(crashed._spool_path(crashed._pid), dead_path)
+
+        survivor = self.buffer()
+        self.submit(survivor, "survivor")
+        self.assertFalse(os.path.exists(dead_path))
+        self.assertEqual(survivor.flush(), 3)
+        self.assertEqual(
+            set(EmployeeReport.objects.values_list("report_text", flat=True)), {"report 0", "report 1", "survivor"}
+        )
+        self.assertTrue(EmployeeReport.objects.filter(spool_id=entries[1]["spool_id"]).exists())
+
+    def test_live_process_spool_is_left_alone(self):
+        live = self.buffer()
+        self.submit(live, "still buffered")
+        # Another name for the spool `live` holds locked, as another live worker's would be
+        other_path = os.path.join(self.spool_dir, "reports-999999999.jsonl")
+        os.link(live._spool_path(live._pid), other_path)
+        with live._lock:
+            self.assertEqual(live._recover(), [])
+        self.assertTrue(os.path.exists(other_path))
+        self.assertEqual(live.pending(), 1)
+
+    def test_replaying_inserted_reports_is_a_no_op(self):
+        crashed = self.buffer()
+        entries = [self.submit(crashed, f"report {i}") for i in range(2)]
+        # inserted, then the worker died before dropping them from the spool
+        crashed._insert(crashed._pending)
+        self.crash(crashed)
+        self.assertEqual(EmployeeReport.objects.count(), 2)
+
+        restarted = self.buffer()
+        self.assertEqual(restarted.pending(), 0)  # not started until its first submit
+        self.submit(restarted, "report 2")
+        self.assertEqual(restarted.flush(), 3)
+        self.assertEqual(restarted.flush(), 0)
+        self.assertEqual(EmployeeReport.objects.count(), 3)
+        for entry in entries:
+            self.assertEqual(EmployeeReport.objects.filter(spool_id=entry["spool_id"]).count(), 1)
+
+    def test_accepted_body_matches_the_async_view(self):
+        token = tokens_for_employee(self.employee).access_token
+        payload = {"report_text": "on site", "latitude": 28.6, "longitude": 77.2}
+        with override_settings(REPORT_WRITE_BEHIND=True, REPORT_SPOOL_DIR=self.spool_dir), \
+                mock.patch.object(report_buffer, "_buffer", None):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+            response = client.post("/api/reports/", payload, format="json")
+            request = AsyncRequestFactory().post(
+                "/api/reports/", payload, content_type="application/json", headers={"authorization": f"Bearer {token}"}
+            )
+            async_response = async_to_sync(AsyncEmployeeReportView.as_view())(request)
+            buffer = report_buffer.get_buffer()
+            self.assertEqual(buffer.spool_dir, self.spool_dir)
+            self.assertEqual(buffer.flush(), 2)
+
+        self.assertEqual((response.status_code, async_response.status_code), (202, 202))
+        body, async_body = response.json(), json.loads(async_response.content)
+        self.assertEqual(body, {
+            "id": None, "employee": self.employee.pk, "attendance": self.session.pk, **payload,
+            "created_at": body["created_at"], "spool_id": body["spool_id"],
+        })
+        self.assertEqual(list(async_body), list(body))
+        self.assertEqual(
+            {key: value for key, value in async_body.items() if key not in ("created_at", "spool_id")},
+            {key: value for key, value in body.items() if key not in ("created_at", "spool_id")},
+        )
+        spool_ids = set(str(spool_id) for spool_id in EmployeeReport.objects.values_list("spool_id", flat=True))
+        self.assertEqual(spool_ids, {body["spool_id"], async_body["spool_id"]})
+
+
+# ----------------- CATALOG CACHE -----------------
+@override_settings(ALLOWED_HOSTS=["testserver", "api.example.com"])
+class CatalogCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("catalog")
+        cls.projects = [
+            ProjectDetail.objects.create(
+                project_name=f"Catalog {i}", builder_name="Builder", project_type="plots", city="Nagpur",
+                address="Address", state="Maharashtra", zipcode="440001", number_of_units=10,
+            )
+            for i in range(3)
+        ]
+        cls.service = Service.objects.create(name="Survey")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, status=200, **headers):
+        response = self.client.get(url, headers=headers)
+        self.assertEqual(response.status_code, status)
+        return response
+
+    def test_revalidation_gets_an_empty_304(self):
+        for url in ("/api/projects/", f"/api/projects/{self.projects[0].pk}/", "/api/services/"):
+            with self.subTest(url=url):
+                first = self.get(url)
+                self.assertTrue(first["ETag"].startswith('"'))
+                self.assertEqual(first["Cache-Control"], "private, no-cache")
+                with self.assertNumQueries(0):
+                    cached = self.get(url)
+                self.assertEqual((cached.content, cached["ETag"]), (first.content, first["ETag"]))
+
+                with self.assertNumQueries(0):
+                    response = self.get(url, 304, if_none_match=first["ETag"])
+                self.assertEqual(response.content, b"")
+                self.get(url, 304, if_modified_since=first["Last-Modified"])
+                self.get(url, 200, if_none_match='"stale"')
+
+    def test_saving_bumps_the_version(self):
+        projects = self.get("/api/projects/")
+        detail = self.get(f"/api/projects/{self.projects[0].pk}/")
+        services = self.get("/api/services/")
+
+        self.projects[0].project_name = "Renamed"
+        self.projects[0].save()
+        response = self.get("/api/projects/", if_none_match=projects["ETag"])
+        self.assertIn("Renamed", response.content.decode())
+        self.assertNotEqual(response["ETag"], projects["ETag"])
+        self.assertGreater(parse_http_date(response["Last-Modified"]), parse_http_date(projects["Last-Modified"]))
+        self.get(f"/api/projects/{self.projects[0].pk}/", 200, if_none_match=detail["ETag"])
+        # Services keep their version
+        self.get("/api/services/", 304, if_none_match=services["ETag"])
+
+        self.service.name = "Survey (renamed)"
+        self.service.save()
+        response = self.get("/api/services/", if_none_match=services["ETag"])
+        self.assertEqual(response.json()["results"][0]["name"], "Survey (renamed)")
+
+        projects = self.get("/api/projects/")
+        self.projects[2].delete()
+        self.assertEqual(len(self.get("/api/projects/", if_none_match=projects["ETag"]).json()["results"]), 2)
+
+    def test_each_version_gets_a_later_last_modified(self):
+        first = catalog_cache.bump_catalog_version(ProjectDetail)
+        second = catalog_cache.bump_catalog_version(ProjectDetail)
+        self.assertNotEqual(first[0], second[0])
+        self.assertGreater(second[1], first[1])
+
+    def test_key_includes_scheme_and_host(self):
+        url = "/api/projects/?page_size=1"
+        plain = self.client.get(url)
+        other_host = self.client.get(url, HTTP_HOST="api.example.com")
+        secure = self.client.get(url, secure=True)
+        self.assertTrue(plain.json()["next"].startswith("http://testserver/"))
+        self.assertTrue(other_host.json()["next"].startswith("http://api.example.com/"))
+        self.assertTrue(secure.json()["next"].startswith("https://testserver/"))
+        self.assertEqual(len({plain["ETag"], other_host["ETag"], secure["ETag"]}), 3)
+
+
+# ----------------- ASYNC VIEWS -----------------
+@contextmanager
+def async_routes(enabled=True):
+    """Route the hot endpoints to the async views or not (attendance/urls.py reads the setting at import)"""
+    def reload():
+        from attendance import urls
+        from attendance_project import urls as root_urls
+        importlib.reload(urls)
+        importlib.reload(root_urls)
+        clear_url_caches()
+
+    try:
+        with override_settings(ATTENDANCE_ASYNC_VIEWS=enabled):
+            reload()
+            yield
+    finally:
+        reload()
+
+
+class AsyncViewParityTests(TestCase):
+    """
+    Each request is sent to the DRF view through Client and to its async
+    counterpart through AsyncClient, from the same database state, and must
+    get the same status, body and WWW-Authenticate header.
+    """
+    CHECK_IN = "/api/attendance/check-in/"
+    CHECK_OUT = "/api/attendance/check-out/"
+    REPORTS = "/api/reports/"
+    MISSED = "/api/missed_reports/missed_reports/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = Employee.objects.create(user=User.objects.create_user("parity"), mobile="9000001101")
+        BiometricData.objects.create(employee=cls.employee, device_id="phone", public_key="key", status="success")
+        cls.token = str(tokens_for_employee(cls.employee).access_token)
+
+    def setUp(self):
+        devices.binding_cache.clear()
+        principal_cache.clear()
+
+    def scan(self, prefix, **fields):
+        return {
+            "employee_id": self.employee.employee_id, f"{prefix}_latitude": "28.600000",
+            f"{prefix}_longitude": "77.200000", "scan_type": "face", "device_id": "phone", **fields,
+        }
+
+    def check_in(self, minutes_ago):
+        return Attendance.objects.create(
+            employee=self.employee, check_in_time=timezone.now() - timedelta(minutes=minutes_ago), device_id="phone"
+        )
+
+    def send(self, use_async, method, url, data, token):
+        headers = {"authorization": f"Bearer {token}"} if token else {}
+        if method == "post":
+            body = data if isinstance(data, str) else json.dumps(data)
+            kwargs = {"data": body, "content_type": "application/json"}
+        else:
+            kwargs = {"data": data}
+        with async_routes(use_async):
+            view = resolve(url).func
+            self.assertEqual(issubclass(getattr(view, "cls", None) or view.view_class, AsyncAPIView), use_async)
+            if use_async:
+                return async_to_sync(getattr(AsyncClient(), method))(url, headers=headers, **kwargs)
+            return getattr(Client(), method)(url, headers=headers, **kwargs)
+
+    def both(self, method, url, data=None, token=None, setup=None, ignore=()):
+        """(status, body, WWW-Authenticate) that the sync and the async view both returned"""
+        results = []
+        for use_async in (False, True):
+            with transaction.atomic():
+                if setup:
+                    setup()
+                response = self.send(use_async, method, url, data, token)
+                transaction.set_rollback(True)
+            body = {key: value for key, value in response.json().items() if key not in ignore}
+            results.append((response.status_code, body, response.get("WWW-Authenticate")))
+            devices.binding_cache.clear()
+            principal_cache.clear()
+        self.assertEqual(results[0], results[1])
+        return results[0]
+
+    def test_validation_errors(self):
+        status_code, body, _ = self.both("post", self.CHECK_IN, {"employee_id": self.employee.employee_id})
+        self.assertEqual(status_code, 400)
+        self.assertIn("device_id", body)
+        status_code, body, _ = self.both("post", self.CHECK_OUT, self.scan("check_out", scan_type="iris"))
+        self.assertEqual((status_code, list(body)), (400, ["scan_type"]))
+        status_code, body, _ = self.both("post", self.CHECK_IN, "{not json")
+        self.assertEqual((status_code, list(body)), (400, ["detail"]))
+
+    def test_unknown_employee(self):
+        for url, prefix in ((self.CHECK_IN, "check_in"), (self.CHECK_OUT, "check_out")):
+            with self.subTest(url=url):
+                response = self.both("post", url, self.scan(prefix, employee_id="NOSUCHID"))
+                self.assertEqual(response, (400, {"error": "Invalid employee_id"}, None))
+
+    def test_unauthenticated(self):
+        for method, url in (("post", self.REPORTS), ("get", self.MISSED)):
+            with self.subTest(url=url):
+                data = {"report_text": "hi"} if method == "post" else None
+                status_code, body, challenge = self.both(method, url, data)
+                self.assertEqual(status_code, 401)
+                self.assertEqual(body, {"detail": "Authentication credentials were not provided."})
+                self.assertEqual(challenge, 'Bearer realm="api"')
+                status_code, body, challenge = self.both(method, url, data, token="not-a-token")
+                self.assertEqual((status_code, body["code"]), (401, "token_not_valid"))
+                self.assertEqual(challenge, 'Bearer realm="api"')
+
+    @override_settings(ATTENDANCE_DEVICE_POLICY="reject")
+    def test_reject_policy(self):
+        refused = (403, {"error": "Device not registered for this employee"}, None)
+        self.assertEqual(self.both("post", self.CHECK_IN, self.scan("check_in", device_id="other")), refused)
+        self.assertEqual(
+            self.both(
+                "post", self.CHECK_OUT, self.scan("check_out", device_id="other"), setup=lambda: self.check_in(60)
+            ),
+            refused,
+        )
+        self.assertEqual(
+            self.both("post", self.CHECK_OUT, self.scan("check_out", employee_id="NOSUCHID", device_id="other")),
+            (400, {"error": "Invalid employee_id"}, None),
+        )
+        self.assertEqual(self.both("post", self.CHECK_IN, self.scan("check_in"))[0], 201)
+
+    def test_check_in_and_check_out(self):
+        self.assertEqual(self.both("post", self.CHECK_IN, self.scan("check_in")),
+                         (201, {"message": "Check-in successful"}, None))
+        self.assertEqual(self.both("post", self.CHECK_OUT, self.scan("check_out"), setup=lambda: self.check_in(60)),
+                         (200, {"message": "Check-out successful"}, None))
+        self.assertEqual(self.both("post", self.CHECK_OUT, self.scan("check_out")),
+                         (400, {"error": "No active check-in found"}, None))
+
+    def test_report_submission(self):
+        payload = {"report_text": "on site", "latitude": 28.6, "longitude": 77.2}
+        self.assertEqual(
+            self.both("post", self.REPORTS, payload, token=self.token),
+            (400, {"error": "No active attendance found. Please check in first."}, None),
+        )
+        status_code, body, _ = self.both(
+            "post", self.REPORTS, payload, token=self.token, setup=lambda: self.check_in(10), ignore=("created_at",)
+        )
+        self.assertEqual(status_code, 201)
+        self.assertEqual(body["report_text"], "on site")
+
+        spool_dir = self.enterContext(tempfile.TemporaryDirectory())
+        with override_settings(REPORT_WRITE_BEHIND=True, REPORT_SPOOL_DIR=spool_dir), \
+                mock.patch.object(report_buffer, "_buffer", None), \
+                mock.patch.object(report_buffer.ReportWriteBehind, "_start_thread"):
+            status_code, body, _ = self.both(
+                "post", self.REPORTS, payload, token=self.token, setup=lambda: self.check_in(10),
+                ignore=("created_at", "spool_id"),
+            )
+        self.assertEqual((status_code, body["id"]), (202, None))
+
+    def test_missed_report(self):
+        self.assertEqual(self.both("get", self.MISSED, token=self.token),
+                         (200, {"missed": False, "message": "No active attendance"}, None))
+        self.assertEqual(self.both("get", self.MISSED, token=self.token, setup=lambda: self.check_in(10)),
+                         (200, {"missed": False, "message": "All reports submitted on time."}, None))
+        self.assertEqual(self.both("get", self.MISSED, token=self.token, setup=lambda: self.check_in(45)),
+                         (200, {"missed": True, "message": "You missed a half-hourly report."}, None))
+
+        def stale_session_with_a_recent_report():
+            EmployeeReport.objects.create(
+                employee=self.employee, attendance=self.check_in(45), report_text="ok",
+                created_at=timezone.now() - timedelta(minutes=5),
+            )
+        self.assertEqual(self.both("get", self.MISSED, token=self.token, setup=stale_session_with_a_recent_report),
+                         (200, {"missed": False, "message": "All reports submitted on time."}, None))
+
+
+# ----------------- KEYSET PAGINATION -----------------
+def cursor(position, reverse=False):
+    """A cursor as CursorPagination.encode_cursor() writes it, around any position"""
+    query = {"o": 0, "p": position, **({"r": 1} if reverse else {})}
+    return b64encode(urlencode(query).encode()).decode()
+
+
+class KeysetPaginationTests(TestCase):
+    """Site visits page on (created_at, id), newest first; several visits share each created_at"""
+    URL = "/api/site-visits/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = Employee.objects.create(user=User.objects.create_user("pager"), mobile="9000001201")
+        project = ProjectDetail.objects.create(
+            project_name="Paged", builder_name="Builder", project_type="plots", city="Nagpur",
+            address="Address", state="Maharashtra", zipcode="440001", number_of_units=10,
+        )
+        start = timezone.now() - timedelta(days=1)
+        for i in range(23):
+            visit = SiteVisit.objects.create(
+                employee=cls.employee, project=project, visitor_name=f"Visitor {i}", visitor_mobile="7000000000",
+            )
+            # ties of 1 to 5 rows, not in id order
+            SiteVisit.objects.filter(pk=visit.pk).update(created_at=start + timedelta(minutes=(i * 7) % 6))
+        cls.expected = list(SiteVisit.objects.order_by("-created_at", "-pk").values_list("pk", flat=True))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee.user)
+
+    def get(self, url, status=200, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
+
+    def ids(self, body):
+        return [row["id"] for row in body["results"]]
+
+    def walk(self, body, link):
+        pages = [self.ids(body)]
+        while body[link]:
+            body = self.get(body[link])
+            pages.append(self.ids(body))
+        return pages, body
+
+    def test_walks_over_ties_without_skips_or_repeats(self):
+        for page_size in (1, 2, 3, 4, 5, 7, 23, 50):
+            with self.subTest(page_size=page_size):
+                first = self.get(self.URL, page_size=page_size)
+                self.assertIsNone(first["previous"])
+                forward, last = self.walk(first, "next")
+                self.assertEqual(sum(forward, []), self.expected)
+                self.assertTrue(all(len(page) == page_size for page in forward[:-1]))
+
+                backward, back_at_first = self.walk(last, "previous")
+                self.assertEqual(sum(reversed(backward), []), self.expected)
+                self.assertEqual(backward[1:], forward[-2::-1])
+                self.assertEqual(self.ids(back_at_first), forward[0])
+
+    def test_cursor_position_is_the_last_row(self):
+        body = self.get(self.URL, page_size=4)
+        token = parse_qs(urlsplit(body["next"]).query)["cursor"][0]
+        position = parse_qs(b64decode(token).decode())["p"][0]
+        last = SiteVisit.objects.get(pk=self.expected[3])
+        self.assertEqual(json.loads(position), [last.created_at.isoformat(), last.pk])
+
+    def test_rows_added_or_removed_mid_walk(self):
+        body = self.get(self.URL, page_size=5)
+        seen = self.ids(body)
+        SiteVisit.objects.filter(pk=self.expected[5]).delete()  # first row of the next page
+        SiteVisit.objects.create(  # newest: before the walk's position
+            employee=self.employee, project_id=SiteVisit.objects.values_list("project", flat=True)[0],
+            visitor_name="Late", visitor_mobile="7000000000",
+        )
+        pages, _ = self.walk(body, "next")
+        self.assertEqual(sum(pages[1:], []), self.expected[6:])
+        self.assertEqual(pages[0], seen)
+
+    def test_invalid_cursor_is_a_400(self):
+        created_at = SiteVisit.objects.get(pk=self.expected[0]).created_at.isoformat()
+        for label, token in (
+            ("not base64", "!!!"),
+            ("no position", b64encode(b"o=0").decode()),
+            ("position not JSON", cursor("{")),
+            ("position not a pair", cursor("[1]")),
+            ("position a number", cursor("5")),
+            ("value not a datetime", cursor('["yesterday", 1]')),
+            ("pk not a number", cursor(json.dumps([created_at, "x"]))),
+            ("nested value", cursor(json.dumps([[created_at], 1]))),
+            ("reverse", cursor('["yesterday", 1]', reverse=True)),
+        ):
+            with self.subTest(label):
+                body = self.get(self.URL, status=400, cursor=token)
+                self.assertEqual(body, {"detail": "Invalid cursor"})
+
+    def test_invalid_history_cursor_is_a_400(self):
+        url = f"/api/employee/{self.employee.employee_id}/full-data/"
+        for token in (b64encode(b"o=x").decode(), cursor("not-a-date"), cursor("2024-02-30")):
+            with self.subTest(token=token):
+                self.assertEqual(self.get(url, status=400, cursor=token), {"detail": "Invalid cursor"})
+
+
+# ----------------- MISSED-REPORT SCAN -----------------
+class MissedReportScanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.now()
+        cls.sessions = {}
+        for name, checked_in, reports, closed in (
+            ("fresh check-in", 10, [], False),
+            ("no reports", 45, [], False),
+            ("at the deadline", 30, [], False),
+            ("recent report", 120, [100, 5], False),
+            ("stale report", 120, [95, 40], False),
+            ("checked out", 300, [], True),
+        ):
+            employee = Employee.objects.create(
+                user=User.objects.create_user(name.replace(" ", "-")), mobile=f"90000013{len(cls.sessions):02d}"
+            )
+            session = Attendance.objects.create(
+                employee=employee, check_in_time=cls.now - timedelta(minutes=checked_in), device_id="phone",
+                check_out_time=cls.now - timedelta(minutes=1) if closed else None,
+            )
+            for minutes_ago in reports:
+                EmployeeReport.objects.create(
+                    employee=employee, attendance=session, report_text="update",
+                    created_at=cls.now - timedelta(minutes=minutes_ago),
+                )
+            cls.sessions[name] = session
+
+    def overdue(self, now=None):
+        return {session.pk for session in overdue_sessions(now or self.now)}
+
+    def test_last_activity(self):
+        activity = dict(with_last_activity(Attendance.objects.all()).values_list("pk", "last_activity"))
+        for name, minutes_ago in (("no reports", 45), ("recent report", 5), ("stale report", 40)):
+            with self.subTest(name):
+                self.assertEqual(activity[self.sessions[name].pk], self.now - timedelta(minutes=minutes_ago))
+
+    def test_overdue_sessions(self):
+        self.assertEqual(self.overdue(), {self.sessions["no reports"].pk, self.sessions["stale report"].pk})
+        # A fresh report clears it; the deadline is strict
+        EmployeeReport.objects.create(
+            employee=self.sessions["stale report"].employee, attendance=self.sessions["stale report"],
+            report_text="back", created_at=self.now,
+        )
+        self.assertEqual(self.overdue(), {self.sessions["no reports"].pk})
+        self.assertIn(self.sessions["at the deadline"].pk, self.overdue(self.now + timedelta(microseconds=1)))
+
+    def test_other_sessions_reports_do_not_count(self):
+        session = self.sessions["no reports"]
+        yesterday = Attendance.objects.create(
+            employee=session.employee, date=timezone.localdate(self.now) - timedelta(days=1),
+            check_in_time=self.now - timedelta(days=1), check_out_time=self.now - timedelta(hours=16),
+            device_id="phone",
+        )
+        EmployeeReport.objects.create(
+            employee=session.employee, attendance=yesterday, report_text="late", created_at=self.now,
+        )
+        self.assertIn(session.pk, self.overdue())
+
+    def test_one_query_with_the_employee_joined(self):
+        with self.assertNumQueries(1):
+            employee_ids = sorted(session.employee.employee_id for session in overdue_sessions(self.now))
+        self.assertEqual(employee_ids, sorted(
+            self.sessions[name].employee.employee_id for name in ("no reports", "stale report")
+        ))
+
+    @mock.patch("attendance.utils.send_missed_report_alert")
+    def test_check_missing_reports(self, alert):
+        with mock.patch("attendance.utils.timezone.now", return_value=self.now):
+            overdue = check_missing_reports()
+            out = io.StringIO()
+            call_command("check_missing_reports", stdout=out)
+        self.assertEqual({session.pk for session in overdue}, self.overdue())
+        # once per scan: the function's and the command's
+        alerted = [call.args[0].pk for call in alert.call_args_list]
+        self.assertCountEqual(alerted, 2 * [session.pk for session in overdue])
+        self.assertIn("2 session(s) overdue", out.getvalue())
+
+
+# ----------------- GEOFENCE -----------------
+class GeofenceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        def site(name, latitude, longitude, radius=300):
+            return ProjectDetail.objects.create(
+                project_name=name, builder_name="Builder", project_type="plots", city="Delhi", address="Address",
+                state="Delhi", zipcode="110001", number_of_units=10,
+                latitude=latitude, longitude=longitude, geofence_radius=radius,
+            )
+        # A and B overlap (~220 m apart); C sits just below a grid cell edge (latitude 28.61)
+        cls.a = site("Site A", 28.6000, 77.2000)
+        cls.b = site("Site B", 28.6020, 77.2000, radius=150)
+        cls.c = site("Site C", 28.6095, 77.2050, radius=200)
+        cls.unplaced = site("No coordinates", None, None)
+        cls.employee = Employee.objects.create(user=User.objects.create_user("fenced"), mobile="9000001401")
+        BiometricData.objects.create(employee=cls.employee, device_id="phone", public_key="key", status="success")
+
+    def setUp(self):
+        geofence.invalidate()
+        self.addCleanup(geofence.invalidate)
+        devices.binding_cache.clear()
+
+    def test_match(self):
+        index = geofence.GeofenceIndex.from_db()
+        self.assertEqual(index.size, 3)  # the project without coordinates is left out
+        self.assertEqual(index.match(28.6000, 77.2000), self.a.pk)
+        self.assertEqual(index.match(28.6015, 77.2000), self.b.pk)  # inside both, nearer B
+        self.assertEqual(index.match(28.6008, 77.2000), self.a.pk)  # inside both, nearer A
+        self.assertNotEqual(geofence._cell(28.6105, 77.2050), geofence._cell(28.6095, 77.2050))
+        self.assertEqual(index.match(28.6105, 77.2050), self.c.pk)  # neighbouring cell, 111 m away
+        self.assertIsNone(index.match(28.6125, 77.2050))  # same direction, 333 m away
+        self.assertIsNone(index.match(28.7000, 77.3000))
+        self.assertIsNone(geofence.match_site(None, 77.2000))
+
+    def test_index_is_rebuilt_after_a_project_changes(self):
+        self.assertEqual(geofence.match_site(28.6000, 77.2000), self.a.pk)
+        index = geofence.get_index()
+        self.assertIs(geofence.get_index(), index)
+
+        self.unplaced.latitude, self.unplaced.longitude = 28.5000, 77.1000
+        self.unplaced.save()
+        self.assertIsNot(geofence.get_index(), index)
+        self.assertEqual(geofence.match_site(28.5000, 77.1000), self.unplaced.pk)
+
+        self.a.delete()
+        self.assertEqual(geofence.match_site(28.6000, 77.2000), None)
+        self.assertEqual(geofence.match_site(28.6015, 77.2000), self.b.pk)
+
+    def test_index_is_rebuilt_after_the_refresh_interval(self):
+        index = geofence.get_index()
+        with override_settings(GEOFENCE_REFRESH_SECONDS=0):
+            self.assertIsNot(geofence.get_index(), index)
+
+    def test_project_deleted_by_another_worker(self):
+        # This process's index still holds site A: its invalidation never ran
+        deleted = self.a.pk
+        self.assertEqual(geofence.match_site(28.6000, 77.2000), deleted)
+        with mock.patch.object(geofence, "invalidate"):
+            self.a.delete()
+        self.assertEqual(geofence.get_index().match(28.6000, 77.2000), deleted)
+
+        self.assertEqual(geofence.match_sites([(28.6000, 77.2000), (28.6020, 77.2000)]), [None, self.b.pk])
+        self.assertIsNone(geofence.get_index().match(28.6000, 77.2000))
+
+    def test_project_deleted_by_another_worker_during_check_in(self):
+        geofence.match_site(28.6000, 77.2000)
+        with mock.patch.object(geofence, "invalidate"):
+            self.a.delete()
+        response = self.client.post("/api/attendance/check-in/", {
+            "employee_id": self.employee.employee_id, "check_in_latitude": "28.600000",
+            "check_in_longitude": "77.200000", "scan_type": "face", "device_id": "phone",
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertIsNone(Attendance.objects.get(employee=self.employee).check_in_site_id)
+
+    def test_views_store_the_sites(self):
+        for check_in, check_out, sites in (
+            ((28.6015, 77.2000), (28.6105, 77.2050), (self.b.pk, self.c.pk)),
+            ((28.7000, 77.3000), (28.6000, 77.2000), (None, self.a.pk)),
+        ):
+            with self.subTest(check_in=check_in, check_out=check_out), transaction.atomic():
+                scan = {"employee_id": self.employee.employee_id, "scan_type": "face", "device_id": "phone"}
+                response = self.client.post("/api/attendance/check-in/", {
+                    **scan, "check_in_latitude": check_in[0], "check_in_longitude": check_in[1],
+                }, content_type="application/json")
+                self.assertEqual(response.status_code, 201, response.content)
+                response = self.client.post("/api/attendance/check-out/", {
+                    **scan, "check_out_latitude": check_out[0], "check_out_longitude": check_out[1],
+                }, content_type="application/json")
+                self.assertEqual(response.status_code, 200, response.content)
+                session = Attendance.objects.get(employee=self.employee)
+                self.assertEqual((session.check_in_site_id, session.check_out_site_id), sites)
+                transaction.set_rollback(True)
+
+    def test_bulk_replay_stores_the_sites(self):
+        morning = timezone.localtime().replace(hour=9, minute=0, second=0, microsecond=0) - timedelta(days=1)
+
+        def event(kind, at, latitude=None, longitude=None):
+            return {
+                "event": kind, "employee_id": self.employee.employee_id, "timestamp": at.isoformat(),
+                "latitude": latitude, "longitude": longitude, "scan_type": "face", "device_id": "phone",
+            }
+
+        response = self.client.post("/api/attendance/bulk/", {"events": [
+            event("check_in", morning, 28.6015, 77.2000),
+            event("check_out", morning + timedelta(hours=8), 28.7000, 77.3000),
+            event("check_in", morning - timedelta(days=1)),
+        ]}, content_type="application/json")
+        self.assertEqual(response.json()["summary"], {"created": 3, "duplicate": 0, "rejected": 0})
+        sessions = Attendance.objects.filter(employee=self.employee).order_by("date")
+        self.assertEqual(
+            [(session.check_in_site_id, session.check_out_site_id) for session in sessions],
+            [(None, None), (self.b.pk, None)],
+        )
+
+
+# ----------------- OPENAPI SCHEMA ARTIFACT -----------------
+@contextmanager
+def pregenerated_schema_routes(directory):
+    """Serve the docs from the files in directory (attendance_project/urls.py picks the routes at import)"""
+    def reload():
+        from attendance_project import openapi, urls as root_urls
+        openapi._artifact = None
+        importlib.reload(root_urls)
+        clear_url_caches()
+
+    try:
+        with override_settings(OPENAPI_LIVE_SCHEMA=False, OPENAPI_SCHEMA_DIR=directory):
+            reload()
+            yield
+    finally:
+        reload()
+
+
+class OpenAPISchemaArtifactTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = cls.enterClassContext(tempfile.TemporaryDirectory())
+        call_command("generate_openapi_schema", output_dir=cls.directory, stdout=io.StringIO())
+        with open(os.path.join(cls.directory, "manifest.json"), encoding="utf-8") as handle:
+            cls.manifest = json.load(handle)
+
+    def setUp(self):
+        self.enterContext(pregenerated_schema_routes(self.directory))
+
+    def test_command_writes_the_versioned_files_then_the_manifest(self):
+        from attendance_project import openapi
+
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        with mock.patch.object(openapi, "_write_atomic", wraps=openapi._write_atomic) as write:
+            out = io.StringIO()
+            call_command("generate_openapi_schema", output_dir=directory, stdout=out)
+
+        written = [os.path.basename(args[0]) for args, _ in write.call_args_list]
+        version = self.manifest["version"]
+        self.assertEqual(written, [f"openapi.{version}.json", f"openapi.{version}.yaml", "manifest.json"])
+        self.assertEqual(sorted(os.listdir(directory)), sorted(written))  # no .tmp left behind
+        self.assertIn(f"Schema version {version}", out.getvalue())
+
+    def test_generation_covers_the_filtered_viewsets_without_a_request(self):
+        # get_queryset reads request.query_params; the schema generator calls it with no request
+        with self.assertNoLogs("drf_yasg", level="WARNING"):
+            call_command(
+                "generate_openapi_schema", output_dir=self.enterContext(tempfile.TemporaryDirectory()),
+                stdout=io.StringIO(),
+            )
+
+    def test_latest_schema_is_revalidated_by_etag(self):
+        response = self.client.get("/swagger.json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response["ETag"], f"\"{self.manifest['version']}\"")
+        self.assertEqual(response["Cache-Control"], "public, max-age=300")
+        self.assertEqual(json.loads(response.content)["info"]["title"], "Employee Attendance API")
+
+        response = self.client.get("/swagger.yaml", headers={"if-none-match": response["ETag"]})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+        response = self.client.get("/swagger.json", headers={"if-none-match": "\"0123456789ab\""})
+        self.assertEqual(response.status_code, 200)
+
+    def test_versioned_schema_is_immutable(self):
+        version = self.manifest["version"]
+        for fmt, content_type in (("json", "application/json"), ("yaml", "application/yaml")):
+            response = self.client.get(f"/openapi/{version}.{fmt}")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Type"], content_type)
+            self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+            with open(os.path.join(self.directory, self.manifest["files"][fmt]), "rb") as handle:
+                self.assertEqual(response.content, handle.read())
+
+    def test_unknown_version_is_404(self):
+        self.assertEqual(self.client.get("/openapi/0123456789ab.json").status_code, 404)
+
+    def test_docs_pages_point_at_the_versioned_schema(self):
+        response = self.client.get("/redoc/")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f"/openapi/{self.manifest['version']}.json")
+
+    def test_missing_artifact_is_503(self):
+        empty = self.enterContext(tempfile.TemporaryDirectory())
+        with pregenerated_schema_routes(empty):
+            for url in ("/swagger.json", f"/openapi/{self.manifest['version']}.json", "/swagger/"):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 503)
+                self.assertIn("generate_openapi_schema", response.json()["error"])
+
+
+# ----------------- REQUEST METRICS -----------------
+def metric(text, sample):
+    """Value of the exposition line for sample (name plus labels), or None"""
+    for line in text.splitlines():
+        if line.startswith(sample + " "):
+            return float(line[len(sample) + 1:])
+    return None
+
+
+class RequestMetricsTests(TestCase):
+    REPORTS = "/api/reports/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = Employee.objects.create(user=User.objects.create_user("metrics"), mobile="9000001201")
+        cls.token = str(tokens_for_employee(cls.employee).access_token)
+
+    def setUp(self):
+        metrics.registry.reset()
+        principal_cache.clear()
+
+    def scrape(self, **headers):
+        response = self.client.get("/metrics", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        return response.content.decode()
+
+    def test_sync_request_records_status_latency_and_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.REPORTS, headers={"authorization": f"Bearer {self.token}"})
+        self.assertEqual(response.status_code, 200)
+        executed = len(queries)  # read before the scrape: request_started resets the query log
+        self.assertGreater(executed, 0)
+
+        text = self.scrape()
+        labels = 'view="employee-report-list",method="GET"'
+        self.assertEqual(metric(text, f'attendance_http_requests_total{{{labels},status="200"}}'), 1)
+        self.assertEqual(metric(text, f"attendance_http_request_duration_seconds_count{{{labels}}}"), 1)
+        self.assertEqual(metric(text, f"attendance_db_queries_total{{{labels}}}"), executed)
+        self.assertEqual(metric(text, f"attendance_db_queries_per_request_count{{{labels}}}"), 1)
+        self.assertGreater(metric(text, f"attendance_db_query_seconds_total{{{labels}}}"), 0)
+
+    def test_async_request_counts_queries_run_on_sync_to_async_threads(self):
+        # The view awaits sync_to_async for its queries: they run on another
+        # thread than the middleware and are counted through the ContextVar
+        with async_routes(), CaptureQueriesContext(connection) as queries:
+            self.assertTrue(issubclass(resolve(self.REPORTS).func.view_class, AsyncAPIView))
+            response = async_to_sync(AsyncClient().get)(
+                self.REPORTS, headers={"authorization": f"Bearer {self.token}"}
+            )
+        self.assertEqual(response.status_code, 200)
+        executed = len(queries)  # read before the scrape: request_started resets the query log
+        self.assertGreater(executed, 0)
+
+        text = self.scrape()
+        labels = 'view="employee-report-list",method="GET"'
+        self.assertEqual(metric(text, f'attendance_http_requests_total{{{labels},status="200"}}'), 1)
+        self.assertEqual(metric(text, f"attendance_db_queries_total{{{labels}}}"), executed)
+
+    def test_track_sql_follows_the_context_into_worker_threads(self):
+        threads = set()
+
+        def query():
+            threads.add(threading.get_ident())
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            finally:
+                connection.close()  # this thread's own connection
+
+        async def handler():
+            with metrics.track_sql() as sql:
+                await sync_to_async(query, thread_sensitive=False)()
+                await sync_to_async(query, thread_sensitive=False)()
+            await sync_to_async(query, thread_sensitive=False)()  # outside the block
+            return sql
+
+        sql = async_to_sync(handler)()
+        self.assertNotIn(threading.get_ident(), threads)
+        self.assertEqual(sql[0], 2)
+
+    def test_nested_blocks_both_count(self):
+        with metrics.track_sql() as outer:
+            User.objects.count()
+            with metrics.track_sql() as inner:
+                User.objects.count()
+        self.assertEqual((outer[0], inner[0]), (2, 1))
+
+    def test_unresolved_paths_and_unknown_methods_are_folded(self):
+        self.assertEqual(self.client.get("/no/such/path/").status_code, 404)
+        self.assertEqual(self.client.get("/another/path/").status_code, 404)
+        self.assertEqual(self.client.generic("BREW", "/metrics").status_code, 405)
+
+        text = self.scrape()
+        self.assertEqual(
+            metric(text, 'attendance_http_requests_total{view="<unresolved>",method="GET",status="404"}'), 2
+        )
+        self.assertEqual(metric(text, 'attendance_http_requests_total{view="metrics",method="OTHER",status="405"}'), 1)
+        self.assertNotIn("BREW", text)
+        self.assertNotIn("/no/such/path/", text)
+
+    def test_label_values_are_escaped(self):
+        metrics.registry.observe('a"b\\c\nd', "GET", 200, 0.01, 0, 0.0)
+        text = metrics.registry.render()
+        self.assertEqual(metric(text, 'attendance_db_queries_total{view="a\\"b\\\\c\\nd",method="GET"}'), 0)
+        # A raw newline would start a line that is neither a sample nor a comment
+        self.assertEqual(len([line for line in text.splitlines() if line.startswith("attendance_")]), len(
+            [line for line in text.splitlines() if not line.startswith("#")]
+        ))
+
+    def test_histogram_buckets_are_cumulative(self):
+        for seconds in (0.001, 0.02, 0.02, 3.0, 20.0):
+            metrics.registry.observe("v", "GET", 200, seconds, 0, 0.0)
+        text = metrics.registry.render()
+
+        name = 'attendance_http_request_duration_seconds_bucket{view="v",method="GET"'
+        buckets = [metric(text, f'{name},le="{bound!r}"}}') for bound in metrics.LATENCY_BUCKETS]
+        self.assertEqual(buckets, [1, 1, 3, 3, 3, 3, 3, 3, 3, 4, 4])
+        self.assertEqual(buckets, sorted(buckets))
+        self.assertEqual(metric(text, f'{name},le="+Inf"}}'), 5)
+        self.assertEqual(metric(text, 'attendance_http_request_duration_seconds_count{view="v",method="GET"}'), 5)
+        self.assertAlmostEqual(
+            metric(text, 'attendance_http_request_duration_seconds_sum{view="v",method="GET"}'), 23.041
+        )
+        # A query count equal to a bound falls in that bucket (le is inclusive)
+        self.assertEqual(metric(text, 'attendance_db_queries_per_request_bucket{view="v",method="GET",le="0"}'), 5)
+
+    def test_token_protects_the_endpoint(self):
+        with override_settings(METRICS_TOKEN="s3cret"):
+            self.assertEqual(self.client.get("/metrics").status_code, 403)
+            response = self.client.get("/metrics", headers={"authorization": "Bearer wrong"})
+            self.assertEqual(response.status_code, 403)
+            self.scrape(authorization="Bearer s3cret")
+        self.scrape()
@@ -0,0 +1,82 @@
+# attendance/throttles.py
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+
+# ----------------- LOGIN TOKEN BUCKET -----------------
+class LoginThrottle(BaseThrottle):
+    """
+    Token bucket per mobile number and per client IP for the login endpoint.
+
+    DRF runs throttles before the view, so a client over its limit is refused
+    before any database lookup or password hash. Rates come from
+    settings.LOGIN_THROTTLE_RATES, e.g. {"mobile": "5/min", "ip": "30/min"}.
+    Buckets live in the default cache; configure a shared cache backend to
+    enforce the limits across workers.
+    """
+    cache = cache
+    timer = time.time
+    _lock = threading.Lock()
+
+    PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+    def parse_rate(self, rate):
+        num, period = rate.split("/")
+        return int(num), self.PERIODS[period[0]]
+
+    def get_rates(self):
+        return getattr(settings, "LOGIN_THROTTLE_RATES", {"mobile": "5/min", "ip": "30/min"})
+
+    def get_buckets(self, request):
+        rates = self.get_rates()
+        buckets = []
+        mobile = request.data.get("username") if hasattr(request.data, "get") else None
+        if mobile and "mobile" in rates:
+            buckets.append((f"throttle_login_mobile_{mobile}", *self.parse_rate(rates["mobile"])))
+        if "ip" in rates:
+            buckets.append((f"throttle_login_ip_{self.get_ident(request)}", *self.parse_rate(rates["ip"])))
+        return buckets
+
+    def allow_request(self, request, view):
+        now = self.timer()
+        self.wait_seconds = 0
+        with self._lock:
+            states = []
+            for key, capacity, period in self.get_buckets(request):
+                tokens, updated_at = self.cache.get(key, (capacity, now))
+                refill = capacity / period
+                tokens = min(capacity, tokens + (now - updated_at) * refill)
+                states.append((key, tokens, capacity, period))
+                if tokens < 1:
+                    self.wait_seconds = max(self.wait_seconds, (1 - tokens) / refill)
+
+            if self.wait_seconds:
+                return False
+
+            for key, tokens, capacity, period in states:
+                self.cache.set(key, (tokens - 1, now), period)
+            return True
+
+    def wait(self):
+        return self.wait_seconds or None
+
+
+# ----------------- UNKNOWN MOBILE (NEGATIVE) CACHE -----------------
+def _unknown_mobile_key(mobile):
+    return f"login_unknown_mobile_{mobile}"
+
+
+def is_unknown_mobile(mobile):
+    return cache.get(_unknown_mobile_key(mobile)) is not None
+
+
+def remember_unknown_mobile(mobile):
+    cache.set(_unknown_mobile_key(mobile), True, getattr(settings, "LOGIN_UNKNOWN_MOBILE_TTL", 60))
+
+
+def forget_unknown_mobile(mobile):
+    cache.delete(_unknown_mobile_key(mobile))
@@ -4,7 +4,10 @@ from .views import (
     EmployeeProfileView,
     AttendanceCheckInView,
     AttendanceCheckOutView,
+    AttendanceBulkView,
+    AttendanceExportView,
     BiometricRegisterView,
+    DeviceBindingCacheStatsView,
     EmployeeFullDataAPIView,
     SiteVisitViewSet,
     PropertyBookingViewSet,
@@ -15,7 +18,10 @@ from .views import (
     MissedReportViewSet,
     WorkPlanViewSet,
     WorkDetailViewSet,
+    SalesDashboardView,
+    LeadLookupView,
 )
+from django.conf import settings
 from rest_framework.routers import DefaultRouter
 
 # Router for ViewSets
@@ -40,9 +46,19 @@ urlpatterns = [
     # Attendance
     path('attendance/check-in/', AttendanceCheckInView.as_view(), name='attendance-checkin'),
     path('attendance/check-out/', AttendanceCheckOutView.as_view(), name='attendance-checkout'),
+    path('attendance/bulk/', AttendanceBulkView.as_view(), name='attendance-bulk'),
+    path('attendance/export/', AttendanceExportView.as_view(), name='attendance-export'),
 
     # Biometric
     path('biometric/register/', BiometricRegisterView.as_view(), name='biometric-register'),
+    path('biometric/device-cache/', DeviceBindingCacheStatsView.as_view(), name='device-binding-cache'),
+
+    # Sales dashboard
+    path('dashboard/projects/', SalesDashboardView.as_view(), name='sales-dashboard'),
+    path('dashboard/projects/<int:project_id>/', SalesDashboardView.as_view(), name='sales-dashboard-project'),
+
+    # Leads
+    path('leads/lookup/', LeadLookupView.as_view(), name='lead-lookup'),
 
     # Employee full data
     path('employee/<str:employee_id>/full-data/', EmployeeFullDataAPIView.as_view(), name='employee-full-data'),
@@ -50,3 +66,23 @@ urlpatterns = [
     # Router URLs
     path('', include(router.urls)),
 ]
+
+if getattr(settings, "ATTENDANCE_ASYNC_VIEWS", False):
+    # Native async handlers for the hot mobile endpoints (same names, request
+    # and response formats); registered first so they shadow the sync routes
+    from .async_views import (
+        AsyncAttendanceCheckInView,
+        AsyncAttendanceCheckOutView,
+        AsyncEmployeeReportView,
+        AsyncMissedReportView,
+    )
+
+    urlpatterns = [
+        path('attendance/check-in/', AsyncAttendanceCheckInView.as_view(), name='attendance-checkin'),
+        path('attendance/check-out/', AsyncAttendanceCheckOutView.as_view(), name='attendance-checkout'),
+        path('reports/', AsyncEmployeeReportView.as_view(), name='employee-report-list'),
+        path(
+            'missed_reports/missed_reports/', AsyncMissedReportView.as_view(),
+            name='missed-reports-missed-reports',
+        ),
+    ] + urlpatterns
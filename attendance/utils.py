@@ -1,24 +1,67 @@
 # attendance/utils.py
 from django.utils import timezone
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from datetime import timedelta
 from .models import Attendance, EmployeeReport
 
-def check_missing_reports():
-    now = timezone.now()
-    active_attendances = Attendance.objects.filter(
+# Employees must post a report at least this often while checked in
+REPORT_INTERVAL = timedelta(minutes=30)
+
+
+def open_sessions():
+    """Checked-in, not yet checked-out attendance rows (served by attendance_open_session_idx)"""
+    return Attendance.objects.filter(
         check_in_time__isnull=False,
         check_out_time__isnull=True
     )
 
-    for attendance in active_attendances:
-        last_report = EmployeeReport.objects.filter(attendance=attendance).order_by("-created_at").first()
 
-        if not last_report:
-            # No report at all since check-in
-            last_time = attendance.check_in_time
-        else:
-            last_time = last_report.created_at
+def get_open_session(employee):
+    """
+    Latest open attendance session of an employee, or None.
+    No date filter, so a session that crosses midnight is still found.
+    """
+    return open_sessions().filter(employee=employee).order_by("-check_in_time").first()
+
+
+async def aget_open_session(employee):
+    """Async get_open_session()"""
+    return await open_sessions().filter(employee=employee).order_by("-check_in_time").afirst()
+
+
+def with_last_activity(queryset):
+    """Annotate attendance rows with `last_activity`: latest report time, else check-in time"""
+    last_report = EmployeeReport.objects.filter(
+        attendance=OuterRef("pk")
+    ).order_by("-created_at").values("created_at")[:1]
+    return queryset.annotate(
+        last_activity=Coalesce(Subquery(last_report), "check_in_time")
+    )
+
+
+def overdue_sessions(now=None):
+    """
+    Every open session whose last report (or check-in) is older than REPORT_INTERVAL,
+    with its employee joined in - a single query instead of two per session.
+    """
+    now = now or timezone.now()
+    # No ORDER BY: the default "-date" would walk every row through attendance_date_id_idx
+    # instead of the open sessions in attendance_open_session_idx
+    return with_last_activity(open_sessions()).select_related("employee").filter(
+        last_activity__lt=now - REPORT_INTERVAL
+    ).order_by()
+
+
+def send_missed_report_alert(attendance):
+    # 🔔 Trigger alert (Email/SMS/Push Notification)
+    print(f"ALERT: Employee {attendance.employee.employee_id} missed half-hourly report.")
+
+
+def check_missing_reports():
+    overdue = list(overdue_sessions())
+
+    for attendance in overdue:
+        send_missed_report_alert(attendance)
 
-        if now - last_time > timedelta(minutes=30):
-            # 🔔 Trigger alert (Email/SMS/Push Notification)
-            print(f"ALERT: Employee {attendance.employee.employee_id} missed half-hourly report.")
+    return overdue
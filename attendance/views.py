@@ -1,10 +1,10 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions, generics
-from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import tokens_for_employee
 from django.utils import timezone
-from django.contrib.auth import authenticate
 from .models import Employee, Attendance, BiometricData, EmployeeReport
+from .throttles import LoginThrottle, is_unknown_mobile, remember_unknown_mobile
 from .serializers import (
     LoginSerializer,
     EmployeeProfileSerializer,
@@ -18,6 +18,13 @@ from drf_yasg.utils import swagger_auto_schema
 
 # ----------------- LOGIN -----------------
 class EmployeeLoginView(APIView):
+    """
+    One query (employee + user) and one password hash per attempt. Clients over
+    their per-mobile / per-IP token bucket are refused before either, and
+    recently seen unknown mobiles are answered from the cache.
+    """
+    throttle_classes = [LoginThrottle]
+
     @swagger_auto_schema(request_body=LoginSerializer)
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
@@ -25,16 +32,21 @@ class EmployeeLoginView(APIView):
         mobile = serializer.validated_data['username']
         password = serializer.validated_data['password']
 
+        if is_unknown_mobile(mobile):
+            return Response({'error': 'Invalid mobile'}, status=400)
+
         try:
-            employee = Employee.objects.get(mobile=mobile)
+            employee = Employee.objects.select_related('user').get(mobile=mobile)
         except Employee.DoesNotExist:
+            remember_unknown_mobile(mobile)
             return Response({'error': 'Invalid mobile'}, status=400)
 
-        user = authenticate(username=employee.user.username, password=password)
-        if user is None:
+        # Same checks as ModelBackend, without looking the user up a second time
+        user = employee.user
+        if not user.is_active or not user.check_password(password):
             return Response({'error': 'Invalid password'}, status=400)
 
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for_employee(employee)
         return Response({
             'refresh': str(refresh),
             'access': str(refresh.access_token),
@@ -67,9 +79,61 @@ from rest_framework import status
 from django.shortcuts import get_object_or_404
 from .models import Employee, Attendance
 from .serializers import AttendanceCheckInSerializer, AttendanceCheckOutSerializer
+from .utils import open_sessions, get_open_session, with_last_activity, REPORT_INTERVAL
+from . import rollups, geofence, devices, report_buffer
+from django.db import transaction
+from django.db.models import Subquery
 from datetime import datetime
 
 
+def create_check_in(employee, data, device_verified):
+    """Insert a check-in and count it in the monthly rollup, in one transaction"""
+    with transaction.atomic():
+        attendance = Attendance.objects.create(
+            employee=employee,
+            check_in_time=timezone.now(),
+            check_in_latitude=data["check_in_latitude"],
+            check_in_longitude=data["check_in_longitude"],
+            check_in_site_id=geofence.match_site(data["check_in_latitude"], data["check_in_longitude"]),
+            scan_type=data["scan_type"],
+            device_id=data["device_id"],
+            device_verified=device_verified,
+            status=data.get("status", "pending"),
+        )
+        rollups.record_check_in(attendance)
+    return attendance
+
+
+def close_open_session(employee_id, data, device_verified):
+    """
+    Close the employee's latest open session with one conditional UPDATE that
+    only writes the check-out columns, and add the worked time to the rollup.
+    No date filter, so overnight sessions close too. False when nothing was open.
+    """
+    # An unverified check-out flags the session; a verified one keeps the check-in's flag
+    flag = {} if device_verified else {"device_verified": False}
+    latest_open = open_sessions().filter(
+        employee__employee_id=employee_id
+    ).order_by("-check_in_time").values("pk")[:1]
+    checked_out_at = timezone.now()
+    with transaction.atomic():
+        updated = Attendance.objects.filter(
+            pk=Subquery(latest_open), check_out_time__isnull=True
+        ).update(
+            check_out_time=checked_out_at,
+            check_out_latitude=data["check_out_latitude"],
+            check_out_longitude=data["check_out_longitude"],
+            check_out_site_id=geofence.match_site(data["check_out_latitude"], data["check_out_longitude"]),
+            scan_type=data["scan_type"],
+            device_id=data["device_id"],
+            status=data.get("status", "pending"),
+            **flag,
+        )
+        if updated:
+            rollups.record_check_out(employee_id, checked_out_at)
+    return bool(updated)
+
+
 class AttendanceCheckInView(APIView):
     def post(self, request):
         serializer = AttendanceCheckInSerializer(data=request.data)
@@ -81,17 +145,12 @@ class AttendanceCheckInView(APIView):
         except Employee.DoesNotExist:
             return Response({"error": "Invalid employee_id"}, status=400)
 
-        # create attendance
-        Attendance.objects.create(
-            employee=employee,
-            check_in_time=timezone.now(),
-            check_in_latitude=serializer.validated_data["check_in_latitude"],
-            check_in_longitude=serializer.validated_data["check_in_longitude"],
-            scan_type=serializer.validated_data["scan_type"],
-            device_id=serializer.validated_data["device_id"],
-            status=serializer.validated_data.get("status", "pending"),
-        )
+        # device binding check (served from the per-process binding cache)
+        device_verified = devices.is_registered_device(employee.employee_id, serializer.validated_data["device_id"])
+        if not device_verified and devices.device_policy() == "reject":
+            return Response({"error": "Device not registered for this employee"}, status=403)
 
+        create_check_in(employee, serializer.validated_data, device_verified)
         return Response({"message": "Check-in successful"}, status=201)
 
 
@@ -102,31 +161,172 @@ class AttendanceCheckOutView(APIView):
         serializer.is_valid(raise_exception=True)
 
         employee_id = request.data.get("employee_id")
-        try:
-            employee = Employee.objects.get(employee_id=employee_id)
-        except Employee.DoesNotExist:
-            return Response({"error": "Invalid employee_id"}, status=400)
 
-        try:
-            attendance = Attendance.objects.get(
-                employee=employee,
-                date=timezone.localdate(),
-                check_out_time__isnull=True
-            )
-        except Attendance.DoesNotExist:
-            return Response({"error": "No active check-in found"}, status=400)
+        device_verified = devices.is_registered_device(employee_id, serializer.validated_data["device_id"])
+        if not device_verified and devices.device_policy() == "reject":
+            if not Employee.objects.filter(employee_id=employee_id).exists():
+                return Response({"error": "Invalid employee_id"}, status=400)
+            return Response({"error": "Device not registered for this employee"}, status=403)
 
-        attendance.check_out_time = timezone.now()
-        attendance.check_out_latitude = serializer.validated_data["check_out_latitude"]
-        attendance.check_out_longitude = serializer.validated_data["check_out_longitude"]
-        attendance.scan_type = serializer.validated_data["scan_type"]
-        attendance.device_id = serializer.validated_data["device_id"]
-        attendance.status = serializer.validated_data.get("status", "pending")
-        attendance.save()
+        if not close_open_session(employee_id, serializer.validated_data, device_verified):
+            # Failure path only: tell an unknown employee apart from a missing check-in
+            if not Employee.objects.filter(employee_id=employee_id).exists():
+                return Response({"error": "Invalid employee_id"}, status=400)
+            return Response({"error": "No active check-in found"}, status=400)
 
         return Response({"message": "Check-out successful"}, status=200)
 
 
+from collections import defaultdict
+from django.db.models import Q
+from .serializers import AttendanceBulkSerializer, AttendanceBulkEventSerializer
+
+
+class AttendanceBulkView(APIView):
+    """
+    Replay a queue of offline check-in / check-out scans in one round trip.
+
+    Employees and their existing attendance rows are resolved with one query
+    each, new rows are inserted with bulk_create and check-outs applied with
+    bulk_update, all inside a single transaction. Every event gets its own
+    result: "created", "duplicate" or "rejected".
+    """
+
+    @swagger_auto_schema(request_body=AttendanceBulkSerializer)
+    def post(self, request):
+        envelope = AttendanceBulkSerializer(data=request.data)
+        envelope.is_valid(raise_exception=True)
+        raw_events = envelope.validated_data["events"]
+
+        results = [None] * len(raw_events)
+        events = []
+        for index, raw in enumerate(raw_events):
+            serializer = AttendanceBulkEventSerializer(data=raw)
+            if serializer.is_valid():
+                events.append((index, serializer.validated_data))
+            else:
+                results[index] = {"index": index, "result": "rejected", "errors": serializer.errors}
+
+        # Read and write in one transaction: with SQLite's IMMEDIATE mode it holds
+        # the write lock from the first read, so a concurrent replay of the same
+        # batch waits and then sees these rows as duplicates instead of hitting
+        # unique (employee, date)
+        with transaction.atomic():
+            employees = Employee.objects.in_bulk(
+                {event["employee_id"] for _, event in events}, field_name="employee_id"
+            )
+            dates = {timezone.localdate(event["timestamp"]) for _, event in events}
+            bindings = devices.binding_cache.get_many(employees.keys())
+            sites = dict(zip(
+                (index for index, _ in events),
+                geofence.match_sites([(event.get("latitude"), event.get("longitude")) for _, event in events]),
+            ))
+            reject_unregistered = devices.device_policy() == "reject"
+            checked_out_at = {event["timestamp"] for _, event in events if event["event"] == "check_out"}
+            sessions = {}
+            open_by_employee = {}
+            # (employee pk, check_out_time): a replayed check-out, whatever day its session is on
+            closed_at = {}
+            for attendance in Attendance.objects.filter(
+                Q(date__in=dates)
+                | Q(check_in_time__isnull=False, check_out_time__isnull=True)
+                | Q(check_out_time__in=checked_out_at),
+                employee__in=employees.values(),
+            ).order_by("check_in_time"):
+                sessions[(attendance.employee_id, attendance.date)] = attendance
+                if attendance.check_in_time is not None and attendance.check_out_time is None:
+                    open_by_employee[attendance.employee_id] = attendance
+                if attendance.check_out_time is not None:
+                    closed_at[(attendance.employee_id, attendance.check_out_time)] = attendance
+
+            to_create = []
+            to_update = {}
+            rollup_deltas = defaultdict(dict)
+            # Apply in scan order so a check-in queued before its check-out is seen first
+            for index, event in sorted(events, key=lambda item: item[1]["timestamp"]):
+                employee = employees.get(event["employee_id"])
+                if employee is None:
+                    results[index] = {"index": index, "result": "rejected", "error": "Invalid employee_id"}
+                    continue
+
+                registered_device = bindings.get(employee.employee_id)
+                device_verified = registered_device is not None and registered_device == event["device_id"]
+                if not device_verified and reject_unregistered:
+                    results[index] = {"index": index, "result": "rejected", "error": "Device not registered for this employee"}
+                    continue
+
+                key = (employee.pk, timezone.localdate(event["timestamp"]))
+                attendance = sessions.get(key)
+
+                if event["event"] == "check_in":
+                    if attendance is not None:
+                        results[index] = {"index": index, "result": "duplicate"}
+                        continue
+                    attendance = Attendance(
+                        employee=employee,
+                        date=key[1],
+                        check_in_time=event["timestamp"],
+                        check_in_latitude=event.get("latitude"),
+                        check_in_longitude=event.get("longitude"),
+                        check_in_site_id=sites[index],
+                        scan_type=event["scan_type"],
+                        device_id=event["device_id"],
+                        device_verified=device_verified,
+                        status=event["status"],
+                    )
+                    sessions[key] = attendance
+                    open_by_employee[employee.pk] = attendance
+                    to_create.append(attendance)
+                    rollups.add_delta(rollup_deltas, attendance, rollups.check_in_delta(attendance))
+                else:
+                    if (employee.pk, event["timestamp"]) in closed_at:
+                        results[index] = {"index": index, "result": "duplicate"}
+                        continue
+                    if attendance is None:
+                        # Session opened on an earlier day and still open (overnight shift)
+                        attendance = open_by_employee.get(employee.pk)
+                    if attendance is None or attendance.check_in_time is None:
+                        results[index] = {"index": index, "result": "rejected", "error": "No active check-in found"}
+                        continue
+                    if attendance.check_out_time is not None:
+                        results[index] = {"index": index, "result": "duplicate"}
+                        continue
+                    if event["timestamp"] < attendance.check_in_time:
+                        results[index] = {"index": index, "result": "rejected", "error": "Check-out is before check-in"}
+                        continue
+                    attendance.check_out_time = event["timestamp"]
+                    attendance.check_out_latitude = event.get("latitude")
+                    attendance.check_out_longitude = event.get("longitude")
+                    attendance.check_out_site_id = sites[index]
+                    attendance.scan_type = event["scan_type"]
+                    attendance.device_id = event["device_id"]
+                    attendance.status = event["status"]
+                    attendance.device_verified = attendance.device_verified and device_verified
+                    if open_by_employee.get(employee.pk) is attendance:
+                        del open_by_employee[employee.pk]
+                    rollups.add_delta(rollup_deltas, attendance, rollups.check_out_delta(attendance))
+                    if attendance.pk is not None:
+                        to_update[attendance.pk] = attendance
+
+                results[index] = {"index": index, "result": "created"}
+
+            Attendance.objects.bulk_create(to_create)
+            Attendance.objects.bulk_update(
+                to_update.values(),
+                [
+                    "check_out_time", "check_out_latitude", "check_out_longitude",
+                    "check_out_site", "scan_type", "device_id", "device_verified", "status",
+                ],
+            )
+            rollups.apply_deltas(rollup_deltas)
+
+        summary = {"created": 0, "duplicate": 0, "rejected": 0}
+        for result in results:
+            summary[result["result"]] += 1
+
+        return Response({"summary": summary, "results": results}, status=200)
+
+
 
 
 # ----------------- BIOMETRIC REGISTER -----------------
@@ -146,26 +346,132 @@ class BiometricRegisterView(APIView):
         }, status=201)
 
 
+class DeviceBindingCacheStatsView(APIView):
+    """Hit rate of this worker's device-binding cache (check-in / check-out device verification)"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(devices.binding_cache.stats())
+
+
+# ----------------- METRICS -----------------
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from .metrics import registry as metrics_registry
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@require_GET
+def metrics_view(request):
+    """
+    This worker's request metrics in Prometheus text format. Plain Django view
+    (no JWT) for scrapers; set METRICS_TOKEN to require "Authorization: Bearer <token>".
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics_registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
 from rest_framework import generics, permissions
+from django.utils.dateparse import parse_date
 from .models import Employee
-from .serializers import EmployeeFullDataSerializer
+from .serializers import EmployeeFullDataSerializer, AttendanceRecordSerializer
+from .pagination import AttendanceRecordPagination
 
 class EmployeeFullDataAPIView(generics.RetrieveAPIView):
     """
     Fetch all data of an employee including profile, attendance, and biometric.
+
+    Query params:
+      from / to   - limit attendance_records to this date range (YYYY-MM-DD)
+      page_size   - attendance rows per page (cursor paginated, max 100)
+      summary     - "true" returns only the profile and current-month summary
     """
     serializer_class = EmployeeFullDataSerializer
     permission_classes = [permissions.IsAuthenticated]  # optional
+    pagination_class = AttendanceRecordPagination
 
     def get_queryset(self):
-        return Employee.objects.all()
+        return Employee.objects.select_related("user", "biometric_data")
 
     def get_object(self):
         employee_id = self.kwargs.get('employee_id')
-        return Employee.objects.get(employee_id=employee_id)
+        return get_object_or_404(self.get_queryset(), employee_id=employee_id)
+
+    def retrieve(self, request, *args, **kwargs):
+        params = request.query_params
+        bounds = {}
+        for param in ("from", "to"):
+            if not params.get(param):
+                continue
+            try:
+                bounds[param] = parse_date(params[param])
+            except ValueError:
+                bounds[param] = None
+            if bounds[param] is None:
+                return Response({"error": f"'{param}' must be a valid date (YYYY-MM-DD)"}, status=400)
+        if len(bounds) == 2 and bounds["from"] > bounds["to"]:
+            return Response({"error": "'from' must not be after 'to'"}, status=400)
+
+        employee = self.get_object()
+        data = self.get_serializer(employee).data
+
+        if params.get("summary", "").lower() in ("1", "true", "yes"):
+            return Response(data)
+
+        records = Attendance.objects.filter(employee=employee)
+        if "from" in bounds:
+            records = records.filter(date__gte=bounds["from"])
+        if "to" in bounds:
+            records = records.filter(date__lte=bounds["to"])
+
+        page = self.paginate_queryset(records)
+        data["attendance_records"] = AttendanceRecordSerializer(page, many=True).data
+        data["attendance_next"] = self.paginator.get_next_link()
+        data["attendance_previous"] = self.paginator.get_previous_link()
+        return Response(data)
+
+
+
 
+from django.http import StreamingHttpResponse
+from .exports import EXPORT_FORMATS, export_lines
 
 
+class AttendanceExportView(APIView):
+    """
+    Stream attendance for a date range as CSV or JSON Lines (month-end payroll).
+    Query params: from, to (YYYY-MM-DD, required), type (csv | jsonl, default csv).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        try:
+            date_from = parse_date(request.query_params.get("from", ""))
+            date_to = parse_date(request.query_params.get("to", ""))
+        except ValueError:
+            date_from = date_to = None
+        if date_from is None or date_to is None:
+            return Response({"error": "from and to are required dates (YYYY-MM-DD)"}, status=400)
+
+        export_format = request.query_params.get("type", "csv")
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": f"type must be one of: {', '.join(EXPORT_FORMATS)}"}, status=400)
+
+        content_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+        response = StreamingHttpResponse(
+            export_lines(date_from, date_to, export_format), content_type=content_type
+        )
+        filename = f"attendance_{date_from}_{date_to}.{export_format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
 
 from rest_framework import viewsets
 from .models import SiteVisit
@@ -173,28 +479,37 @@ from .serializers import SiteVisitSerializer
 
 
 from rest_framework import viewsets, permissions
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from .authentication import EmployeeJWTAuthentication
 from .models import SiteVisit
 from .serializers import SiteVisitSerializer
 from rest_framework import viewsets, permissions
 from .models import ProjectDetail
 from .serializers import ProjectDetailSerializer
+from .catalog_cache import ConditionalCatalogMixin
+from .search import SearchViewMixin
+from .fast_read import FastListMixin, full_name
 
 
-class ProjectDetailViewSet(viewsets.ModelViewSet):
+class ProjectDetailViewSet(ConditionalCatalogMixin, SearchViewMixin, viewsets.ModelViewSet):
+    """Projects; ?q= searches name, builder, city, state, zipcode and khasra number (see SearchViewMixin)"""
     queryset = ProjectDetail.objects.all().order_by("-created_at")
     serializer_class = ProjectDetailSerializer
     permission_classes = [permissions.IsAuthenticated]  # ✅ JWT required
 
 
-class SiteVisitViewSet(viewsets.ModelViewSet):
-    queryset = SiteVisit.objects.all().order_by("-created_at")
+class SiteVisitViewSet(SearchViewMixin, FastListMixin, viewsets.ModelViewSet):
+    """Site visits; ?q= searches visitor, plot, employee and project names (see SearchViewMixin)"""
+    # employee_name / project_name read these relations for every row
+    queryset = SiteVisit.objects.select_related("employee__user", "project").order_by("-created_at")
     serializer_class = SiteVisitSerializer
-    authentication_classes = [JWTAuthentication]   # 👈 Require JWT
+    fast_list_computed = {"employee_name": full_name("employee__user__first_name", "employee__user__last_name")}
+    authentication_classes = [EmployeeJWTAuthentication]   # 👈 Require JWT
     permission_classes = [permissions.IsAuthenticated]  # 👈 Only logged in users
 
     # Optional: filtering
     def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):  # schema generation: no request
+            return SiteVisit.objects.none()
         queryset = super().get_queryset()
         employee_id = self.request.query_params.get("employee")
         project_id = self.request.query_params.get("project")
@@ -216,12 +531,16 @@ from .models import PropertyBooking
 from .serializers import PropertyBookingSerializer
 
 
-class PropertyBookingViewSet(viewsets.ModelViewSet):
+class PropertyBookingViewSet(SearchViewMixin, FastListMixin, viewsets.ModelViewSet):
+    """Property bookings; ?q= searches visitor name, mobile and plot number (see SearchViewMixin)"""
     queryset = PropertyBooking.objects.all().order_by("-booking_date")
+    ordering = "-booking_date"  # keyset pagination key
     serializer_class = PropertyBookingSerializer
     permission_classes = [permissions.IsAuthenticated]  # ✅ JWT required
 
     def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):  # schema generation: no request
+            return PropertyBooking.objects.none()
         queryset = super().get_queryset()
         employee_id = self.request.query_params.get("employee")
         project_id = self.request.query_params.get("project")
@@ -248,8 +567,9 @@ from rest_framework import viewsets
 from .models import EmployeeServiceStatus, Service
 from .serializers import EmployeeServiceStatusSerializer, ServiceSerializer
 
-class ServiceViewSet(viewsets.ModelViewSet):
+class ServiceViewSet(ConditionalCatalogMixin, viewsets.ModelViewSet):
     queryset = Service.objects.all()
+    ordering = "name"  # keyset pagination key
     serializer_class = ServiceSerializer
 
 
@@ -265,21 +585,15 @@ from rest_framework import status
 from django.utils import timezone
 from datetime import timedelta
 
-class EmployeeReportViewSet(viewsets.ModelViewSet):
+class EmployeeReportViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = EmployeeReport.objects.all().select_related("employee", "attendance")
     serializer_class = EmployeeReportSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def create(self, request, *args, **kwargs):
         employee = request.user.employee
-        try:
-            attendance = Attendance.objects.get(
-                employee=employee,
-                date=timezone.localdate(),
-                check_in_time__isnull=False,
-                check_out_time__isnull=True,
-            )
-        except Attendance.DoesNotExist:
+        attendance = get_open_session(employee)
+        if attendance is None:
             return Response(
                 {"error": "No active attendance found. Please check in first."},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -291,11 +605,26 @@ class EmployeeReportViewSet(viewsets.ModelViewSet):
 
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
+
+        if report_buffer.enabled():
+            # Acknowledge now; the write-behind buffer inserts it with the next batch
+            validated = serializer.validated_data
+            entry = report_buffer.get_buffer().submit(
+                employee.id, attendance.id, validated["report_text"],
+                validated.get("latitude"), validated.get("longitude"),
+            )
+            return Response(
+                {"id": None, **serializer.data, "created_at": entry["created_at"], "spool_id": entry["spool_id"]},
+                status=status.HTTP_202_ACCEPTED,
+            )
+
         self.perform_create(serializer)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def get_queryset(self):
         """Employee sees only their own reports"""
+        if getattr(self, "swagger_fake_view", False):  # schema generation: no user
+            return EmployeeReport.objects.none()
         return EmployeeReport.objects.filter(employee=self.request.user.employee)
 
 from rest_framework import viewsets, permissions
@@ -312,22 +641,15 @@ class MissedReportViewSet(viewsets.ViewSet):
     def missed_reports(self, request):
         employee = request.user.employee
         now = timezone.now()
-        # active attendance for today
-        try:
-            attendance = Attendance.objects.get(
-                employee=employee,
-                date=timezone.localdate(),
-                check_in_time__isnull=False,
-                check_out_time__isnull=True
-            )
-        except Attendance.DoesNotExist:
+        # active (open) attendance session, with its last report time in the same query
+        attendance = with_last_activity(
+            open_sessions().filter(employee=employee)
+        ).order_by("-check_in_time").first()
+        if attendance is None:
             return Response({"missed": False, "message": "No active attendance"})
 
-        last_report = EmployeeReport.objects.filter(attendance=attendance).order_by("-created_at").first()
-        last_time = last_report.created_at if last_report else attendance.check_in_time
-
         # 30 minutes threshold
-        if now - last_time > timedelta(minutes=30):
+        if now - attendance.last_activity > REPORT_INTERVAL:
             return Response({"missed": True, "message": "You missed a half-hourly report."})
         else:
             return Response({"missed": False, "message": "All reports submitted on time."})
@@ -340,7 +662,8 @@ from .models import WorkPlan, WorkDetail
 from .serializers import WorkPlanSerializer, WorkDetailSerializer
 
 class WorkPlanViewSet(viewsets.ModelViewSet):
-    queryset = WorkPlan.objects.all()
+    # employee_id and overall_progress (sums the plan's details) per row
+    queryset = WorkPlan.objects.select_related("employee").prefetch_related("details")
     serializer_class = WorkPlanSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -350,7 +673,7 @@ from .models import WorkDetail
 from .serializers import WorkDetailSerializer
 
 class WorkDetailViewSet(viewsets.ModelViewSet):
-    queryset = WorkDetail.objects.all()
+    queryset = WorkDetail.objects.select_related("work_plan__employee")
     serializer_class = WorkDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -366,7 +689,7 @@ class WorkDetailViewSet(viewsets.ModelViewSet):
             return Response({"error": "WorkDetail ID is required"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            work = WorkDetail.objects.get(id=work_id)
+            work = self.get_queryset().get(id=work_id)
         except WorkDetail.DoesNotExist:
             return Response({"error": "WorkDetail not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -386,5 +709,65 @@ class WorkDetailViewSet(viewsets.ModelViewSet):
         """
         Optional: filter by employee if needed
         """
-        return WorkDetail.objects.all().select_related("work_plan", "work_plan__employee")
+        return super().get_queryset()
+
+
+
+# ----------------- SALES DASHBOARD -----------------
+from django.http import Http404
+from . import dashboard
+
+
+class SalesDashboardView(APIView):
+    """
+    Per-project visit and booking figures for managers: visits by status and
+    visitor status, bookings by status, total / advance / remaining amounts.
+    Without project_id, every project (ordered like the project list).
+    """
+    permission_classes = [permissions.IsAdminUser]
 
+    def get(self, request, project_id=None):
+        summaries = dashboard.project_summaries(project_id)
+        if project_id is None:
+            return Response(summaries)
+        if not summaries:
+            raise Http404("No project matches the given query.")
+        return Response(summaries[0])
+
+
+# ----------------- LEADS -----------------
+from . import leads
+from .serializers import LeadHistorySerializer, LeadBatchLookupSerializer
+
+
+class LeadLookupView(APIView):
+    """
+    Visit and booking history of a visitor by phone number, in any format
+    staff type it ("+91 98220 12345", "09822012345").
+      GET  ?phone=<number>            one lead (404 if never seen)
+      POST {"phones": [<number>, ...]} many at once; "lead" is null for unknown numbers
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        phone = leads.canonical_phone(request.query_params.get("phone"))
+        if phone is None:
+            return Response({"error": "'phone' must be a phone number"}, status=status.HTTP_400_BAD_REQUEST)
+        lead = leads.lookup([phone]).get(phone)
+        if lead is None:
+            return Response({"error": "No visits or bookings for this number"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(LeadHistorySerializer(lead).data)
+
+    def post(self, request):
+        serializer = LeadBatchLookupSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        numbers = serializer.validated_data["phones"]
+        found = leads.lookup(numbers)
+        results = []
+        for number in numbers:
+            lead = found.get(leads.canonical_phone(number))
+            results.append({
+                "phone": number,
+                "lead": LeadHistorySerializer(lead).data if lead is not None else None,
+            })
+        return Response({"results": results})
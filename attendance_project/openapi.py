@@ -0,0 +1,183 @@
+"""
+OpenAPI schema for the API docs (/swagger.json, /swagger.yaml, /swagger/, /redoc/).
+
+With OPENAPI_LIVE_SCHEMA (the default in DEBUG) drf_yasg introspects the
+views on every request, as before. Otherwise the schema is a build artifact
+written by `manage.py generate_openapi_schema` to OPENAPI_SCHEMA_DIR:
+content-addressed files openapi.<version>.json / .yaml plus manifest.json.
+Those are served from memory, the versioned URLs with a one-year immutable
+Cache-Control. The serving process never generates a schema: drf_yasg's
+generator, codecs and views are imported only by the command (the API views
+still import drf_yasg.utils for their @swagger_auto_schema annotations).
+"""
+import hashlib
+import json
+import os
+import threading
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+
+SCHEMA_TITLE = "Employee Attendance API"
+SCHEMA_VERSION = "v1"
+SCHEMA_DESCRIPTION = "API documentation for attendance system"
+SCHEMA_TERMS_OF_SERVICE = "https://www.google.com/policies/terms/"
+SCHEMA_CONTACT_EMAIL = "support@example.com"
+SCHEMA_LICENSE = "BSD License"
+
+MANIFEST_NAME = "manifest.json"
+FORMATS = {
+    "json": "application/json",
+    "yaml": "application/yaml",
+}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# The unversioned URLs change on deploy: cache briefly, then revalidate by ETag
+LATEST_CACHE_CONTROL = "public, max-age=300"
+
+
+def live_schema_enabled():
+    return getattr(settings, "OPENAPI_LIVE_SCHEMA", settings.DEBUG)
+
+
+def schema_dir():
+    return str(getattr(settings, "OPENAPI_SCHEMA_DIR", os.path.join(settings.BASE_DIR, "openapi")))
+
+
+# ----------------- DRF_YASG (imported lazily) -----------------
+def schema_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title=SCHEMA_TITLE,
+        default_version=SCHEMA_VERSION,
+        description=SCHEMA_DESCRIPTION,
+        terms_of_service=SCHEMA_TERMS_OF_SERVICE,
+        contact=openapi.Contact(email=SCHEMA_CONTACT_EMAIL),
+        license=openapi.License(name=SCHEMA_LICENSE),
+    )
+
+
+def live_schema_view():
+    """drf_yasg's schema view, regenerating the schema on every request"""
+    from drf_yasg.views import get_schema_view
+    from rest_framework import permissions
+
+    return get_schema_view(schema_info(), public=True, permission_classes=[permissions.AllowAny])
+
+
+def write_schema_files(directory):
+    """Generate the schema and write the versioned files and manifest; returns the manifest"""
+    from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    schema = OpenAPISchemaGenerator(schema_info()).get_schema(request=None, public=True)
+    documents = {
+        "json": OpenAPICodecJson(validators=[]).encode(schema),
+        "yaml": OpenAPICodecYaml(validators=[]).encode(schema),
+    }
+    version = hashlib.sha256(documents["json"]).hexdigest()[:12]
+
+    os.makedirs(directory, exist_ok=True)
+    manifest = {"version": version, "files": {}}
+    for fmt, content in documents.items():
+        name = f"openapi.{version}.{fmt}"
+        _write_atomic(os.path.join(directory, name), content)
+        manifest["files"][fmt] = name
+    # Manifest last: a reader never sees a version whose files are missing
+    _write_atomic(os.path.join(directory, MANIFEST_NAME), json.dumps(manifest, indent=2).encode())
+    return manifest
+
+
+def _write_atomic(path, content):
+    with open(path + ".tmp", "wb") as handle:
+        handle.write(content)
+    os.replace(path + ".tmp", path)
+
+
+# ----------------- PREGENERATED ARTIFACT -----------------
+class SchemaArtifact:
+    """The pregenerated documents, read once per process"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._loaded = None  # (version, {fmt: bytes})
+
+    def load(self):
+        if self._loaded is None:
+            with self._lock:
+                if self._loaded is None:
+                    with open(os.path.join(self.directory, MANIFEST_NAME), encoding="utf-8") as handle:
+                        manifest = json.load(handle)
+                    documents = {}
+                    for fmt, name in manifest["files"].items():
+                        with open(os.path.join(self.directory, name), "rb") as handle:
+                            documents[fmt] = handle.read()
+                    self._loaded = (manifest["version"], documents)
+        return self._loaded
+
+
+_artifact = None
+
+
+def get_artifact():
+    global _artifact
+    if _artifact is None or _artifact.directory != schema_dir():
+        _artifact = SchemaArtifact(schema_dir())
+    return _artifact
+
+
+def _load_or_none():
+    try:
+        return get_artifact().load()
+    except FileNotFoundError:
+        return None
+
+
+def _missing_artifact():
+    return JsonResponse(
+        {"error": "OpenAPI schema not generated. Run `manage.py generate_openapi_schema`."},
+        status=503,
+    )
+
+
+def schema_document(request, format):
+    """/swagger.json and /swagger.yaml: the current schema, revalidated by ETag"""
+    loaded = _load_or_none()
+    if loaded is None:
+        return _missing_artifact()
+    version, documents = loaded
+    fmt = format.lstrip(".")
+    etag = f"\"{version}\""
+    response = HttpResponse(documents[fmt], content_type=FORMATS[fmt])
+    response["ETag"] = etag
+    response["Cache-Control"] = LATEST_CACHE_CONTROL
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def versioned_schema_document(request, version, format):
+    """/openapi/<version>.<format>: content-addressed, cacheable forever"""
+    loaded = _load_or_none()
+    if loaded is None:
+        return _missing_artifact()
+    current, documents = loaded
+    if version != current or format not in documents:
+        raise Http404("Unknown schema version")
+    etag = f"\"{version}\""
+    response = HttpResponse(documents[format], content_type=FORMATS[format])
+    response["ETag"] = etag
+    response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def schema_ui(request, ui):
+    """Swagger UI / ReDoc page (drf_yasg's bundled static assets) for the pregenerated schema"""
+    loaded = _load_or_none()
+    if loaded is None:
+        return _missing_artifact()
+    version, _ = loaded
+    schema_url = reverse("schema-versioned", kwargs={"version": version, "format": "json"})
+    return render(request, f"attendance/{ui}.html", {"schema_url": schema_url, "title": SCHEMA_TITLE})
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+from datetime import time
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'attendance.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,7 +53,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'attendance.middleware.AsyncWhiteNoiseMiddleware',
 ]
 
 
@@ -81,10 +83,31 @@ WSGI_APPLICATION = 'attendance_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuned for concurrent check-ins:
+# - WAL lets readers run alongside the single writer; synchronous=NORMAL is
+#   durable across application crashes in WAL mode and avoids an fsync per commit
+# - transaction_mode IMMEDIATE takes the write lock at BEGIN, so writers queue on
+#   the busy timeout instead of failing with "database is locked" when a read
+#   transaction tries to upgrade; timeout is that queue's maximum wait (seconds)
+# - mmap_size / cache_size keep the hot pages in memory
+# - CONN_MAX_AGE reuses a worker's connection across requests
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=134217728;'
+                'PRAGMA cache_size=-20000;'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+        },
     }
 }
 
@@ -119,6 +142,9 @@ TIME_ZONE = 'Asia/Kolkata'
 USE_I18N = True
 USE_TZ = True
 
+# Attendance rollups: a check-in after this local time counts as a late arrival
+ATTENDANCE_LATE_AFTER = time(10, 0)
+
 
 
 # Static files (CSS, JavaScript, Images)
@@ -138,6 +164,76 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'attendance.authentication.EmployeeJWTAuthentication',
     ),
-}
\ No newline at end of file
+    'DEFAULT_PAGINATION_CLASS': 'attendance.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
+}
+# Upper bound for ?page_size= on list endpoints
+API_MAX_PAGE_SIZE = 200
+# Seconds before a worker rebuilds its in-memory geofence index on its own
+# (saves in the same process rebuild it immediately)
+GEOFENCE_REFRESH_SECONDS = 300
+
+# Scans from a device other than the employee's registered BiometricData.device_id:
+# "flag" records them with device_verified=False, "reject" refuses them
+ATTENDANCE_DEVICE_POLICY = "flag"
+DEVICE_BINDING_CACHE_SIZE = 4096
+# Seconds a worker trusts its cached binding; registrations made through
+# another worker are picked up within this time
+DEVICE_BINDING_TTL_SECONDS = 60
+
+# Login protection: token buckets per mobile number and per client IP, and how
+# long an unknown mobile is answered from the cache without a database lookup
+LOGIN_THROTTLE_RATES = {
+    "mobile": "5/min",
+    "ip": "30/min",
+}
+LOGIN_UNKNOWN_MOBILE_TTL = 60
+
+# Seconds an authenticated user+employee principal is served from the per-process cache
+AUTH_PRINCIPAL_CACHE_TTL = 60
+
+# Write-behind batching for EmployeeReport inserts: reports are acknowledged
+# (202) once spooled to REPORT_SPOOL_DIR and inserted by a background thread in
+# batches of up to REPORT_FLUSH_BATCH_SIZE every REPORT_FLUSH_INTERVAL_MS.
+# REPORT_SPOOL_FSYNC also survives power loss, at one fsync per report.
+REPORT_WRITE_BEHIND = False
+REPORT_SPOOL_DIR = BASE_DIR / 'spool'
+REPORT_FLUSH_INTERVAL_MS = 200
+REPORT_FLUSH_BATCH_SIZE = 500
+REPORT_SPOOL_FSYNC = False
+
+# Bearer token required by /metrics (None leaves it open, e.g. behind a private network)
+METRICS_TOKEN = None
+
+# Seconds cached ProjectDetail / Service responses (and their version token)
+# live; saves bump the version at once, the TTL covers other workers when the
+# cache is per-process
+CATALOG_CACHE_TTL = 300
+
+# Serve check-in, check-out, report submission and the missed-report check from
+# native async views (attendance/async_views.py); only pays off under an ASGI server
+ATTENDANCE_ASYNC_VIEWS = False
+
+# Render the site-visit, property-booking and report lists from values() rows
+# with precompiled converters instead of the serializers (attendance/fast_read.py);
+# same JSON, a fraction of the CPU per row
+FAST_LIST_READS = False
+
+# Seconds a project's sales dashboard summary stays cached (attendance/dashboard.py);
+# visit, booking and project saves replace it at once, the TTL covers bulk
+# writes and other workers when the cache is per-process
+DASHBOARD_CACHE_TTL = 300
+
+# Most phone numbers accepted by one batch lead lookup (POST /leads/lookup/)
+LEAD_LOOKUP_MAX_BATCH = 5000
+
+# OpenAPI docs: live drf_yasg generation per request (development), or the files
+# written by `manage.py generate_openapi_schema` at build time (production)
+OPENAPI_LIVE_SCHEMA = DEBUG
+OPENAPI_SCHEMA_DIR = BASE_DIR / 'openapi'
+
+# Full-text search (?q= and the admin search box) keeps this many of the
+# newest matching rows; see attendance/search.py
+SEARCH_MAX_MATCHES = 1000
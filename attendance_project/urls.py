@@ -3,35 +3,37 @@ from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-# Swagger schema view
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Employee Attendance API",
-        default_version='v1',
-        description="API documentation for attendance system",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="support@example.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
-)
+from attendance.views import metrics_view
+from . import openapi
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('attendance.urls')),
     path('api/', include('attendance.urls')),
+    path('metrics', metrics_view, name='metrics'),
 
-    # Swagger/OpenAPI URLs
-    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    # Pregenerated schema by version (content-addressed, cached forever)
+    re_path(
+        r'^openapi/(?P<version>[0-9a-f]+)\.(?P<format>json|yaml)$',
+        openapi.versioned_schema_document, name='schema-versioned',
+    ),
 ]
 
+# Swagger/OpenAPI URLs
+if openapi.live_schema_enabled():
+    schema_view = openapi.live_schema_view()
+    urlpatterns += [
+        re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
+        path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+        path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    ]
+else:
+    urlpatterns += [
+        re_path(r'^swagger(?P<format>\.json|\.yaml)$', openapi.schema_document, name='schema-json'),
+        path('swagger/', openapi.schema_ui, {'ui': 'swagger-ui'}, name='schema-swagger-ui'),
+        path('redoc/', openapi.schema_ui, {'ui': 'redoc'}, name='schema-redoc'),
+    ]
+
 # For serving media files in debug mode
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)